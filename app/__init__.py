@@ -1,27 +1,109 @@
+import os
+
+import click
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+from .config import load_config, configure_sqlite
+from .cache import init_availability_cache, init_user_cache
+from .instrumentation import init_instrumentation
+from .rendering import init_rendering
+from .sharding import ShardedSession, init_sharding
+
+db = SQLAlchemy(session_options={"class_": ShardedSession})
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 
-def create_app():
+
+def create_app(config=None):
+    """Build the app; ``config`` overrides the defaults and environment settings."""
     app = Flask(__name__)
-    app.config["SECRET_KEY"] = "supersecretkey"
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///../data/hotel_reservas.db"
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    load_config(app, config)
 
     db.init_app(app)
     login_manager.init_app(app)
+    with app.app_context():
+        # un engine por bind: la base principal y el histórico archivado
+        for engine in db.engines.values():
+            configure_sqlite(engine, app.config["SQLITE_BUSY_TIMEOUT_MS"])
+        init_instrumentation(app, *db.engines.values())
+    init_availability_cache(app)
+    init_user_cache(app)
+    init_sharding(app, db)
+    init_rendering(app)
 
+    from .admission import init_admission
     from .routes import main_bp
     from .auth import auth_bp
+    from .api import api_bp
 
+    init_admission(app)
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(api_bp)
 
-    with app.app_context():
-        db.create_all()  # Crea tablas si no existen
+    if app.jinja_env.bytecode_cache is None and app.config["TEMPLATE_CACHE_DIR"]:
+        os.makedirs(app.config["TEMPLATE_CACHE_DIR"], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["TEMPLATE_CACHE_DIR"])
+
+    if app.config["AUTO_CREATE_SCHEMA"]:
+        from .schema import init_schema
+        with app.app_context():
+            init_schema()
+
+    @app.cli.command("init-db")
+    def init_db():
+        """Create missing tables and indexes and backfill derived tables (run once per deploy)."""
+        from .schema import init_schema, init_shard_schema
+        from .sharding import all_property_ids
+        for line in init_schema(backfill=True) or ["esquema al día"]:
+            print(line)
+        router = app.extensions["shard_router"]
+        for property_id in all_property_ids():
+            init_shard_schema(router.engine(property_id))
+            print(f"shard de la propiedad {property_id}: {router.url_for(property_id)}")
+
+    @app.cli.command("add-property")
+    @click.argument("name")
+    def add_property(name):
+        """Register a property and create its shard."""
+        from .models import Property
+        from .schema import init_shard_schema
+        prop = Property(name=name)
+        db.session.add(prop)
+        db.session.commit()
+        router = app.extensions["shard_router"]
+        init_shard_schema(router.engine(prop.id))
+        print(f"propiedad {prop.id} ({name}) en {router.url_for(prop.id)}")
+
+    @app.cli.command("rebuild-occupancy")
+    def rebuild_occupancy():
+        """Rebuild the per-night occupancy index from existing reservations."""
+        from .availability import rebuild_room_nights
+        print(f"{rebuild_room_nights()} noches ocupadas indexadas")
+
+    @app.cli.command("archive-reservations")
+    @click.option("--before", default=None, help="archive stays checked out on or before YYYY-MM-DD")
+    @click.option("--batch-size", type=int, default=None)
+    @click.option("--property", "property_id", type=int, default=None, help="property shard (default: main database)")
+    def archive_command(before, batch_size, property_id):
+        """Move checked-out reservations to the archive in short batches."""
+        from datetime import date
+        from .archive import archive_reservations
+        from .sharding import using_property
+        with using_property(property_id):
+            moved = archive_reservations(date.fromisoformat(before) if before else None, batch_size)
+        print(f"{moved} reservas archivadas")
+
+    @app.cli.command("rebuild-analytics")
+    @click.option("--property", "property_id", type=int, default=None, help="property shard (default: main database)")
+    def rebuild_analytics(property_id):
+        """Recompute the daily occupancy rollups from the reservations."""
+        from .analytics import rebuild_rollups
+        from .sharding import using_property
+        with using_property(property_id):
+            print(f"{rebuild_rollups()} filas de rollup diario")
 
     return app
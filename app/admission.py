@@ -0,0 +1,284 @@
+"""Admission control in front of the booking path.
+
+In a flash sale many users POST for the same few rooms at once. Left alone,
+each request runs its own overlap check and commit, and they all queue on
+the database write lock until busy timeouts fire. ``BookingGate``
+(``app.extensions["booking_gate"]``) runs every interactive booking through:
+
+1. coalescing: an attempt identical to one in flight (same shard, user, room
+   and dates, e.g. a double-clicked form) waits for it and gets its outcome
+   instead of booking twice;
+2. a FIFO queue per room: attempts for one room run one at a time, so the
+   losers of a race fail on a cheap read instead of fighting for the lock;
+3. bounded concurrency: at most BOOKING_CONCURRENCY bookings use the
+   database at once.
+
+Attempts are refused straight away with ``Overloaded``: 429 when the room's
+queue already holds BOOKING_ROOM_QUEUE attempts, 503 when BOOKING_BACKLOG
+attempts wait in total. One that waits BOOKING_QUEUE_TIMEOUT_MS gives up
+with 503, so an admitted booking takes at most that timeout plus its own work.
+
+The "thread" backend keeps the queues in the worker process. With several
+worker processes on one host, ADMISSION_BACKEND="file" takes the per-room
+locks and the concurrency slots as flock()ed files in ADMISSION_LOCK_DIR,
+shared by every worker; depth limits and coalescing stay per worker.
+"""
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from flask import current_app
+
+from .booking import BookingError, book_room
+from .models import Reservation, db
+from .sharding import current_shard
+
+
+class Overloaded(BookingError):
+    """The booking was not admitted; ``status`` is the HTTP status (429/503), ``retry_after`` in seconds."""
+
+    def __init__(self, message, status=503, retry_after=1):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _QueueTimeout(Exception):
+    pass
+
+
+# ---------------------------
+# Lock backends
+# ---------------------------
+
+class _FifoLock:
+    """Lock handed over to its waiters in arrival order (``threading.Lock`` is not fair)."""
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._busy = False
+        self._waiters = deque()
+
+    def acquire(self, timeout):
+        with self._mutex:
+            if not self._busy:
+                self._busy = True
+                return True
+            ticket = threading.Event()
+            self._waiters.append(ticket)
+        if ticket.wait(timeout):
+            return True
+        with self._mutex:
+            # release() puede haber entregado el turno justo al vencer el plazo
+            if ticket.is_set():
+                return True
+            self._waiters.remove(ticket)
+            return False
+
+    def release(self):
+        with self._mutex:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._busy = False
+
+
+class ThreadLocks:
+    """Per-room FIFO locks and concurrency slots for the threads of one process."""
+
+    def __init__(self, slots):
+        self._slots = threading.BoundedSemaphore(slots)
+        self._rooms = {}
+        self._mutex = threading.Lock()
+
+    @contextmanager
+    def room(self, key, timeout):
+        with self._mutex:
+            lock = self._rooms.setdefault(key, _FifoLock())
+        if not lock.acquire(timeout):
+            raise _QueueTimeout
+        try:
+            yield
+        finally:
+            lock.release()
+
+    @contextmanager
+    def slot(self, timeout):
+        if not self._slots.acquire(timeout=timeout):
+            raise _QueueTimeout
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+
+class FileLocks:
+    """Per-room locks and concurrency slots as flock()ed files, shared by the workers of one host (POSIX only)."""
+
+    def __init__(self, directory, slots, poll=0.005):
+        try:
+            import fcntl
+        except ImportError as exc:
+            raise RuntimeError("the file admission backend needs fcntl (POSIX)") from exc
+        self._fcntl = fcntl
+        self.directory = directory
+        self.slots = slots
+        self.poll = poll
+        os.makedirs(directory, exist_ok=True)
+
+    def _lock(self, names, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            for name in names:
+                fd = os.open(os.path.join(self.directory, name), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    self._fcntl.flock(fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+            if time.monotonic() >= deadline:
+                raise _QueueTimeout
+            time.sleep(self.poll)
+
+    @contextmanager
+    def room(self, key, timeout):
+        fd = self._lock(["room-" + "-".join(str(part) for part in key) + ".lock"], timeout)
+        try:
+            yield
+        finally:
+            os.close(fd)  # cerrar el descriptor libera el flock
+
+    @contextmanager
+    def slot(self, timeout):
+        fd = self._lock([f"slot-{i}.lock" for i in range(self.slots)], timeout)
+        try:
+            yield
+        finally:
+            os.close(fd)
+
+
+# ---------------------------
+# Gate
+# ---------------------------
+
+class _Call:
+    """Outcome of an attempt in flight, shared with its duplicates."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.reservation_id = None
+        self.error = None
+
+
+class BookingGate:
+    """Coalescing, per-room queues and bounded concurrency around ``book_room``."""
+
+    STATS = ("admitted", "coalesced", "rejected_room", "rejected_backlog", "timeouts")
+
+    def __init__(self, locks, room_queue=16, backlog=128, timeout=2.0):
+        self.locks = locks
+        self.room_queue = room_queue
+        self.backlog = backlog
+        self.timeout = timeout
+        self.waiting = 0
+        self.stats = Counter()
+        self._waiting = Counter()
+        self._inflight = {}
+        self._mutex = threading.Lock()
+
+    def book(self, user_id, room_id, checkin, checkout):
+        """``book_room`` through the gate; raises ``Overloaded`` when not admitted."""
+        shard = current_shard()
+        key, room = (shard, user_id, room_id, checkin, checkout), (shard or 0, room_id)
+        with self._mutex:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                self._admit(room)
+                call = self._inflight[key] = _Call()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return db.session.get(Reservation, call.reservation_id)
+        try:
+            reservation = self._run(room, user_id, room_id, checkin, checkout)
+            call.reservation_id = reservation.id
+            return reservation
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._mutex:
+                del self._inflight[key]
+            call.done.set()
+
+    def _admit(self, room):
+        # con self._mutex tomado: si la cola está llena se rechaza ya, sin tocar la base de datos
+        if self.waiting >= self.backlog:
+            self.stats["rejected_backlog"] += 1
+            raise Overloaded("Demasiadas reservas en curso, inténtelo de nuevo en unos segundos",
+                             503, math.ceil(self.timeout))
+        if self._waiting[room] >= self.room_queue:
+            self.stats["rejected_room"] += 1
+            raise Overloaded("Demasiados intentos para esta habitación, inténtelo de nuevo en unos segundos", 429)
+        self._waiting[room] += 1
+        self.waiting += 1
+        self.stats["admitted"] += 1
+
+    def _dequeue(self, room):
+        with self._mutex:
+            self._waiting[room] -= 1
+            if not self._waiting[room]:
+                del self._waiting[room]
+            self.waiting -= 1
+
+    def _run(self, room, user_id, room_id, checkin, checkout):
+        deadline = time.monotonic() + self.timeout
+        queued = True
+        try:
+            with self.locks.room(room, self.timeout):
+                self._dequeue(room)
+                queued = False
+                with self.locks.slot(max(0.0, deadline - time.monotonic())):
+                    return book_room(user_id, room_id, checkin, checkout)
+        except _QueueTimeout:
+            with self._mutex:
+                self.stats["timeouts"] += 1
+            raise Overloaded("La reserva ha esperado demasiado en la cola, inténtelo de nuevo",
+                             503, math.ceil(self.timeout)) from None
+        finally:
+            if queued:
+                self._dequeue(room)
+
+    def as_dict(self):
+        with self._mutex:
+            return {**{name: self.stats[name] for name in self.STATS}, "waiting": self.waiting}
+
+
+def book(user_id, room_id, checkin, checkout):
+    """Book through the app's ``BookingGate``, or straight with ``book_room`` when ADMISSION_CONTROL is off."""
+    gate = current_app.extensions.get("booking_gate")
+    if gate is None:
+        return book_room(user_id, room_id, checkin, checkout)
+    return gate.book(user_id, room_id, checkin, checkout)
+
+
+def init_admission(app):
+    """Attach the ``BookingGate`` configured by ADMISSION_* and BOOKING_* (ADMISSION_CONTROL=False disables it)."""
+    gate = None
+    if app.config["ADMISSION_CONTROL"]:
+        slots = app.config["BOOKING_CONCURRENCY"]
+        if app.config["ADMISSION_BACKEND"] == "file":
+            locks = FileLocks(app.config["ADMISSION_LOCK_DIR"], slots)
+        else:
+            locks = ThreadLocks(slots)
+        gate = BookingGate(locks, room_queue=app.config["BOOKING_ROOM_QUEUE"], backlog=app.config["BOOKING_BACKLOG"],
+                           timeout=app.config["BOOKING_QUEUE_TIMEOUT_MS"] / 1000)
+    app.extensions["booking_gate"] = gate
+    return gate
@@ -0,0 +1,233 @@
+"""Occupancy and stay analytics served from precomputed daily rollups.
+
+``OccupancyRollup`` holds one row per (night, room type) with the
+room-nights sold and the arrivals of that day (count, total length of stay,
+total booking lead time). Bookings, cancellations and bulk imports add their
+deltas in the same transaction as the reservation, so the rollup is always
+in step with the booking tables; reports only read the rollup plus the room
+count per type, and derive the rates with NumPy/pandas.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+
+from .models import ArchivedReservation, OccupancyRollup, Reservation, Room, RoomNight, db
+
+COUNTERS = ("occupied", "arrivals", "stay_nights", "lead_days")
+GROUPINGS = ("night", "type", "month")
+
+
+def _stays_frame(room_types, checkins, checkouts, booked_at):
+    """Arrays of stays -> (nights, arrivals) frames, vectorized over all stays at once."""
+    types = np.asarray(room_types, dtype=object)
+    checkin = pd.to_datetime(pd.Series(checkins)).to_numpy("datetime64[D]")
+    checkout = pd.to_datetime(pd.Series(checkouts)).to_numpy("datetime64[D]")
+    booked = pd.to_datetime(pd.Series(booked_at)).to_numpy("datetime64[D]")
+    # sin fecha de reserva (datos antiguos) la antelación cuenta como 0
+    booked = np.where(np.isnat(booked), checkin, booked)
+
+    length = (checkout - checkin).astype("int64")
+    lead = np.maximum((checkin - booked).astype("int64"), 0)
+
+    # una fila por noche: repetir cada estancia ``length`` veces y sumar el desfase dentro de ella
+    stay = np.repeat(np.arange(len(types)), length)
+    offset = np.arange(length.sum()) - np.repeat(np.cumsum(length) - length, length)
+    nights = pd.DataFrame({"night": checkin[stay] + offset.astype("timedelta64[D]"), "room_type": types[stay]})
+    arrivals = pd.DataFrame({"night": checkin, "room_type": types, "stay_nights": length, "lead_days": lead})
+    return nights, arrivals
+
+
+def _aggregate_arrivals(arrivals):
+    return arrivals.groupby(["night", "room_type"]).agg(
+        arrivals=("stay_nights", "size"), stay_nights=("stay_nights", "sum"), lead_days=("lead_days", "sum"),
+    )
+
+
+def _rollup_deltas(occupied, arrivals):
+    """Per-night occupancy counts plus aggregated arrivals -> rollup rows."""
+    frame = pd.concat([occupied.rename("occupied"), arrivals], axis=1).fillna(0).astype("int64")
+    frame = frame.reindex(columns=list(COUNTERS), fill_value=0).reset_index()
+    frame["night"] = pd.to_datetime(frame["night"]).dt.date
+    return frame
+
+
+def _upsert(rows):
+    """Add the counters of ``rows`` (dicts, or a frame) to the rollup rows, creating the missing ones."""
+    if isinstance(rows, pd.DataFrame):
+        rows = rows.to_dict("records")
+    if not rows:
+        return
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(OccupancyRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OccupancyRollup.night, OccupancyRollup.room_type],
+        set_={c: getattr(OccupancyRollup, c) + stmt.excluded[c] for c in COUNTERS},
+    )
+    db.session.execute(stmt, rows)
+
+
+def record_stay(room_type, checkin, checkout, booked_at=None, sign=1):
+    """``record_stays`` for one stay, in plain Python: the booking path holds the write lock meanwhile."""
+    length = (checkout - checkin).days
+    if length <= 0:
+        return
+    booked = booked_at.date() if isinstance(booked_at, datetime) else booked_at or checkin
+    rows = [{"night": checkin + timedelta(days=i), "room_type": room_type, "occupied": sign,
+             "arrivals": 0, "stay_nights": 0, "lead_days": 0} for i in range(length)]
+    rows[0].update(arrivals=sign, stay_nights=sign * length, lead_days=sign * max((checkin - booked).days, 0))
+    _upsert(rows)
+
+
+def record_stays(stays, sign=1):
+    """Add stays to the rollup (``sign=-1`` removes them) inside the caller's transaction.
+
+    ``stays`` is a list of ``(room_type, checkin, checkout, booked_at)``;
+    vectorized with pandas for bulk imports (see ``record_stay`` for one).
+    """
+    if not stays:
+        return
+    room_types, checkins, checkouts, booked_at = zip(*stays)
+    nights, arrivals = _stays_frame(room_types, checkins, checkouts, booked_at)
+    frame = _rollup_deltas(nights.groupby(["night", "room_type"]).size(), _aggregate_arrivals(arrivals))
+    frame[list(COUNTERS)] *= sign
+    _upsert(frame)
+
+
+def rebuild_rollups(batch_size=100_000, include_archive=True):
+    """Recompute the whole rollup from ``RoomNight`` and ``Reservation``; returns the rows written.
+
+    Occupancy is a GROUP BY over the occupancy index (so legacy double
+    bookings count once); arrivals are aggregated with pandas in batches.
+    With ``include_archive`` the archived stays are added back, so archiving
+    never changes the reports.
+    """
+    OccupancyRollup.query.delete(synchronize_session=False)
+    occupied = pd.DataFrame(
+        db.session.query(RoomNight.night, Room.type, func.count())
+        .join(Room, Room.id == RoomNight.room_id)
+        .group_by(RoomNight.night, Room.type)
+        .all(),
+        columns=["night", "room_type", "occupied"],
+    )
+    occupied["night"] = pd.to_datetime(occupied["night"]).to_numpy("datetime64[D]")
+    occupied = occupied.set_index(["night", "room_type"])["occupied"]
+
+    batches = []
+    result = db.session.execute(
+        select(Room.type, Reservation.checkin, Reservation.checkout, Reservation.timestamp)
+        .join(Room, Room.id == Reservation.room_id)
+        .where(Reservation.checkin.isnot(None), Reservation.checkout > Reservation.checkin)
+        .execution_options(yield_per=batch_size)
+    )
+    for batch in result.partitions():
+        _, arrivals = _stays_frame(*zip(*batch))
+        batches.append(_aggregate_arrivals(arrivals))
+
+    if include_archive:
+        # las estancias archivadas ya no tienen RoomNight: sus noches salen de explotar la estancia
+        archived = db.session.execute(
+            select(ArchivedReservation.room_type, ArchivedReservation.checkin, ArchivedReservation.checkout,
+                   ArchivedReservation.timestamp)
+            .where(ArchivedReservation.checkin.isnot(None), ArchivedReservation.checkout > ArchivedReservation.checkin)
+            .execution_options(yield_per=batch_size)
+        )
+        for batch in archived.partitions():
+            nights, arrivals = _stays_frame(*zip(*batch))
+            occupied = occupied.add(nights.groupby(["night", "room_type"]).size(), fill_value=0)
+            batches.append(_aggregate_arrivals(arrivals))
+    arrivals = pd.concat(batches).groupby(level=["night", "room_type"]).sum() if batches else None
+
+    frame = _rollup_deltas(occupied, arrivals)
+    _upsert(frame)
+    db.session.commit()
+    return len(frame)
+
+
+# ---------------------------
+# INFORMES (sólo leen el rollup)
+# ---------------------------
+def room_capacity():
+    """Bookable rooms per type (today's inventory is used as the capacity of every night)."""
+    return dict(
+        db.session.query(Room.type, func.count(Room.id)).filter(Room.available.is_(True)).group_by(Room.type).all()
+    )
+
+
+def _rollup_grid(start, end, room_type=None):
+    """Rollup counters for [start, end) as a (nights, types, counters) array, zero-filled.
+
+    Returns ``(days, types, capacity, grid)``; ``capacity`` is aligned with ``types``.
+    """
+    query = db.session.query(
+        OccupancyRollup.night, OccupancyRollup.room_type, *[getattr(OccupancyRollup, c) for c in COUNTERS]
+    ).filter(OccupancyRollup.night >= start, OccupancyRollup.night < end)
+    capacity = room_capacity()
+    if room_type:
+        query = query.filter(OccupancyRollup.room_type == room_type)
+        capacity = {room_type: capacity.get(room_type, 0)}
+    rows = query.all()
+
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    types = sorted(set(capacity) | {row[1] for row in rows})
+    grid = np.zeros((len(days), len(types), len(COUNTERS)), dtype=np.int64)
+    if rows:
+        nights, row_types, *counters = zip(*rows)
+        day_idx = (np.array(nights, dtype="datetime64[D]") - days[0]).astype(np.int64)
+        type_idx = np.searchsorted(types, row_types)
+        grid[day_idx, type_idx] = np.column_stack(counters)
+    return days, types, np.array([capacity.get(t, 0) for t in types], dtype=np.int64), grid
+
+
+def daily_rollup(start, end, room_type=None):
+    """Rollup rows for every night in [start, end) and room type, zero-filled, with the capacity."""
+    days, types, capacity, grid = _rollup_grid(start, end, room_type)
+    frame = pd.DataFrame(grid.reshape(-1, len(COUNTERS)), columns=list(COUNTERS))
+    frame.insert(0, "night", np.repeat(days, len(types)).astype("datetime64[ns]"))
+    frame.insert(1, "room_type", np.tile(np.array(types, dtype=object), len(days)))
+    frame["capacity"] = np.tile(capacity, len(days))
+    return frame
+
+
+def occupancy_report(start, end, by="night", room_type=None):
+    """Occupancy rate, average length of stay and lead time over [start, end).
+
+    ``by`` is "night" (per night and type), "type" or "month" (per month and
+    type). Rates are room-nights sold over room-nights available; stay
+    averages are over the arrivals in the period. Undefined ratios are NaN.
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"by must be one of {', '.join(GROUPINGS)}")
+    days, types, capacity, grid = _rollup_grid(start, end, room_type)
+    if by == "night":
+        keys = {"night": np.repeat(days, len(types)).astype("datetime64[ns]")}
+        totals, available = grid, np.broadcast_to(capacity, grid.shape[:2])
+    elif by == "type":
+        keys = {}
+        totals, available = grid.sum(axis=0, keepdims=True), capacity[None, :] * len(days)
+    else:
+        # los días están ordenados: cada mes es un tramo contiguo y se suma con reduceat
+        months = days.astype("datetime64[M]")
+        bounds = np.flatnonzero(np.r_[True, months[1:] != months[:-1]]) if len(days) else np.array([], dtype=int)
+        totals = np.add.reduceat(grid, bounds, axis=0) if len(days) else grid
+        nights_per_month = np.diff(np.r_[bounds, len(days)])
+        keys = {"month": np.repeat(np.datetime_as_string(months[bounds], unit="M"), len(types)).astype(object)}
+        available = nights_per_month[:, None] * capacity[None, :]
+
+    totals = totals.reshape(-1, len(COUNTERS)).astype(np.float64)
+    report = pd.DataFrame({
+        **keys,
+        "room_type": np.tile(np.array(types, dtype=object), len(totals) // max(len(types), 1)),
+        **{c: totals[:, i].astype(np.int64) for i, c in enumerate(COUNTERS)},
+        "room_nights": np.asarray(available).reshape(-1),
+    })
+    with np.errstate(divide="ignore", invalid="ignore"):
+        report["occupancy_rate"] = np.where(report["room_nights"] > 0, totals[:, 0] / report["room_nights"], np.nan)
+        per_arrival = np.where(totals[:, 1:2] > 0, totals[:, 2:] / totals[:, 1:2], np.nan)
+    report["avg_length_of_stay"] = per_arrival[:, 0]
+    report["avg_lead_days"] = per_arrival[:, 1]
+    return report
@@ -0,0 +1,258 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_login import current_user
+
+from .models import Property, Room, Reservation, db
+from .analytics import GROUPINGS, occupancy_report
+from .availability import flexible_search, inventory_version, search_available_rooms, search_properties
+from .admission import Overloaded, book
+from .booking import cancel_booking, user_reservations_page, RoomUnavailable
+from .sharding import all_property_ids
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+def api_login_required(view):
+    """Like ``login_required`` but answers 401 JSON instead of redirecting to the login page."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return _error("authentication required", 401)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _error(message, status):
+    return jsonify({"error": message}), status
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value).date() if value else None
+
+
+def _select_fields(items):
+    """Apply ``?fields=a,b`` so clients can ask for a compact representation."""
+    fields = request.args.get("fields")
+    if not fields:
+        return items
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    return [{k: item[k] for k in wanted if k in item} for item in items]
+
+
+def _inventory_etag(version=None):
+    """ETag for inventory-derived responses: inventory version (read now unless given) plus the exact query."""
+    digest = hashlib.sha1(request.full_path.encode()).hexdigest()[:12]
+    return f"inv{inventory_version() if version is None else version}-{digest}"
+
+
+def _conditional(etag, build):
+    """Return 304 when the client already has ``etag``, else the JSON from ``build()``."""
+    # comparación débil: con compresión el ETag enviado es W/"..."
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _reservation_dict(r):
+    return {
+        "id": r.id,
+        "room_id": r.room_id,
+        "room_number": r.room.number if r.room else None,
+        "room_type": r.room.type if r.room else None,
+        "checkin": r.checkin.isoformat() if r.checkin else None,
+        "checkout": r.checkout.isoformat() if r.checkout else None,
+    }
+
+
+def _archived_dict(r):
+    return {
+        "id": r.id,
+        "room_id": r.room_id,
+        "room_number": r.room_number,
+        "room_type": r.room_type,
+        "checkin": r.checkin.isoformat() if r.checkin else None,
+        "checkout": r.checkout.isoformat() if r.checkout else None,
+        "archived": True,
+    }
+
+
+@api_bp.route("/properties")
+@api_login_required
+def properties():
+    """The chain's properties; pass ``property=<id>`` to any other endpoint to work in one of them."""
+    return jsonify({"properties": [{"id": p.id, "name": p.name} for p in Property.query.order_by(Property.id)]})
+
+
+@api_bp.route("/rooms")
+@api_login_required
+def rooms():
+    """All rooms, optionally filtered by ``type``."""
+    def build():
+        query = db.session.query(Room.id, Room.number, Room.type, Room.available).order_by(Room.number)
+        if request.args.get("type"):
+            query = query.filter(Room.type == request.args["type"])
+        items = [{"id": i, "number": n, "type": t, "available": bool(a)} for i, n, t, a in query]
+        return {"rooms": _select_fields(items)}
+    return _conditional(_inventory_etag(), build)
+
+
+@api_bp.route("/availability")
+@api_login_required
+def availability():
+    """Rooms free for ``checkin``..``checkout`` (same search and cache as /reserve).
+
+    ``properties=all`` or ``properties=1,2`` searches several properties in
+    parallel and tags every room with its ``property_id``.
+    """
+    try:
+        checkin = _parse_date(request.args.get("checkin"))
+        checkout = _parse_date(request.args.get("checkout"))
+    except ValueError:
+        return _error("dates must be YYYY-MM-DD", 400)
+    if bool(checkin) != bool(checkout) or (checkin and checkin >= checkout):
+        return _error("checkin and checkout must both be given, checkout after checkin", 400)
+
+    room_type = request.args.get("type")
+    properties = request.args.get("properties")
+    if properties:
+        # búsqueda en varias propiedades: un shard por hilo, sin ETag (cada shard tiene su versión)
+        known = all_property_ids()
+        try:
+            ids = known if properties == "all" else [int(p) for p in properties.split(",")]
+        except ValueError:
+            return _error("properties must be 'all' or a comma-separated list of ids", 400)
+        unknown = set(ids) - set(known)
+        if unknown:
+            return _error(f"unknown properties: {', '.join(map(str, sorted(unknown)))}", 404)
+        rooms = search_properties(room_type, checkin, checkout, ids)
+        return jsonify({"type": room_type, "checkin": checkin.isoformat() if checkin else None,
+                        "checkout": checkout.isoformat() if checkout else None, "rooms": _select_fields(rooms)})
+
+    # la caché de búsquedas es por proceso: se consulta con la misma versión que va en el ETag
+    version = inventory_version()
+
+    def build():
+        rooms = search_available_rooms(room_type, checkin, checkout, version=version)
+        return {
+            "type": room_type,
+            "checkin": checkin.isoformat() if checkin else None,
+            "checkout": checkout.isoformat() if checkout else None,
+            "rooms": _select_fields(rooms),
+        }
+    return _conditional(_inventory_etag(version), build)
+
+
+@api_bp.route("/availability/flexible")
+@api_login_required
+def flexible_availability():
+    """Best ``nights``-night windows per room type within ``tolerance`` days of ``checkin``."""
+    try:
+        checkin = _parse_date(request.args.get("checkin"))
+        nights = request.args.get("nights", type=int)
+        tolerance = int(request.args.get("tolerance", current_app.config["FLEX_TOLERANCE_DAYS"]))
+        limit = int(request.args.get("limit", 5))
+    except ValueError:
+        return _error("checkin must be YYYY-MM-DD; nights, tolerance and limit integers", 400)
+    if not checkin or not nights or nights < 1:
+        return _error("checkin and a positive nights are required", 400)
+    if not 0 <= tolerance <= current_app.config["FLEX_MAX_TOLERANCE_DAYS"] or limit < 1:
+        return _error(f"tolerance must be 0..{current_app.config['FLEX_MAX_TOLERANCE_DAYS']}, limit positive", 400)
+
+    room_type = request.args.get("type")
+
+    def build():
+        found = flexible_search(checkin, nights, tolerance, room_type, limit)
+        return {
+            "checkin": checkin.isoformat(), "nights": nights, "tolerance": tolerance,
+            "windows": {
+                rtype: [{**w, "checkin": w["checkin"].isoformat(), "checkout": w["checkout"].isoformat()} for w in ws]
+                for rtype, ws in found.items()
+            },
+        }
+    return _conditional(_inventory_etag(), build)
+
+
+@api_bp.route("/reservations")
+@api_login_required
+def list_reservations():
+    """Current user's reservations, keyset-paginated with the ``after`` cursor (``archived=1``: past stays)."""
+    page_size = min(request.args.get("limit", current_app.config.get("DASHBOARD_PAGE_SIZE", 20), type=int), 500)
+    if page_size < 1:
+        return _error("limit must be positive", 400)
+    archived = request.args.get("archived") == "1"
+    try:
+        reservations, next_cursor = user_reservations_page(current_user.id, request.args.get("after"), page_size,
+                                                           archived=archived)
+    except ValueError:
+        return _error("invalid cursor", 400)
+    items = [(_archived_dict if archived else _reservation_dict)(r) for r in reservations]
+    return jsonify({"reservations": _select_fields(items), "next": next_cursor})
+
+
+@api_bp.route("/reservations", methods=["POST"])
+@api_login_required
+def create_reservation():
+    """Book a room: JSON body with ``room_id``, ``checkin`` and ``checkout``."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    try:
+        room_id = int(data.get("room_id"))
+        checkin = _parse_date(data.get("checkin"))
+        checkout = _parse_date(data.get("checkout"))
+    except (TypeError, ValueError):
+        return _error("room_id, checkin and checkout (YYYY-MM-DD) required", 400)
+    if not checkin or not checkout or checkin >= checkout:
+        return _error("checkout must be after checkin", 400)
+
+    try:
+        reservation = book(current_user.id, room_id, checkin, checkout)
+    except Overloaded as exc:
+        response, status = _error(str(exc), exc.status)
+        response.headers["Retry-After"] = str(exc.retry_after)
+        return response, status
+    except RoomUnavailable as exc:
+        return _error(str(exc), 409)
+    return jsonify({"reservation": _reservation_dict(reservation)}), 201
+
+
+@api_bp.route("/reservations/<int:reservation_id>", methods=["DELETE"])
+@api_login_required
+def delete_reservation(reservation_id):
+    """Cancel one of the current user's reservations."""
+    reservation = Reservation.query.filter_by(id=reservation_id, user_id=current_user.id).first()
+    if not reservation:
+        return _error("reservation not found", 404)
+    cancel_booking(reservation)
+    return Response(status=204)
+
+
+@api_bp.route("/analytics/occupancy")
+@api_login_required
+def analytics_occupancy():
+    """Occupancy, length of stay and lead time for ``start``..``end`` grouped ``by`` night, type or month."""
+    try:
+        start = _parse_date(request.args.get("start"))
+        end = _parse_date(request.args.get("end"))
+    except ValueError:
+        return _error("dates must be YYYY-MM-DD", 400)
+    if not start or not end or start >= end:
+        return _error("start and end required, end after start", 400)
+    by = request.args.get("by", "night")
+    if by not in GROUPINGS:
+        return _error("by must be night, type or month", 400)
+
+    def build():
+        report = occupancy_report(start, end, by=by, room_type=request.args.get("type"))
+        if by == "night":
+            report["night"] = report["night"].dt.strftime("%Y-%m-%d")
+        rows = report.round(4).astype(object).where(report.notna(), None).to_dict("records")
+        return {"start": start.isoformat(), "end": end.isoformat(), "by": by, "rows": _select_fields(rows)}
+    return _conditional(_inventory_etag(), build)
@@ -0,0 +1,93 @@
+"""Hot/cold split of the booking history.
+
+``Reservation`` and ``RoomNight`` only need current and future stays: every
+availability check and dashboard page reads them. ``archive_reservations``
+moves stays checked out more than ARCHIVE_AFTER_DAYS ago into
+``ArchivedReservation`` (the "archive" bind) in batches of
+ARCHIVE_BATCH_SIZE. Each batch is two short transactions, so a live booking
+waits for at most one batch:
+
+1. copy the rows into the archive and commit; rows already archived with
+   the same stay are skipped, so a crash before step 2 only leaves rows that
+   the next run moves again;
+2. delete them and their nights from the hot tables, bump the inventory
+   version and the owners' reservation versions and commit.
+
+The daily rollups are not touched, so occupancy reports keep the archived
+history; ``rebuild_rollups`` reads it back from the archive.
+"""
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, insert
+
+from .availability import bump_inventory_version, bump_reservations_version, invalidate_room_type
+from .models import ArchivedReservation, Reservation, Room, RoomNight, db
+
+ARCHIVE_COLUMNS = ("id", "property_id", "user_id", "room_id", "room_number", "room_type", "checkin", "checkout", "timestamp")
+
+
+def archive_cutoff(today=None):
+    """Latest checkout date that can be archived: ARCHIVE_AFTER_DAYS before ``today``."""
+    return (today or date.today()) - timedelta(days=current_app.config["ARCHIVE_AFTER_DAYS"])
+
+
+def archive_reservations(before=None, batch_size=None, pause=0.0):
+    """Move reservations with ``checkout <= before`` to the archive; returns how many moved.
+
+    ``before`` defaults to ``archive_cutoff()``. ``pause`` seconds are slept
+    between batches to leave the write lock to live bookings on busy sites.
+    """
+    before = before or archive_cutoff()
+    batch_size = batch_size or current_app.config["ARCHIVE_BATCH_SIZE"]
+    moved = last_id = 0
+    while True:
+        rows = (
+            db.session.query(Reservation.id, Reservation.property_id, Reservation.user_id, Reservation.room_id,
+                             Room.number, Room.type, Reservation.checkin, Reservation.checkout, Reservation.timestamp)
+            .outerjoin(Room, Room.id == Reservation.room_id)
+            # recorrido por id: cada lote sigue donde acabó el anterior, sin volver a leer las estancias futuras
+            .filter(Reservation.id > last_id, Reservation.checkout <= before)
+            .order_by(Reservation.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        ids = [row[0] for row in rows]
+        last_id = ids[-1]
+        now = datetime.utcnow()
+
+        fetched = len(rows)
+        archived = {a[0]: a[1:] for a in db.session.query(
+            ArchivedReservation.id, ArchivedReservation.user_id, ArchivedReservation.room_id,
+            ArchivedReservation.checkin, ArchivedReservation.checkout).filter(ArchivedReservation.id.in_(ids))}
+        clashes = [row for row in rows if row[0] in archived and archived[row[0]] != (row[2], row[3], row[6], row[7])]
+        if clashes:
+            # id reutilizado por una base anterior a AUTOINCREMENT: la estancia se queda en la tabla caliente
+            current_app.logger.warning("archive: ids ya archivados con otra estancia, no se mueven: %s",
+                                       [row[0] for row in clashes])
+            rows = [row for row in rows if row not in clashes]
+            ids = [row[0] for row in rows]
+        new = [{**dict(zip(ARCHIVE_COLUMNS, row)), "archived_at": now} for row in rows if row[0] not in archived]
+        if new:
+            db.session.execute(insert(ArchivedReservation), new)
+            db.session.commit()
+
+        if rows:
+            db.session.execute(delete(RoomNight).where(RoomNight.reservation_id.in_(ids)))
+            db.session.execute(delete(Reservation).where(Reservation.id.in_(ids)))
+            bump_inventory_version()
+            bump_reservations_version(*{row[2] for row in rows})
+            db.session.commit()
+            for room_type in {row[5] for row in rows if row[5]}:
+                invalidate_room_type(room_type)
+
+        moved += len(rows)
+        if fetched < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return moved
+
@@ -1,11 +1,31 @@
 # app/auth.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_login import login_user, logout_user, login_required
-from .models import User, db
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+from flask_login import current_user, login_user, logout_user, login_required
+from .models import User, db, forget_user
 
 auth_bp = Blueprint("auth", __name__)
 
+
+# parámetros por defecto de werkzeug, que los escribe siempre en el prefijo del hash guardado
+_METHOD_DEFAULTS = {"pbkdf2": ("sha256", str(DEFAULT_PBKDF2_ITERATIONS)), "scrypt": ("32768", "8", "1")}
+
+
+def _hash_method():
+    """Configured PASSWORD_HASH_METHOD with werkzeug's default parameters made explicit."""
+    method, *params = current_app.config.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256").split(":")
+    defaults = _METHOD_DEFAULTS.get(method, ())
+    return ":".join([method, *params, *defaults[len(params):]])
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=_hash_method())
+
+
+def needs_rehash(stored_hash):
+    """True when ``stored_hash`` was made with a different method or cost than the configured one."""
+    return stored_hash.split("$", 1)[0] != _hash_method()
+
 # ---------------------------
 # RUTA DE REGISTRO
 # ---------------------------
@@ -30,8 +50,8 @@ def register():
             flash("El usuario ya existe", "danger")
             return render_template("register.html")
 
-        # Crear usuario con contraseña hasheada (usar pbkdf2:sha256 para compatibilidad)
-        hashed_password = generate_password_hash(password, method="pbkdf2:sha256")
+        # Crear usuario con contraseña hasheada (método y coste según PASSWORD_HASH_METHOD)
+        hashed_password = hash_password(password)
         new_user = User(username=username, password=hashed_password)
         db.session.add(new_user)
         db.session.commit()
@@ -56,6 +76,11 @@ def login():
         if not user:
             flash("Usuario no encontrado", "danger")
         elif check_password_hash(user.password, password):
+            # actualizar de forma transparente hashes creados con otro coste
+            if needs_rehash(user.password):
+                user.password = hash_password(password)
+                db.session.commit()
+                forget_user(user.id)
             login_user(user)
             flash("Bienvenido, " + username, "success")
             return redirect(url_for("main.dashboard"))
@@ -71,6 +96,34 @@ def login():
 @auth_bp.route("/logout")
 @login_required
 def logout():
+    forget_user(current_user.id)
     logout_user()
     flash("Has cerrado sesión correctamente", "success")
     return redirect(url_for("auth.login"))
+
+
+# ---------------------------
+# RUTA DE CAMBIO DE CONTRASEÑA
+# ---------------------------
+@auth_bp.route("/password", methods=["GET", "POST"])
+@login_required
+def change_password():
+    if request.method == "POST":
+        current_password = request.form.get("current_password")
+        password = request.form.get("password")
+        confirm_password = request.form.get("confirm_password")
+
+        if not current_password or not password:
+            flash("Todos los campos son obligatorios", "danger")
+        elif not check_password_hash(current_user.password, current_password):
+            flash("Contraseña actual incorrecta", "danger")
+        elif password != confirm_password:
+            flash("Las contraseñas no coinciden", "danger")
+        else:
+            current_user.password = hash_password(password)
+            db.session.commit()
+            forget_user(current_user.id)
+            flash("Contraseña actualizada", "success")
+            return redirect(url_for("main.dashboard"))
+
+    return render_template("change_password.html")
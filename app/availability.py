@@ -0,0 +1,260 @@
+from datetime import date, timedelta
+
+import numpy as np
+from flask import current_app
+
+from sqlalchemy import String, cast, select, update
+
+from .models import InventoryVersion, Room, Reservation, RoomNight, db
+from .sharding import all_property_ids, current_shard, fan_out
+
+INVENTORY = "inventory"
+
+
+def nights(checkin, checkout):
+    """Nights occupied by a stay: every date in [checkin, checkout)."""
+    return [checkin + timedelta(days=i) for i in range((checkout - checkin).days)]
+
+
+def available_rooms_query(room_type=None, checkin=None, checkout=None):
+    """Rooms free for the [checkin, checkout) window as a single SELECT.
+
+    Occupied rooms are excluded with a NOT EXISTS over ``RoomNight``, an
+    indexed lookup on (room_id, night) that only touches the requested nights
+    instead of scanning the whole booking history.
+    """
+    query = Room.query.filter(Room.available.is_(True))
+    if room_type:
+        query = query.filter(Room.type == room_type)
+    if checkin and checkout:
+        occupied = (
+            db.session.query(RoomNight.room_id)
+            .filter(
+                RoomNight.room_id == Room.id,
+                RoomNight.night >= checkin,
+                RoomNight.night < checkout,
+            )
+            .exists()
+        )
+        query = query.filter(~occupied)
+    return query.order_by(Room.number)
+
+
+def search_available_rooms(room_type=None, checkin=None, checkout=None, version=None):
+    """Availability search as plain dicts, served from the availability cache when enabled.
+
+    Pass the inventory ``version`` a response is labelled with (ETag,
+    fragment key) so the cached rooms are at least that recent.
+    """
+    def compute():
+        rows = available_rooms_query(room_type, checkin, checkout).with_entities(Room.id, Room.number, Room.type)
+        return [{"id": id_, "number": number, "type": rtype} for id_, number, rtype in rows]
+
+    cache = current_app.extensions.get("availability_cache")
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(room_type, checkin, checkout, compute, shard=current_shard(), version=version)
+
+
+def _search_current_version(room_type, checkin, checkout):
+    return search_available_rooms(room_type, checkin, checkout, version=inventory_version())
+
+
+def search_properties(room_type=None, checkin=None, checkout=None, property_ids=None):
+    """Availability across properties: one search per shard on the fan-out pool, merged by property.
+
+    ``property_ids`` defaults to every property in the directory. Rooms carry
+    a ``property_id`` key. Each shard's search is keyed on that shard's
+    inventory version, so bookings made through other workers are seen.
+    """
+    if property_ids is None:
+        property_ids = all_property_ids()
+    found = fan_out(property_ids, _search_current_version, room_type, checkin, checkout)
+    return [{**room, "property_id": pid} for pid in property_ids for room in found[pid]]
+
+
+def flexible_search(checkin, nights, tolerance=3, room_type=None, limit=5):
+    """Best free (room, checkin) windows of ``nights`` nights within ``tolerance`` days of ``checkin``.
+
+    One query loads the reservations of every candidate room that touch the
+    span [checkin - tolerance, checkin + tolerance + nights); they become a
+    rooms x days occupancy matrix, and a cumulative sum along the days gives,
+    for every room and every start date at once, the number of occupied
+    nights in the window. Returns ``{type: [window, ...]}`` with up
+    to ``limit`` windows per type, closest to the requested date first.
+    Windows starting before today are never proposed.
+    """
+    first = max(checkin - timedelta(days=tolerance), date.today())
+    last = checkin + timedelta(days=tolerance)
+    if first > last:
+        return {}
+    # desplazamiento de la fecha pedida dentro del tramo (menor que tolerance si el tramo empieza hoy)
+    lead = (checkin - first).days
+    span = (last - first).days + nights
+    rooms_query = db.session.query(Room.id, Room.number, Room.type).filter(Room.available.is_(True))
+    if room_type:
+        rooms_query = rooms_query.filter(Room.type == room_type)
+    rooms = rooms_query.order_by(Room.number).all()
+    if not rooms:
+        return {}
+    ids = np.array([r[0] for r in rooms])
+    order = np.argsort(ids)
+
+    # línea temporal por habitación a partir de las estancias que tocan el tramo: +1 al entrar y -1 al
+    # salir en un array de diferencias; su suma acumulada es el número de estancias de cada noche
+    res, room = Reservation.__table__.c, Room.__table__.c
+    stays = select(res.room_id, cast(res.checkin, String), cast(res.checkout, String)).join_from(
+        Reservation.__table__, Room.__table__, room.id == res.room_id
+    ).where(
+        room.available.is_(True),
+        res.checkin < first + timedelta(days=span),
+        res.checkout > first,
+    )
+    if room_type:
+        stays = stays.where(room.type == room_type)
+    stays = db.session.connection().execute(stays).all()
+    timeline = np.zeros((len(rooms), span + 1), dtype=np.int32)
+    if stays:
+        room_ids, checkins, checkouts = zip(*stays)
+        row = order[np.searchsorted(ids, room_ids, sorter=order)]
+        base = np.datetime64(first, "D")
+        # las fechas llegan como texto y se convierten en bloque, sin un objeto date por fila
+        enter = np.clip((np.array(checkins, dtype="datetime64[D]") - base).astype(np.int64), 0, span)
+        leave = np.clip((np.array(checkouts, dtype="datetime64[D]") - base).astype(np.int64), 0, span)
+        np.add.at(timeline, (row, enter), 1)
+        np.add.at(timeline, (row, leave), -1)
+    occupied = np.cumsum(timeline, axis=1)[:, :span] > 0
+
+    # ocupadas[r, s] = noches ocupadas en [s, s + nights) para todos los s a la vez
+    csum = np.concatenate([np.zeros((len(rooms), 1), dtype=np.int64), np.cumsum(occupied, axis=1)], axis=1)
+    busy = csum[:, nights:] - csum[:, :-nights]
+    room_idx, start = np.nonzero(busy == 0)
+    distance = np.abs(start - lead)
+
+    types = np.array([r[2] for r in rooms], dtype=object)[room_idx]
+    # room_idx ya sigue el orden por número: lexsort desempata por distancia, luego fecha, luego número
+    ranked = np.lexsort((room_idx, start, distance))
+    results = {}
+    for rtype in sorted(set(types)):
+        windows = []
+        for i in ranked[types[ranked] == rtype][:limit]:
+            room_id, number, _ = rooms[room_idx[i]]
+            day = first + timedelta(days=int(start[i]))
+            windows.append({
+                "room_id": room_id, "number": number, "type": rtype, "offset": int(start[i]) - lead,
+                "checkin": day, "checkout": day + timedelta(days=nights),
+            })
+        results[rtype] = windows
+    return results
+
+
+def inventory_version():
+    """Current inventory version; changes whenever a booking, cancellation or room insert commits."""
+    return db.session.query(InventoryVersion.value).filter_by(name=INVENTORY).scalar() or 0
+
+
+def bump_inventory_version():
+    """Increment the inventory version inside the caller's transaction."""
+    result = db.session.execute(
+        update(InventoryVersion).where(InventoryVersion.name == INVENTORY).values(value=InventoryVersion.value + 1)
+    )
+    if not result.rowcount:
+        db.session.add(InventoryVersion(name=INVENTORY, value=1))
+
+
+def reservations_counter(user_id):
+    """Name of the ``InventoryVersion`` row counting changes to ``user_id``'s reservations."""
+    return f"reservations:{user_id}"
+
+
+def bump_reservations_version(*user_ids):
+    """Increment the reservation-list version of ``user_ids`` inside the caller's transaction."""
+    user_ids = sorted({u for u in user_ids if u is not None})
+    if not user_ids:
+        return
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    # upsert: la fila de cada usuario se crea con su primer cambio, sin carreras entre dos reservas
+    stmt = insert(InventoryVersion)
+    stmt = stmt.on_conflict_do_update(index_elements=[InventoryVersion.name],
+                                      set_={"value": InventoryVersion.value + 1})
+    db.session.execute(stmt, [{"name": reservations_counter(u), "value": 1} for u in user_ids])
+
+
+def _inventory_changed():
+    # el fragmento de habitaciones memoriza la versión de inventario: olvidarla tras un commit local
+    fragments = current_app.extensions.get("fragment_cache")
+    if fragments is not None:
+        fragments.forget_version(INVENTORY, current_shard())
+
+
+def invalidate_stay(room_type, checkin, checkout):
+    """Forget cached searches made stale by booking or freeing [checkin, checkout)."""
+    _inventory_changed()
+    cache = current_app.extensions.get("availability_cache")
+    if cache is not None:
+        cache.invalidate_stay(room_type, checkin, checkout, shard=current_shard())
+
+
+def invalidate_room_type(room_type):
+    """Forget cached searches that could list a new room of ``room_type``."""
+    _inventory_changed()
+    cache = current_app.extensions.get("availability_cache")
+    if cache is not None:
+        cache.invalidate_room_type(room_type, shard=current_shard())
+
+
+def is_room_free(room_id, checkin, checkout):
+    """True when none of the nights in [checkin, checkout) is taken for ``room_id``."""
+    taken = RoomNight.query.filter(
+        RoomNight.room_id == room_id,
+        RoomNight.night >= checkin,
+        RoomNight.night < checkout,
+    ).first()
+    return taken is None
+
+
+def occupy_nights(reservation):
+    """Add the RoomNight rows for a (flushed) reservation to the session."""
+    db.session.add_all([
+        RoomNight(room_id=reservation.room_id, night=night, reservation_id=reservation.id)
+        for night in nights(reservation.checkin, reservation.checkout)
+    ])
+
+
+def release_nights(reservation):
+    """Free the nights held by ``reservation``, e.g. when it is cancelled."""
+    RoomNight.query.filter_by(reservation_id=reservation.id).delete(synchronize_session=False)
+
+
+def rebuild_room_nights():
+    """Recompute the whole occupancy index from ``Reservation``.
+
+    Used once to backfill databases created before ``RoomNight`` existed.
+    Returns the number of nights written.
+    """
+    RoomNight.query.delete(synchronize_session=False)
+    rows = {}
+    for res_id, room_id, checkin, checkout in db.session.query(
+        Reservation.id, Reservation.room_id, Reservation.checkin, Reservation.checkout
+    ).order_by(Reservation.id).yield_per(1000):
+        if room_id is None or not checkin or not checkout:
+            continue
+        # legacy double bookings: the oldest reservation keeps the night
+        for night in nights(checkin, checkout):
+            rows.setdefault((room_id, night), res_id)
+    rows = [
+        {'room_id': room_id, 'night': night, 'reservation_id': res_id}
+        for (room_id, night), res_id in rows.items()
+    ]
+    if rows:
+        db.session.execute(RoomNight.__table__.insert(), rows)
+    bump_inventory_version()
+    db.session.commit()
+    _inventory_changed()
+    cache = current_app.extensions.get("availability_cache")
+    if cache is not None:
+        cache.clear()
+    return len(rows)
@@ -0,0 +1,119 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import joinedload
+
+from .models import ArchivedReservation, InventoryVersion, Room, Reservation, db
+from .analytics import record_stay
+from .availability import (
+    bump_inventory_version, bump_reservations_version, invalidate_stay, is_room_free, occupy_nights, release_nights,
+    reservations_counter,
+)
+
+
+class BookingError(Exception):
+    """Base error for bookings that could not be stored."""
+
+
+class RoomUnavailable(BookingError):
+    """The room does not exist, is out of service or is taken on some night."""
+
+
+def book_room(user_id, room_id, checkin, checkout, retries=5, backoff=0.05):
+    """Atomically book ``room_id`` for the nights in [checkin, checkout).
+
+    The reservation and its ``RoomNight`` rows are inserted in one
+    transaction; the (room_id, night) primary key makes the database reject
+    any booking that overlaps a committed one, so two concurrent requests can
+    never both win a night. Transient "database is locked" errors from SQLite
+    are retried with a linear backoff.
+    """
+    room = db.session.get(Room, room_id)
+    if not room or not room.available:
+        raise RoomUnavailable('La habitación no está disponible')
+
+    for attempt in range(retries):
+        # lectura barata para descartar conflictos evidentes sin tomar el lock de escritura
+        if not is_room_free(room_id, checkin, checkout):
+            raise RoomUnavailable('La habitación no está disponible en esas fechas')
+        try:
+            reservation = Reservation(user_id=user_id, room_id=room_id, checkin=checkin, checkout=checkout)
+            db.session.add(reservation)
+            db.session.flush()
+            occupy_nights(reservation)
+            record_stay(room.type, checkin, checkout, reservation.timestamp)
+            bump_inventory_version()
+            bump_reservations_version(user_id)
+            db.session.commit()
+            invalidate_stay(room.type, checkin, checkout)
+            return reservation
+        except IntegrityError:
+            db.session.rollback()
+            raise RoomUnavailable('La habitación no está disponible en esas fechas')
+        except OperationalError as exc:
+            db.session.rollback()
+            if 'locked' not in str(exc.orig) or attempt == retries - 1:
+                raise
+            time.sleep(backoff * (attempt + 1))
+
+
+def cancel_booking(reservation):
+    """Delete ``reservation`` and free its nights in one transaction."""
+    room_type = reservation.room.type if reservation.room else None
+    stay = (reservation.checkin, reservation.checkout)
+    release_nights(reservation)
+    if room_type:
+        record_stay(room_type, reservation.checkin, reservation.checkout, reservation.timestamp, sign=-1)
+    db.session.delete(reservation)
+    bump_inventory_version()
+    bump_reservations_version(reservation.user_id)
+    db.session.commit()
+    if room_type:
+        invalidate_stay(room_type, *stay)
+
+
+def user_reservations_page(user_id, cursor=None, page_size=20, archived=False, with_version=False):
+    """One page of a user's reservations, rooms eager-loaded, ordered by (checkin, id).
+
+    ``cursor`` is the ``"<checkin>_<id>"`` string returned as the next cursor
+    by the previous page (keyset pagination, so every page costs the same).
+    With ``archived`` the page comes from the archived history instead (see
+    ``archive``), whose rows carry ``room_number``/``room_type`` themselves.
+    Returns ``(reservations, next_cursor)``; raises ValueError on a bad cursor.
+
+    ``with_version`` adds the user's reservation version as a third item,
+    read by the same query (the dashboard fragment key). It is None for
+    archived pages, which live in another bind, and for empty pages.
+    """
+    model = ArchivedReservation if archived else Reservation
+    query = model.query.filter(model.user_id == user_id).order_by(model.checkin, model.id)
+    if not archived:
+        query = query.options(joinedload(Reservation.room))
+    if cursor:
+        after_checkin, after_id = cursor.rsplit('_', 1)
+        after_checkin, after_id = datetime.fromisoformat(after_checkin).date(), int(after_id)
+        query = query.filter(or_(
+            model.checkin > after_checkin,
+            and_(model.checkin == after_checkin, model.id > after_id),
+        ))
+
+    versioned = with_version and not archived
+    if versioned:
+        counter = select(InventoryVersion.value).where(InventoryVersion.name == reservations_counter(user_id))
+        query = query.add_columns(func.coalesce(counter.scalar_subquery(), 0))
+
+    reservations = query.limit(page_size + 1).all()
+    version = None
+    if versioned:
+        version = reservations[0][1] if reservations else None
+        reservations = [r for r, _ in reservations]
+    next_cursor = None
+    if len(reservations) > page_size:
+        reservations = reservations[:page_size]
+        last = reservations[-1]
+        next_cursor = f"{last.checkin.isoformat()}_{last.id}"
+    if with_version:
+        return reservations, next_cursor, version
+    return reservations, next_cursor
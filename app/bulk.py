@@ -0,0 +1,231 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from flask import request, current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from .models import Room, Reservation, RoomNight, db
+from .analytics import record_stays
+from .availability import bump_inventory_version, bump_reservations_version, invalidate_room_type, invalidate_stay, nights
+
+
+class BulkInputError(ValueError):
+    """The request body is neither a JSON array nor a CSV upload."""
+
+
+def iter_request_rows(detach=False):
+    """Yield ``(row_number, dict)`` pairs from a JSON array body or a CSV upload.
+
+    CSV files are read lazily from the upload, so a file larger than memory
+    is never loaded at once. Pass ``detach=True`` when the rows are consumed
+    by a streamed response, after the view has returned.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        stream = _detach_upload(upload) if detach else upload.stream
+        return enumerate(csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")), start=1)
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, list):
+        raise BulkInputError("expected a JSON array or a CSV file upload")
+    return ((number, row if isinstance(row, dict) else {}) for number, row in enumerate(payload, start=1))
+
+
+def _detach_upload(upload):
+    """Open a private handle on an uploaded file.
+
+    Flask closes request files as soon as the view returns, before a streamed
+    response body is iterated. Werkzeug spools large uploads to a temporary
+    file, so duplicating its descriptor keeps the data readable without
+    copying it; small in-memory uploads are simply copied.
+    """
+    stream = upload.stream
+    try:
+        handle = os.fdopen(os.dup(stream.fileno()), "rb")
+    except (AttributeError, io.UnsupportedOperation, OSError):
+        return io.BytesIO(stream.read())
+    handle.seek(0)
+    return handle
+
+
+def chunked(rows, size):
+    """Group an iterable of rows into lists of at most ``size`` items."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _error(row, message):
+    return {"row": row, "success": False, "error": message}
+
+
+def import_rooms(rows, retries=3):
+    """Validate and insert a batch of rooms in one transaction.
+
+    Uniqueness is checked with a single ``IN`` query and the valid rows are
+    inserted with one executemany. If a concurrent insert takes one of the
+    numbers first the batch is re-validated and retried. Returns one result
+    dict per input row.
+    """
+    for attempt in range(retries):
+        try:
+            return _import_rooms(rows)
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == retries - 1:
+                raise
+
+
+def _import_rooms(rows):
+    results = {}
+    pending = {}
+    for row, data in rows:
+        number = str(data.get("number") or "").strip()
+        rtype = str(data.get("type") or "").strip()
+        if not number or not rtype:
+            results[row] = _error(row, "number and type required")
+        elif len(number) > 10:
+            results[row] = _error(row, "number too long")
+        elif number in pending:
+            results[row] = _error(row, "duplicated in upload")
+        else:
+            pending[number] = (row, rtype)
+
+    if pending:
+        existing = {
+            number for (number,) in db.session.query(Room.number).filter(Room.number.in_(list(pending)))
+        }
+        for number in existing:
+            row, _ = pending.pop(number)
+            results[row] = _error(row, "room already exists")
+
+    if pending:
+        mappings = [{"number": number, "type": rtype, "available": True} for number, (_, rtype) in pending.items()]
+        ids = db.session.scalars(
+            insert(Room).returning(Room.id, sort_by_parameter_order=True), mappings
+        ).all()
+        for room_id, (number, (row, rtype)) in zip(ids, pending.items()):
+            results[row] = {"row": row, "success": True, "room": {"id": room_id, "number": number, "type": rtype}}
+        bump_inventory_version()
+    db.session.commit()
+    for rtype in {rtype for _, rtype in pending.values()}:
+        invalidate_room_type(rtype)
+    return [results[row] for row in sorted(results)]
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(str(value)).date()
+
+
+def import_reservations(user_id, rows, retries=3):
+    """Validate and insert a batch of reservations for ``user_id`` in one transaction.
+
+    Conflicts are resolved in memory against the nights already taken in the
+    database (loaded with one query) and against earlier rows of the batch;
+    reservations and their ``RoomNight`` rows are then written with two
+    executemany statements. If a concurrent booking commits first the batch
+    is re-validated and retried.
+    """
+    for attempt in range(retries):
+        try:
+            return _import_reservations(user_id, rows)
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == retries - 1:
+                raise
+
+
+def _import_reservations(user_id, rows):
+    results = {}
+    pending = []
+    accepted = []
+    for row, data in rows:
+        try:
+            room_id = int(data.get("room_id"))
+            checkin = _parse_date(data.get("checkin"))
+            checkout = _parse_date(data.get("checkout"))
+        except (TypeError, ValueError):
+            results[row] = _error(row, "room_id, checkin and checkout (YYYY-MM-DD) required")
+            continue
+        if checkin >= checkout:
+            results[row] = _error(row, "checkout must be after checkin")
+            continue
+        pending.append((row, room_id, checkin, checkout))
+
+    if pending:
+        room_ids = {room_id for _, room_id, _, _ in pending}
+        bookable = dict(
+            db.session.query(Room.id, Room.type).filter(Room.id.in_(room_ids), Room.available.is_(True))
+        )
+        first_night = min(checkin for _, _, checkin, _ in pending)
+        last_checkout = max(checkout for _, _, _, checkout in pending)
+        taken = set(
+            db.session.query(RoomNight.room_id, RoomNight.night).filter(
+                RoomNight.room_id.in_(bookable),
+                RoomNight.night >= first_night,
+                RoomNight.night < last_checkout,
+            )
+        )
+
+        for row, room_id, checkin, checkout in pending:
+            if room_id not in bookable:
+                results[row] = _error(row, "room not available")
+                continue
+            stay = [(room_id, night) for night in nights(checkin, checkout)]
+            if any(key in taken for key in stay):
+                results[row] = _error(row, "room not available on those dates")
+                continue
+            taken.update(stay)
+            accepted.append((row, room_id, checkin, checkout))
+
+        if accepted:
+            booked_at = datetime.utcnow()
+            ids = db.session.scalars(
+                insert(Reservation).returning(Reservation.id, sort_by_parameter_order=True),
+                [
+                    {"user_id": user_id, "room_id": room_id, "checkin": checkin, "checkout": checkout,
+                     "timestamp": booked_at}
+                    for _, room_id, checkin, checkout in accepted
+                ],
+            ).all()
+            night_rows = []
+            for res_id, (row, room_id, checkin, checkout) in zip(ids, accepted):
+                night_rows.extend(
+                    {"room_id": room_id, "night": night, "reservation_id": res_id}
+                    for night in nights(checkin, checkout)
+                )
+                results[row] = {"row": row, "success": True, "reservation": {
+                    "id": res_id, "room_id": room_id,
+                    "checkin": checkin.isoformat(), "checkout": checkout.isoformat(),
+                }}
+            db.session.execute(insert(RoomNight), night_rows)
+            record_stays([
+                (bookable[room_id], checkin, checkout, booked_at) for _, room_id, checkin, checkout in accepted
+            ])
+            bump_inventory_version()
+            bump_reservations_version(user_id)
+    db.session.commit()
+    for _, room_id, checkin, checkout in accepted:
+        invalidate_stay(bookable[room_id], checkin, checkout)
+    return [results[row] for row in sorted(results)]
+
+
+def stream_import(importer, rows):
+    """Run ``importer`` chunk by chunk, yielding one NDJSON line per input row.
+
+    Each chunk is committed on its own, so memory stays bounded by the chunk
+    size (``BULK_CHUNK_SIZE``) however large the upload is.
+    """
+    size = current_app.config.get("BULK_CHUNK_SIZE", 1000)
+    for chunk in chunked(rows, size):
+        for result in importer(chunk):
+            yield json.dumps(result) + "\n"
@@ -0,0 +1,236 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheStats:
+    """Counters used to size the cache: hits, misses, evictions, expirations, invalidations."""
+
+    FIELDS = ("hits", "misses", "evictions", "expirations", "invalidations")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def reset(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def as_dict(self):
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = round(data["hits"] / lookups, 4) if lookups else 0.0
+        return data
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=300, stats=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = stats or CacheStats()
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return ``(True, value)`` on a hit and ``(False, None)`` on a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.stats.incr("hits")
+                    return True, value
+                del self._data[key]
+                self.stats.incr("expirations")
+        self.stats.incr("misses")
+        return False, None
+
+    def set(self, key, value):
+        expires = self._clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.incr("evictions")
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """Shared cache backend on Redis, for deployments with several workers.
+
+    Needs the optional ``redis`` package. Keys are tuples serialised as JSON
+    and registered in a set so invalidation can find them.
+    """
+
+    def __init__(self, url, ttl=300, prefix="hotel:avail:", stats=None):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("the redis cache backend requires the 'redis' package") from exc
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = stats or CacheStats()
+
+    def _name(self, key):
+        return self.prefix + json.dumps(key)
+
+    def get(self, key):
+        raw = self._redis.get(self._name(key))
+        if raw is None:
+            self.stats.incr("misses")
+            return False, None
+        self.stats.incr("hits")
+        return True, json.loads(raw)
+
+    def set(self, key, value):
+        pipe = self._redis.pipeline()
+        pipe.set(self._name(key), json.dumps(value), ex=self.ttl or None)
+        pipe.sadd(self.prefix + "keys", json.dumps(key))
+        pipe.execute()
+
+    def delete(self, key):
+        pipe = self._redis.pipeline()
+        pipe.delete(self._name(key))
+        pipe.srem(self.prefix + "keys", json.dumps(key))
+        return bool(pipe.execute()[0])
+
+    def keys(self):
+        return [tuple(json.loads(k)) for k in self._redis.smembers(self.prefix + "keys")]
+
+    def clear(self):
+        for key in self.keys():
+            self.delete(key)
+
+    def __len__(self):
+        return self._redis.scard(self.prefix + "keys")
+
+
+class AvailabilityCache:
+    """Read-through cache of availability searches keyed on (type, checkin, checkout, shard, version).
+
+    Invalidation is targeted: a booking or cancellation only drops the
+    entries of the same property shard for the same room type (or "any
+    type") whose dates overlap the stay, and a new room only drops the
+    entries for its type. That only reaches this process's cache, so
+    responses versioned by the inventory counter (ETags, fragments) pass
+    ``version``: a change committed by another worker then misses instead of
+    serving the old rooms under the new version.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        return self.backend.stats
+
+    @staticmethod
+    def make_key(room_type, checkin, checkout, shard=None, version=None):
+        return (
+            room_type or "",
+            checkin.isoformat() if checkin else "",
+            checkout.isoformat() if checkout else "",
+            "" if shard is None else str(shard),
+            "" if version is None else str(version),
+        )
+
+    def get_or_compute(self, room_type, checkin, checkout, compute, shard=None, version=None):
+        key = self.make_key(room_type, checkin, checkout, shard, version)
+        found, value = self.backend.get(key)
+        if found:
+            return value
+        generation = self._generation
+        value = compute()
+        # an invalidation that ran while computing may have made ``value`` stale
+        with self._lock:
+            if generation == self._generation:
+                self.backend.set(key, value)
+        return value
+
+    def _drop(self, predicate):
+        with self._lock:
+            self._generation += 1
+            dropped = sum(1 for key in self.backend.keys() if predicate(*key) and self.backend.delete(key))
+        if dropped:
+            self.stats.incr("invalidations", dropped)
+        return dropped
+
+    def invalidate_stay(self, room_type, checkin, checkout, shard=None):
+        """Drop searches affected by a booking or cancellation of [checkin, checkout)."""
+        start, end = checkin.isoformat(), checkout.isoformat()
+        shard = "" if shard is None else str(shard)
+
+        def affected(key_type, key_checkin, key_checkout, key_shard="", key_version=""):
+            if key_shard != shard or key_type not in ("", room_type) or not key_checkin:
+                return False
+            return key_checkin < end and key_checkout > start
+
+        return self._drop(affected)
+
+    def invalidate_room_type(self, room_type, shard=None):
+        """Drop every search that could list a room of ``room_type``."""
+        shard = "" if shard is None else str(shard)
+
+        def affected(key_type, key_checkin, key_checkout, key_shard="", key_version=""):
+            return key_shard == shard and key_type in ("", room_type)
+
+        return self._drop(affected)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.backend.clear()
+
+
+def init_availability_cache(app):
+    """Attach the configured availability cache to ``app.extensions``.
+
+    AVAILABILITY_CACHE selects the backend: "memory" (default), "redis"
+    (with AVAILABILITY_CACHE_REDIS_URL) or "none".
+    """
+    kind = app.config.get("AVAILABILITY_CACHE", "memory")
+    ttl = app.config.get("AVAILABILITY_CACHE_TTL", 300)
+    if kind == "none":
+        cache = None
+    elif kind == "redis":
+        cache = AvailabilityCache(RedisCache(app.config["AVAILABILITY_CACHE_REDIS_URL"], ttl=ttl))
+    else:
+        cache = AvailabilityCache(LRUCache(app.config.get("AVAILABILITY_CACHE_SIZE", 1024), ttl=ttl))
+    app.extensions["availability_cache"] = cache
+    return cache
+
+
+def init_user_cache(app):
+    """Attach the Flask-Login user cache (USER_CACHE, USER_CACHE_SIZE, USER_CACHE_TTL)."""
+    cache = None
+    if app.config.get("USER_CACHE", True):
+        cache = LRUCache(app.config.get("USER_CACHE_SIZE", 4096), ttl=app.config.get("USER_CACHE_TTL", 300))
+    app.extensions["user_cache"] = cache
+    return cache
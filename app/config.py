@@ -0,0 +1,142 @@
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE = os.path.join(BASE_DIR, "data", "hotel_reservas.db")
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_flag(name, default):
+    value = os.environ.get(name)
+    return value.lower() not in ("0", "false", "no") if value not in (None, "") else default
+
+
+def load_config(app, overrides=None):
+    """Fill ``app.config`` from defaults, the environment (and a ``.env`` file), then ``overrides``.
+
+    Every setting below can be set by the environment variable of the same name
+    (STATIC_MAX_AGE for SEND_FILE_MAX_AGE_DEFAULT) unless noted otherwise.
+    ``overrides`` may also give ``DATABASE``, a plain SQLite file path.
+    """
+    load_dotenv()
+    app.config.update(
+        SECRET_KEY=os.environ.get("SECRET_KEY", "supersecretkey"),
+        # base de datos (DATABASE_URL) y pool de conexiones
+        SQLALCHEMY_DATABASE_URI=os.environ.get("DATABASE_URL", f"sqlite:///{DEFAULT_DATABASE}"),
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        DB_POOL_SIZE=_env_int("DB_POOL_SIZE", 10),
+        DB_MAX_OVERFLOW=_env_int("DB_MAX_OVERFLOW", 20),
+        DB_POOL_RECYCLE=_env_int("DB_POOL_RECYCLE", 1800),
+        DB_POOL_TIMEOUT=_env_int("DB_POOL_TIMEOUT", 30),
+        SQLITE_BUSY_TIMEOUT_MS=_env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        # caché de búsquedas: "memory", "redis" (con AVAILABILITY_CACHE_REDIS_URL) o "none"
+        AVAILABILITY_CACHE=os.environ.get("AVAILABILITY_CACHE", "memory"),
+        AVAILABILITY_CACHE_SIZE=_env_int("AVAILABILITY_CACHE_SIZE", 1024),
+        AVAILABILITY_CACHE_TTL=_env_int("AVAILABILITY_CACHE_TTL", 300),
+        AVAILABILITY_CACHE_REDIS_URL=os.environ.get("AVAILABILITY_CACHE_REDIS_URL"),
+        # días de tolerancia de la búsqueda con fechas flexibles: por defecto y máximo admitido
+        FLEX_TOLERANCE_DAYS=_env_int("FLEX_TOLERANCE_DAYS", 3),
+        FLEX_MAX_TOLERANCE_DAYS=_env_int("FLEX_MAX_TOLERANCE_DAYS", 30),
+        # método de hash de contraseñas; los hashes con otro coste se rehacen al iniciar sesión
+        PASSWORD_HASH_METHOD=os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000"),
+        # caché del usuario de la sesión (Flask-Login), por proceso
+        USER_CACHE=_env_flag("USER_CACHE", True),
+        USER_CACHE_SIZE=_env_int("USER_CACHE_SIZE", 4096),
+        USER_CACHE_TTL=_env_int("USER_CACHE_TTL", 300),
+        # métricas, log de consultas lentas y detección de N+1 (ver app/instrumentation.py)
+        INSTRUMENTATION=_env_flag("INSTRUMENTATION", True),
+        SLOW_QUERY_MS=_env_int("SLOW_QUERY_MS", 200),
+        N_PLUS_ONE_THRESHOLD=_env_int("N_PLUS_ONE_THRESHOLD", 10),
+        # el perfilado por cabecera X-Profile es opt-in: escribe ficheros y ralentiza la petición
+        PROFILING=_env_flag("PROFILING", False),
+        PROFILE_INTERVAL_MS=_env_int("PROFILE_INTERVAL_MS", 5),
+        PROFILE_DIR=os.environ.get("PROFILE_DIR", os.path.join(BASE_DIR, "data", "profiles")),
+        # producción: desactivar y ejecutar ``flask init-db`` en el despliegue (ver app/schema.py)
+        AUTO_CREATE_SCHEMA=_env_flag("AUTO_CREATE_SCHEMA", True),
+        # caché en disco de plantillas compiladas y max-age de los ficheros estáticos (STATIC_MAX_AGE)
+        TEMPLATE_CACHE_DIR=os.environ.get("TEMPLATE_CACHE_DIR") or None,
+        SEND_FILE_MAX_AGE_DEFAULT=_env_int("STATIC_MAX_AGE", None),
+        # histórico frío: por defecto una tabla más en la misma base; una URL lo lleva a otro fichero
+        ARCHIVE_DATABASE_URL=os.environ.get("ARCHIVE_DATABASE_URL") or None,
+        ARCHIVE_AFTER_DAYS=_env_int("ARCHIVE_AFTER_DAYS", 30),
+        ARCHIVE_BATCH_SIZE=_env_int("ARCHIVE_BATCH_SIZE", 2000),
+        # una base por propiedad, p. ej. sqlite:////srv/hotel/shards/property_{property}.db
+        # SHARD_BINDS solo se puede dar en ``overrides``
+        SHARD_URL_TEMPLATE=os.environ.get("SHARD_URL_TEMPLATE") or None,
+        SHARD_BINDS={},  # {property_id: url} para las propiedades que no siguen la plantilla
+        SHARD_FANOUT_WORKERS=_env_int("SHARD_FANOUT_WORKERS", 8),
+        # fragmentos de plantilla cacheados, páginas en streaming y compresión (ver app/rendering.py)
+        FRAGMENT_CACHE=_env_flag("FRAGMENT_CACHE", True),
+        FRAGMENT_CACHE_SIZE=_env_int("FRAGMENT_CACHE_SIZE", 256),
+        FRAGMENT_CACHE_TTL=_env_int("FRAGMENT_CACHE_TTL", 300),
+        # segundos que un proceso reutiliza la versión de inventario leída (0: leerla en cada petición)
+        FRAGMENT_VERSION_TTL=_env_int("FRAGMENT_VERSION_TTL", 1),
+        STREAM_MIN_ROWS=_env_int("STREAM_MIN_ROWS", 500),
+        STREAM_CHUNK_SIZE=_env_int("STREAM_CHUNK_SIZE", 16384),
+        # desactivar si el proxy de delante ya comprime
+        COMPRESSION=_env_flag("COMPRESSION", True),
+        COMPRESS_MIN_SIZE=_env_int("COMPRESS_MIN_SIZE", 1024),
+        # nivel 1: en este HTML tan repetitivo comprime casi igual que el 6 con un tercio de CPU
+        COMPRESS_LEVEL=_env_int("COMPRESS_LEVEL", 1),
+        COMPRESS_BROTLI_QUALITY=_env_int("COMPRESS_BROTLI_QUALITY", 4),
+        # no se lee del entorno
+        COMPRESS_MIMETYPES=("text/html", "text/plain", "text/css", "text/javascript", "application/json"),
+        # control de admisión de reservas: colas por habitación y concurrencia acotada (ver app/admission.py)
+        ADMISSION_CONTROL=_env_flag("ADMISSION_CONTROL", True),
+        # "thread": colas en el proceso; "file": locks flock() compartidos por los workers de la máquina
+        ADMISSION_BACKEND=os.environ.get("ADMISSION_BACKEND", "thread"),
+        ADMISSION_LOCK_DIR=os.environ.get("ADMISSION_LOCK_DIR", os.path.join(BASE_DIR, "data", "admission")),
+        BOOKING_CONCURRENCY=_env_int("BOOKING_CONCURRENCY", 4),
+        BOOKING_ROOM_QUEUE=_env_int("BOOKING_ROOM_QUEUE", 16),
+        BOOKING_BACKLOG=_env_int("BOOKING_BACKLOG", 128),
+        BOOKING_QUEUE_TIMEOUT_MS=_env_int("BOOKING_QUEUE_TIMEOUT_MS", 2000),
+    )
+    if overrides:
+        app.config.update(overrides)
+        if overrides.get("DATABASE") and "SQLALCHEMY_DATABASE_URI" not in overrides:
+            app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{overrides['DATABASE']}"
+
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    binds.setdefault("archive", app.config["ARCHIVE_DATABASE_URL"] or uri)
+    app.config["SQLALCHEMY_BINDS"] = binds
+    if not _is_memory_sqlite(uri):
+        # in-memory SQLite uses a single shared connection: no pool to size
+        options = {
+            "pool_size": app.config["DB_POOL_SIZE"],
+            "max_overflow": app.config["DB_MAX_OVERFLOW"],
+            "pool_recycle": app.config["DB_POOL_RECYCLE"],
+            "pool_timeout": app.config["DB_POOL_TIMEOUT"],
+            "pool_pre_ping": not uri.startswith("sqlite"),
+        }
+        options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def _is_memory_sqlite(uri):
+    return uri.startswith("sqlite") and (uri in ("sqlite://", "sqlite:///") or ":memory:" in uri)
+
+
+def configure_sqlite(engine, busy_timeout_ms):
+    """Switch every new SQLite connection to WAL with ``synchronous=NORMAL``.
+
+    WAL lets searches keep reading while a booking writes; the busy timeout
+    makes writers wait for the lock instead of failing straight away.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not _is_memory_sqlite(str(engine.url)):
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.close()
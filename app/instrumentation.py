@@ -0,0 +1,308 @@
+"""Per-request performance instrumentation.
+
+``init_instrumentation`` (called by ``create_app``) hooks the request cycle
+and the engine's cursor events to record, per endpoint:
+
+* a latency histogram and a response counter by status,
+* SQL statements per request and database time per request,
+* repeated identical statements in one request (N+1 patterns),
+
+logs statements slower than SLOW_QUERY_MS, adds a ``Server-Timing`` header
+and serves everything at ``/metrics`` in the Prometheus text format. With
+PROFILING enabled, a request sent with ``X-Profile: 1`` is sampled and its
+stacks are written in the collapsed format that flamegraph.pl and speedscope
+read.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with Prometheus semantics, one series per label tuple."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            counts, _, _ = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: (list(counts), count, total) for labels, (counts, count, total) in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, count, total) in sorted(self.snapshot().items()):
+            base = _labels(self.labels, label_values)
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_labels(self.labels, label_values, le=bound)} {n}')
+            lines.append(f'{self.name}_bucket{_labels(self.labels, label_values, le="+Inf")} {count}')
+            lines.append(f"{self.name}_count{base} {count}")
+            lines.append(f"{self.name}_sum{base} {total:.6f}")
+        return lines
+
+
+class CounterMetric:
+    """Monotonic counter, one series per label tuple."""
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def value(self, label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_labels(self.labels, lv)} {v}" for lv, v in values)
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, le=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metrics:
+    """All metrics of one app, kept in ``app.extensions["metrics"]``."""
+
+    def __init__(self):
+        self.latency = Histogram("hotel_request_duration_seconds", "Request latency by endpoint.",
+                                 ("endpoint", "method"), LATENCY_BUCKETS)
+        self.queries = Histogram("hotel_request_sql_queries", "SQL statements executed per request.",
+                                 ("endpoint",), QUERY_BUCKETS)
+        self.db_time = Histogram("hotel_request_db_seconds", "Time spent in the database per request.",
+                                 ("endpoint",), LATENCY_BUCKETS)
+        self.responses = CounterMetric("hotel_responses_total", "Responses by endpoint and status.",
+                                       ("endpoint", "status"))
+        self.slow_queries = CounterMetric("hotel_slow_queries_total", "Statements slower than SLOW_QUERY_MS.",
+                                          ("endpoint",))
+        self.n_plus_one = CounterMetric("hotel_n_plus_one_total",
+                                        "Requests that repeated one statement N_PLUS_ONE_THRESHOLD times or more.",
+                                        ("endpoint",))
+
+    def render(self, extra=()):
+        lines = []
+        for metric in (self.latency, self.queries, self.db_time, self.responses, self.slow_queries, self.n_plus_one):
+            lines.extend(metric.render())
+        lines.extend(extra)
+        return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    """What the SQL hooks collect for the request being served."""
+
+    __slots__ = ("start", "queries", "db_time", "statements", "profiler")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.profiler = None
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every ``interval`` seconds into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    def folded(stacks):
+        """Collapsed-stack text: one ``frame;frame;frame count`` line per distinct stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _current_stats():
+    return g.get("perf") if has_request_context() else None
+
+
+def _endpoint():
+    return request.endpoint or "unmatched"
+
+
+def _install_sql_hooks(engine, metrics, slow_query_seconds):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._instrumentation_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._instrumentation_start
+        stats = _current_stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.statements[statement] += 1
+        if elapsed >= slow_query_seconds:
+            endpoint = _endpoint() if has_request_context() else "-"
+            logger.warning("slow query (%.1f ms) in %s: %s", elapsed * 1000, endpoint, " ".join(statement.split()))
+            metrics.slow_queries.inc((endpoint,))
+
+
+def _before_request():
+    g.perf = RequestStats()
+    if current_app.config["PROFILING"] and request.headers.get("X-Profile") == "1":
+        interval = current_app.config["PROFILE_INTERVAL_MS"] / 1000
+        g.perf.profiler = SamplingProfiler(threading.get_ident(), interval).start()
+
+
+def _after_request(response):
+    stats = _current_stats()
+    if stats is None:
+        return response
+    metrics = current_app.extensions["metrics"]
+    endpoint = _endpoint()
+    elapsed = time.perf_counter() - stats.start
+
+    metrics.latency.observe((endpoint, request.method), elapsed)
+    metrics.queries.observe((endpoint,), stats.queries)
+    metrics.db_time.observe((endpoint,), stats.db_time)
+    metrics.responses.inc((endpoint, response.status_code))
+
+    threshold = current_app.config["N_PLUS_ONE_THRESHOLD"]
+    repeated = [(stmt, n) for stmt, n in stats.statements.items() if n >= threshold]
+    if repeated:
+        metrics.n_plus_one.inc((endpoint,))
+        for stmt, n in repeated:
+            logger.warning("possible N+1 in %s: %d x %s", endpoint, n, " ".join(stmt.split()))
+
+    response.headers["Server-Timing"] = (
+        f'app;dur={elapsed * 1000:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+    )
+    if stats.profiler is not None:
+        path = _save_profile(endpoint, stats.profiler.stop())
+        stats.profiler = None
+        response.headers["X-Profile-File"] = path
+    return response
+
+
+def _teardown_request(exc):
+    # una excepción no manejada se salta after_request: no dejar el muestreador corriendo
+    stats = _current_stats()
+    if stats is not None and stats.profiler is not None:
+        stats.profiler.stop()
+
+
+def _save_profile(endpoint, stacks):
+    directory = current_app.config["PROFILE_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{time.time_ns() % 10**6}.folded")
+    with open(path, "w") as fh:
+        fh.write(SamplingProfiler.folded(stacks))
+    return path
+
+
+def _cache_metrics():
+    """Availability cache counters as gauges, so /metrics covers the cache too."""
+    cache = current_app.extensions.get("availability_cache")
+    if cache is None:
+        return []
+    lines = ["# HELP hotel_availability_cache Availability cache counters.", "# TYPE hotel_availability_cache gauge"]
+    lines.extend(f'hotel_availability_cache{{stat="{k}"}} {v}' for k, v in cache.stats.as_dict().items())
+    lines.append(f'hotel_availability_cache{{stat="entries"}} {len(cache.backend)}')
+    return lines
+
+
+def _admission_metrics():
+    """Booking admission counters (admitted, coalesced, rejections, timeouts) and the current backlog."""
+    gate = current_app.extensions.get("booking_gate")
+    if gate is None:
+        return []
+    lines = ["# HELP hotel_booking_admission Booking admission control counters.",
+             "# TYPE hotel_booking_admission gauge"]
+    lines.extend(f'hotel_booking_admission{{stat="{k}"}} {v}' for k, v in gate.as_dict().items())
+    return lines
+
+
+def metrics_view():
+    body = current_app.extensions["metrics"].render(_cache_metrics() + _admission_metrics())
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+def instrument_engine(app, engine):
+    """Add the SQL hooks to an engine created after startup (e.g. a property shard)."""
+    metrics = app.extensions.get("metrics")
+    if metrics is not None:
+        _install_sql_hooks(engine, metrics, app.config["SLOW_QUERY_MS"] / 1000)
+
+
+def init_instrumentation(app, *engines):
+    """Install the request/SQL hooks on ``engines`` and the ``/metrics`` endpoint (INSTRUMENTATION=False disables it)."""
+    if not app.config["INSTRUMENTATION"]:
+        return None
+    metrics = Metrics()
+    app.extensions["metrics"] = metrics
+    for engine in engines:
+        instrument_engine(app, engine)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    return metrics
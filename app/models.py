@@ -1,7 +1,11 @@
 from datetime import datetime
 
 from . import db, login_manager
+from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy.orm import make_transient_to_detached
+
+from .sharding import current_property_id
 
 
 class User(UserMixin, db.Model):
@@ -9,21 +13,130 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(150), unique=True, nullable=False)
     password = db.Column(db.String(150), nullable=False)
 
+    reservations = db.relationship("Reservation", back_populates="user")
+
+class Property(db.Model):
+    """A hotel of the chain; its rooms and bookings live in its own shard (see ``sharding``)."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), unique=True, nullable=False)
+
 class Room(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, default=current_property_id)
     number = db.Column(db.String(10), unique=True, nullable=False)
     type = db.Column(db.String(50), nullable=False)
     available = db.Column(db.Boolean, default=True)
 
+    reservations = db.relationship("Reservation", back_populates="room")
+
+    __table_args__ = (
+        db.Index("ix_room_type_available", "type", "available"),
+    )
+
 class Reservation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, default=current_property_id)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     room_id = db.Column(db.Integer, db.ForeignKey("room.id"))
     checkin = db.Column(db.Date)
     checkout = db.Column(db.Date)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    user = db.relationship("User", back_populates="reservations")
+    room = db.relationship("Room", back_populates="reservations")
+
+    __table_args__ = (
+        # cubre la búsqueda de solapamientos por habitación y rango de fechas
+        db.Index("ix_reservation_room_dates", "room_id", "checkin", "checkout"),
+        # paginación por cursor del dashboard: (user_id, checkin, id)
+        db.Index("ix_reservation_user_checkin", "user_id", "checkin"),
+        # sin AUTOINCREMENT SQLite reutiliza los ids más altos tras archivarlos, y el archivo se indexa por id
+        {"sqlite_autoincrement": True},
+    )
+
+class RoomNight(db.Model):
+    """Occupied night of a room; one row per (room, night) booked by a reservation."""
+    room_id = db.Column(db.Integer, db.ForeignKey("room.id"), primary_key=True)
+    night = db.Column(db.Date, primary_key=True)
+    reservation_id = db.Column(db.Integer, db.ForeignKey("reservation.id"), nullable=False, index=True)
+
+class OccupancyRollup(db.Model):
+    """Daily rollup per room type, kept up to date by bookings and cancellations (see ``analytics``)."""
+    night = db.Column(db.Date, primary_key=True)
+    room_type = db.Column(db.String(50), primary_key=True)
+    occupied = db.Column(db.Integer, nullable=False, default=0)     # room-nights sold
+    arrivals = db.Column(db.Integer, nullable=False, default=0)     # stays checking in that day
+    stay_nights = db.Column(db.Integer, nullable=False, default=0)  # total length of those stays
+    lead_days = db.Column(db.Integer, nullable=False, default=0)    # total booking lead time of those stays
+
+class ArchivedReservation(db.Model):
+    """Checked-out reservation moved out of ``Reservation`` by ``archive_reservations``.
+
+    Lives in the "archive" bind (the main database unless ARCHIVE_DATABASE_URL
+    points elsewhere), so room number and type are copied instead of joined.
+    """
+    __bind_key__ = "archive"
+    __tablename__ = "reservation_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # mismo id que en la tabla caliente
+    property_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer)
+    room_id = db.Column(db.Integer)
+    room_number = db.Column(db.String(10))
+    room_type = db.Column(db.String(50))
+    checkin = db.Column(db.Date)
+    checkout = db.Column(db.Date)
+    timestamp = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_archive_user_checkin", "user_id", "checkin"),
+        db.Index("ix_archive_checkout", "checkout"),
+    )
+
+class InventoryVersion(db.Model):
+    """Named counter bumped in the same transaction as the change it tracks.
+
+    ``inventory`` counts changes to bookable inventory (ETags, caches);
+    ``reservations:<user_id>`` counts changes to one user's reservations
+    (dashboard fragments).
+    """
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+def _user_cache():
+    return current_app.extensions.get("user_cache")
+
+
+def forget_user(user_id):
+    """Drop a user from the loader cache (logout, password change)."""
+    cache = _user_cache()
+    if cache is not None:
+        cache.delete(int(user_id))
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """Load the logged-in user, from the user cache when possible.
+
+    Cached users are re-attached to the session with ``merge(load=False)``,
+    so an authenticated page view does not need a query just to resolve
+    ``current_user``. The password hash is not cached: it is loaded from the
+    database when read, so a password changed by another worker is never
+    checked against the old hash.
+    """
+    user_id = int(user_id)
+    cache = _user_cache()
+    if cache is None:
+        return db.session.get(User, user_id)
+
+    found, data = cache.get(user_id)
+    if found:
+        user = User(**data)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        cache.set(user_id, {"id": user.id, "username": user.username})
+    return user
@@ -0,0 +1,223 @@
+"""Cheaper HTML pages: cached template fragments, streamed listings, compressed responses.
+
+Fragments: a template wraps a costly block in
+``{% call cached(name, version, *key) %}`` and the rendered HTML is kept in an
+LRU keyed on ``name``, the property shard, ``version`` and ``key``.
+``version`` is an ``InventoryVersion`` counter (the inventory for room
+listings, ``reservations:<user_id>`` for a dashboard), so a fragment is
+never invalidated: a commit bumps the counter and the next request renders
+under a new key. ``fragment_version`` reads a counter; with ``max_age`` the
+value is kept that many seconds per process and dropped early by the local
+invalidation hooks, so a cached search page needs no query at all. Other
+workers see a change within ``max_age``.
+
+Streaming: ``render_page`` sends listings of STREAM_MIN_ROWS rows or more as
+a stream of STREAM_CHUNK_SIZE pieces, so the page is never held in memory as
+a whole. A ``{{ flush() }}`` in the template sends what is buffered right
+away, e.g. the page head before a fragment that is slow to render on a miss.
+
+Compression: ``compress_response`` (after_request) encodes responses of the
+COMPRESS_MIMETYPES of at least COMPRESS_MIN_SIZE bytes with brotli (optional
+``brotli`` package) or gzip, as the client's Accept-Encoding allows. Streamed
+responses are compressed chunk by chunk with a sync flush after each one.
+Strong ETags become weak, since the bytes differ from the identity encoding.
+"""
+import gzip
+import threading
+import time
+import zlib
+
+from flask import Response, current_app, g, get_flashed_messages, render_template, request, stream_template
+from jinja2 import Undefined
+from markupsafe import Markup
+
+from .cache import LRUCache
+from .sharding import current_shard
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional: sin ella solo gzip
+    brotli = None
+
+
+# ---------------------------
+# Template fragments
+# ---------------------------
+
+class FragmentCache:
+    """Rendered template fragments in an ``LRUCache``, plus memoized version counters for their keys."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        return self.backend.stats
+
+    def version(self, counter, read, max_age=0):
+        """``read()``, reused for ``max_age`` seconds per (counter, shard) when ``max_age`` > 0."""
+        if not max_age:
+            return read()
+        key = (counter, current_shard())
+        now = time.monotonic()
+        entry = self._versions.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = read()
+        with self._lock:
+            self._versions[key] = (now + max_age, value)
+        return value
+
+    def forget_version(self, counter, shard=None):
+        with self._lock:
+            self._versions.pop((counter, shard), None)
+
+    def render(self, key, caller):
+        found, html = self.backend.get(key)
+        if not found:
+            html = Markup(caller())
+            self.backend.set(key, html)
+        return html
+
+
+def fragment_cache():
+    return current_app.extensions.get("fragment_cache")
+
+
+def fragment_version(counter, read, max_age=0):
+    """Version counter for a fragment key (see ``FragmentCache.version``); None when fragments are off."""
+    fragments = fragment_cache()
+    return fragments.version(counter, read, max_age) if fragments is not None else None
+
+
+def cached(name, version, *key, caller):
+    """Jinja global behind ``{% call cached(name, version, *key) %}...{% endcall %}``.
+
+    ``version`` is the counter the block depends on (0 for a static block).
+    The block is rendered as usual when fragment caching is off or there is
+    no version (None, or undefined on an error page rendered without it).
+    """
+    fragments = fragment_cache()
+    if fragments is None or version is None or isinstance(version, Undefined):
+        return caller()
+    return fragments.render((name, current_shard(), version, *key), caller)
+
+
+# ---------------------------
+# Streamed pages
+# ---------------------------
+
+FLUSH = Markup("<!--flush-->")
+
+
+def flush():
+    """Jinja global: in a streamed page, send everything rendered so far (no output otherwise)."""
+    return FLUSH if g.get("streaming") else ""
+
+
+def _chunked(pieces, size):
+    """Join Jinja's many small output pieces into chunks of about ``size`` characters."""
+    buffer, length = [], 0
+    try:
+        for piece in pieces:
+            if piece == FLUSH:
+                if buffer:
+                    yield "".join(buffer)
+                    buffer, length = [], 0
+                continue
+            buffer.append(piece)
+            length += len(piece)
+            if length >= size:
+                yield "".join(buffer)
+                buffer, length = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        close = getattr(pieces, "close", None)
+        if close is not None:
+            close()
+
+
+def render_page(template_name, rows=0, **context):
+    """``render_template``, streamed when the page lists ``rows`` >= STREAM_MIN_ROWS rows."""
+    threshold = current_app.config["STREAM_MIN_ROWS"]
+    if not threshold or rows < threshold:
+        return render_template(template_name, **context)
+    # los flashes se sacan de la sesión ya: su cookie sale con las cabeceras, antes del cuerpo
+    get_flashed_messages(with_categories=True)
+    g.streaming = True
+    pieces = stream_template(template_name, **context)
+    return Response(_chunked(pieces, current_app.config["STREAM_CHUNK_SIZE"]), mimetype="text/html")
+
+
+# ---------------------------
+# Response compression
+# ---------------------------
+
+def _encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _compress(data, encoding, config):
+    if encoding == "br":
+        return brotli.compress(data, quality=config["COMPRESS_BROTLI_QUALITY"])
+    return gzip.compress(data, compresslevel=config["COMPRESS_LEVEL"], mtime=0)
+
+
+def _compress_stream(chunks, encoding, config, close):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=config["COMPRESS_BROTLI_QUALITY"])
+        step, finish = (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+    else:
+        compressor = zlib.compressobj(config["COMPRESS_LEVEL"], zlib.DEFLATED, 31)
+        step, finish = (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield step(chunk)
+        yield finish()
+    finally:
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """after_request: brotli/gzip-encode large textual responses the client accepts compressed."""
+    config = current_app.config
+    if (response.status_code != 200 or request.method == "HEAD" or response.direct_passthrough
+            or "Content-Encoding" in response.headers or response.mimetype not in config["COMPRESS_MIMETYPES"]
+            or "no-transform" in response.headers.get("Cache-Control", "")):
+        return response
+    streamed = response.is_streamed
+    if not streamed and len(response.get_data()) < config["COMPRESS_MIN_SIZE"]:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+
+    if streamed:
+        body = response.response
+        response.response = _compress_stream(response.iter_encoded(), encoding, config, getattr(body, "close", None))
+        response.headers.pop("Content-Length", None)
+    else:
+        response.set_data(_compress(response.get_data(), encoding, config))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_rendering(app):
+    """Attach the fragment cache (FRAGMENT_CACHE*) and response compression (COMPRESSION, COMPRESS_*)."""
+    fragments = None
+    if app.config["FRAGMENT_CACHE"]:
+        fragments = FragmentCache(LRUCache(app.config["FRAGMENT_CACHE_SIZE"], ttl=app.config["FRAGMENT_CACHE_TTL"]))
+    app.extensions["fragment_cache"] = fragments
+    app.jinja_env.globals.update(cached=cached, flush=flush)
+    if app.config["COMPRESSION"]:
+        app.after_request(compress_response)
+    return fragments
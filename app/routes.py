@@ -1,6 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 from flask_login import login_required, current_user
 from .models import Room, Reservation, db
+from .availability import (INVENTORY, bump_inventory_version, flexible_search, inventory_version, invalidate_room_type,
+                           search_available_rooms)
+from .admission import Overloaded, book
+from .booking import cancel_booking, user_reservations_page, RoomUnavailable
+from .rendering import fragment_version, render_page
+from .bulk import BulkInputError, import_rooms, import_reservations, iter_request_rows, stream_import
 from datetime import datetime
 
 main_bp = Blueprint("main", __name__)
@@ -12,9 +18,25 @@ def index():
 @main_bp.route("/dashboard")
 @login_required
 def dashboard():
-    """Dashboard: show current user's reservations and a link to the reserve form."""
-    reservations = Reservation.query.filter_by(user_id=current_user.id).all()
-    return render_template('dashboard.html', reservations=reservations)
+    """Dashboard: show current user's reservations and a link to the reserve form.
+
+    Reservations are paginated by keyset on (checkin, id) through the ``after``
+    cursor, so any page costs one indexed range scan plus the joined rooms.
+    ``?history=1`` pages through the archived (checked-out) stays instead.
+    The table is a fragment cached on the user's reservation version, which
+    the page query returns along with the rows.
+    """
+    page_size = current_app.config.get('DASHBOARD_PAGE_SIZE', 20)
+    archived = request.args.get('history') == '1'
+    cursor = request.args.get('after')
+    try:
+        reservations, next_cursor, version = user_reservations_page(
+            current_user.id, cursor, page_size, archived=archived, with_version=True)
+    except ValueError:
+        flash('Cursor de paginación inválido', 'danger')
+        return redirect(url_for('main.dashboard'))
+    return render_page('dashboard.html', len(reservations), reservations=reservations, next_cursor=next_cursor,
+                       archived=archived, cursor=cursor, page_size=page_size, version=version)
 
 @main_bp.route("/reserve", methods=["GET", "POST"])
 @login_required
@@ -26,12 +48,8 @@ def reserve():
     q_checkin = request.args.get('checkin') or request.form.get('checkin')
     q_checkout = request.args.get('checkout') or request.form.get('checkout')
 
-    rooms_query = Room.query.filter_by(available=True)
-    if q_type:
-        rooms_query = rooms_query.filter_by(type=q_type)
-    rooms = rooms_query.all()
-
-    # If dates provided, filter out rooms with overlapping reservations
+    # Parse the search window; overlapping reservations are excluded by the availability query itself
+    checkin_dt = checkout_dt = None
     try:
         if q_checkin and q_checkout:
             checkin_dt = datetime.fromisoformat(q_checkin).date()
@@ -39,19 +57,9 @@ def reserve():
             if checkin_dt >= checkout_dt:
                 flash('La fecha de check-out debe ser posterior a la de check-in', 'danger')
                 return render_template('reserve.html', types=types, rooms=[], type=q_type, checkin=q_checkin, checkout=q_checkout)
-
-            available_rooms = []
-            for r in rooms:
-                overlapping = Reservation.query.filter(
-                    Reservation.room_id == r.id,
-                    Reservation.checkout > checkin_dt,
-                    Reservation.checkin < checkout_dt
-                ).first()
-                if not overlapping:
-                    available_rooms.append(r)
-            rooms = available_rooms
     except ValueError:
         flash('Formato de fecha inválido. Use YYYY-MM-DD', 'danger')
+        checkin_dt = checkout_dt = None
 
     # Handle reservation submission
     if request.method == "POST":
@@ -74,36 +82,58 @@ def reserve():
             flash('La fecha de check-out debe ser posterior a la de check-in', 'danger')
             return redirect(url_for('main.reserve'))
 
-        # ensure room exists and is available for the requested dates
-        room = Room.query.get(int(room_id))
-        if not room or not room.available:
-            flash('La habitación no está disponible', 'danger')
-            return redirect(url_for('main.reserve'))
-
-        overlapping = Reservation.query.filter(
-            Reservation.room_id == room.id,
-            Reservation.checkout > checkin_dt,
-            Reservation.checkin < checkout_dt
-        ).first()
-        if overlapping:
-            flash('La habitación no está disponible en esas fechas', 'danger')
+        try:
+            book(current_user.id, int(room_id), checkin_dt, checkout_dt)
+        except Overloaded as exc:
+            # rechazo rápido: sin redirección ni plantilla, el cliente reintenta tras Retry-After
+            return Response(str(exc), status=exc.status, mimetype='text/plain',
+                            headers={'Retry-After': str(exc.retry_after)})
+        except RoomUnavailable as exc:
+            flash(str(exc), 'danger')
             return redirect(url_for('main.reserve'))
 
-        reservation = Reservation(
-            user_id=current_user.id,
-            room_id=room.id,
-            checkin=checkin_dt,
-            checkout=checkout_dt
-        )
-        db.session.add(reservation)
-        # marcar habitación como no disponible
-        room.available = False
-        db.session.commit()
-
         flash("Reserva realizada con éxito.", "success")
         return redirect(url_for("main.dashboard"))
 
-    return render_template('reserve.html', types=types, rooms=rooms, type=q_type, checkin=q_checkin, checkout=q_checkout)
+    # clave del fragmento de habitaciones: la versión de inventario, memorizada unos segundos por proceso;
+    # se lee antes de buscar, para que un commit concurrente nunca deje habitaciones viejas bajo la versión nueva
+    inventory = fragment_version(INVENTORY, inventory_version, current_app.config['FRAGMENT_VERSION_TTL'])
+    rooms = search_available_rooms(q_type, checkin_dt, checkout_dt, version=inventory)
+
+    # fechas flexibles: con ?flex=N, o si no queda nada libre, proponer ventanas cercanas de la misma duración
+    suggestions = {}
+    flex = request.args.get('flex', type=int)
+    if checkin_dt and (flex is not None or not rooms):
+        tolerance = current_app.config['FLEX_TOLERANCE_DAYS'] if flex is None else flex
+        tolerance = min(max(tolerance, 0), current_app.config['FLEX_MAX_TOLERANCE_DAYS'])
+        suggestions = flexible_search(checkin_dt, (checkout_dt - checkin_dt).days, tolerance, q_type or None)
+    return render_page('reserve.html', len(rooms), types=types, rooms=rooms, type=q_type, checkin=q_checkin,
+                       checkout=q_checkout, suggestions=suggestions, inventory=inventory)
+
+
+@main_bp.route('/reservations/<int:reservation_id>/cancel', methods=['POST'])
+@login_required
+def cancel_reservation(reservation_id):
+    """Cancel one of the current user's reservations and free its nights."""
+    reservation = Reservation.query.filter_by(id=reservation_id, user_id=current_user.id).first()
+    if not reservation:
+        flash('Reserva no encontrada', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    cancel_booking(reservation)
+
+    flash('Reserva cancelada.', 'success')
+    return redirect(url_for('main.dashboard'))
+
+
+@main_bp.route('/cache/stats')
+@login_required
+def cache_stats():
+    """Hit/miss/eviction counters of the availability cache, for sizing it."""
+    cache = current_app.extensions.get('availability_cache')
+    if cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, 'entries': len(cache.backend), **cache.stats.as_dict()})
 
 
 @main_bp.route('/rooms/add', methods=['POST'])
@@ -122,6 +152,44 @@ def add_room():
 
     room = Room(number=number, type=rtype, available=True)
     db.session.add(room)
+    bump_inventory_version()
     db.session.commit()
+    invalidate_room_type(room.type)
 
     return jsonify({'success': True, 'room': {'id': room.id, 'number': room.number, 'type': room.type}})
+
+
+def _bulk_response(importer):
+    """Run a bulk importer over the request rows.
+
+    With ``?stream=1`` rows are processed in chunks and results are streamed
+    back as NDJSON; otherwise the whole batch is one transaction and the
+    per-row results are returned as a single JSON document.
+    """
+    if request.args.get('stream') in ('1', 'true'):
+        if 'file' not in request.files:
+            return jsonify({'success': False, 'error': 'streaming mode requires a CSV file upload'}), 400
+        rows = iter_request_rows(detach=True)
+        return Response(stream_with_context(stream_import(importer, rows)), mimetype='application/x-ndjson')
+
+    try:
+        results = importer(list(iter_request_rows()))
+    except BulkInputError as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 400
+    created = sum(1 for r in results if r['success'])
+    return jsonify({'success': created == len(results), 'created': created,
+                    'failed': len(results) - created, 'results': results})
+
+
+@main_bp.route('/rooms/bulk', methods=['POST'])
+@login_required
+def bulk_rooms():
+    """Create many rooms from a JSON array or a CSV upload (columns: number, type)."""
+    return _bulk_response(import_rooms)
+
+
+@main_bp.route('/reservations/bulk', methods=['POST'])
+@login_required
+def bulk_reservations():
+    """Book many stays for the current user (columns: room_id, checkin, checkout)."""
+    return _bulk_response(lambda rows: import_reservations(current_user.id, rows))
@@ -0,0 +1,85 @@
+"""Schema management, kept out of the request-serving boot path.
+
+``flask --app wsgi init-db`` runs ``init_schema`` once per deploy. It creates
+missing tables and indexes (``create_all`` only adds indexes together with
+new tables), seeds the inventory counter row and backfills the derived
+tables of databases created by older versions. ``create_app`` only calls it
+when AUTO_CREATE_SCHEMA is on (the default for development and tests).
+Property shards get their tables from ``init_shard_schema`` when they are
+first opened, or from ``init-db`` for every property in the directory.
+"""
+import sqlalchemy as sa
+
+from . import db
+
+
+def _add_missing_columns(engine, table, done):
+    """``create_all`` never alters existing tables: add new nullable columns by hand."""
+    present = {c["name"] for c in db.inspect(engine).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in present and column.nullable and not column.primary_key:
+            kind = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {kind}')
+            done.append(f"columna {table.name}.{column.name} añadida")
+
+
+def _ensure_inventory_version():
+    """Create the inventory counter row up front so bookings only ever UPDATE it."""
+    from .models import InventoryVersion
+    from .availability import INVENTORY
+    if db.session.get(InventoryVersion, INVENTORY) is None:
+        db.session.add(InventoryVersion(name=INVENTORY, value=0))
+        db.session.commit()
+
+
+def _backfill():
+    from .analytics import rebuild_rollups
+    from .availability import rebuild_room_nights
+    from .models import OccupancyRollup, Reservation, RoomNight
+
+    done = []
+    if db.session.query(Reservation.id).first() is None:
+        return done
+    if db.session.query(RoomNight.room_id).first() is None:
+        done.append(f"{rebuild_room_nights()} noches ocupadas indexadas")
+    if db.session.query(OccupancyRollup.night).first() is None:
+        done.append(f"{rebuild_rollups()} filas de rollup diario")
+    return done
+
+
+def init_schema(backfill=False):
+    """Bring the database up to the current models; returns a list of what was done."""
+    done = []
+    existing = {key: set(db.inspect(engine).get_table_names()) for key, engine in db.engines.items()}
+    db.create_all()
+    for key, metadata in db.metadatas.items():
+        engine = db.engines[key]
+        done.extend(f"tabla {t.name} creada" for t in metadata.sorted_tables if t.name not in existing[key])
+        for table in metadata.sorted_tables:
+            if table.name not in existing[key]:
+                continue
+            _add_missing_columns(engine, table, done)
+            present = {ix["name"] for ix in db.inspect(engine).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in present:
+                    index.create(engine)
+                    done.append(f"índice {index.name} creado")
+    _ensure_inventory_version()
+    if backfill:
+        done.extend(_backfill())
+    return done
+
+
+def init_shard_schema(engine):
+    """Create a property shard's tables (everything but the global ones) and its inventory counter row."""
+    from .availability import INVENTORY
+    from .models import InventoryVersion
+    from .sharding import GLOBAL_TABLES
+
+    for metadata in (db.metadatas[None], db.metadatas["archive"]):
+        metadata.create_all(engine, tables=[t for t in metadata.sorted_tables if t.name not in GLOBAL_TABLES])
+    table = InventoryVersion.__table__
+    with engine.begin() as conn:
+        if conn.execute(sa.select(table.c.name).where(table.c.name == INVENTORY)).first() is None:
+            conn.execute(table.insert().values(name=INVENTORY, value=0))
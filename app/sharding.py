@@ -0,0 +1,185 @@
+"""One database per hotel property, chosen per application context.
+
+Users and the ``Property`` directory stay in the main database. Everything a
+property books against (rooms, reservations, occupancy nights, rollups and
+its inventory counter) lives in that property's shard: the URL in
+SHARD_BINDS[property_id] if given, else SHARD_URL_TEMPLATE formatted with
+``property``. ``ShardedSession.get_bind`` sends every statement that would
+go to the main database to the active shard, unless it touches a global
+table, so the booking and search code runs unchanged against a shard.
+
+The shard is a property of the application context (``g.shard``): a request
+picks it from the ``property`` parameter, ``using_property`` pushes a fresh
+context (and so a fresh ``db.session``) for one property, and ``fan_out``
+runs a function in every property's context on a thread pool. One session
+therefore never mixes rows of two shards. Without a property the app is a
+single hotel in the main database, as before.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import abort, current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
+
+# tablas que nunca se reparten: cuentas de usuario y el directorio de propiedades
+GLOBAL_TABLES = frozenset({"user", "property"})
+
+
+def current_shard():
+    """Property id whose shard the current context uses, or None for the main database."""
+    return g.get("shard") if has_app_context() else None
+
+
+def current_property_id():
+    """Column default for ``property_id``: the property of the current context."""
+    return current_shard()
+
+
+def _is_global(mapper, clause):
+    if mapper is not None:
+        return sa.inspect(mapper).local_table.name in GLOBAL_TABLES
+    if clause is None:
+        return False
+    if isinstance(clause, sa.Table):
+        return clause.name in GLOBAL_TABLES
+    return any(getattr(t, "name", None) in GLOBAL_TABLES for t in find_tables(clause, include_joins=True))
+
+
+class ShardedSession(Session):
+    """``db.session`` class: like Flask-SQLAlchemy's, plus routing to the active property's shard."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        shard = current_shard()
+        if shard is None or bind is not None or _is_global(mapper, clause):
+            return engine
+        # la base principal y el archivo de la propiedad viven en su shard
+        engines = self._db.engines
+        if engine is not engines.get(None) and engine is not engines.get("archive"):
+            return engine
+        return current_app.extensions["shard_router"].engine(shard)
+
+
+class ShardRouter:
+    """Property id -> shard engine, created (and given its schema) on first use."""
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self.known = set()
+        self.url_template = app.config["SHARD_URL_TEMPLATE"]
+        self.binds = {int(k): v for k, v in (app.config["SHARD_BINDS"] or {}).items()}
+        self.engine_options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+        self._engines = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def exists(self, property_id):
+        """True for a property of the ``Property`` directory (re-read on a miss, so new ones are seen)."""
+        if property_id not in self.known:
+            from .models import Property
+            self.known = {pid for (pid,) in self.db.session.query(Property.id)}
+        return property_id in self.known
+
+    def url_for(self, property_id):
+        if property_id in self.binds:
+            return self.binds[property_id]
+        if not self.url_template:
+            raise LookupError(f"no shard configured for property {property_id} (set SHARD_URL_TEMPLATE)")
+        return self.url_template.format(property=property_id)
+
+    def engine(self, property_id):
+        engine = self._engines.get(property_id)
+        if engine is not None:
+            return engine
+        with self._lock:
+            engine = self._engines.get(property_id)
+            if engine is None:
+                engine = self._create(property_id)
+                self._engines[property_id] = engine
+        return engine
+
+    def _create(self, property_id):
+        from .config import configure_sqlite
+        from .instrumentation import instrument_engine
+        from .schema import init_shard_schema
+
+        url = self.url_for(property_id)
+        if url.startswith("sqlite:///") and not url.startswith("sqlite:///:memory:"):
+            os.makedirs(os.path.dirname(os.path.abspath(url[len("sqlite:///"):])), exist_ok=True)
+        engine = sa.create_engine(url, **self.engine_options)
+        configure_sqlite(engine, self.app.config["SQLITE_BUSY_TIMEOUT_MS"])
+        instrument_engine(self.app, engine)
+        if self.app.config["AUTO_CREATE_SCHEMA"]:
+            init_shard_schema(engine)
+        return engine
+
+    @property
+    def pool(self):
+        """Thread pool for fan-out queries, SHARD_FANOUT_WORKERS wide, created on first use."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.app.config["SHARD_FANOUT_WORKERS"], thread_name_prefix="shard")
+        return self._pool
+
+    def dispose(self, close=True):
+        for engine in list(self._engines.values()):
+            engine.dispose(close=close)
+
+
+@contextmanager
+def using_property(property_id):
+    """Run the block in a new app context whose ``db.session`` talks to ``property_id``'s shard."""
+    with current_app.app_context():
+        g.shard = property_id
+        yield
+
+
+def fan_out(property_ids, fn, *args, **kwargs):
+    """Call ``fn(*args, **kwargs)`` in every property's shard on the pool; returns ``{property_id: result}``."""
+    app = current_app._get_current_object()
+
+    def run(property_id):
+        with app.app_context():
+            g.shard = property_id
+            return fn(*args, **kwargs)
+
+    property_ids = list(property_ids)
+    return dict(zip(property_ids, app.extensions["shard_router"].pool.map(run, property_ids)))
+
+
+def all_property_ids():
+    """Ids of every property in the directory, in order."""
+    from .models import Property
+    return [pid for (pid,) in Property.query.with_entities(Property.id).order_by(Property.id)]
+
+
+def _select_property():
+    """before_request: the ``property`` query/form parameter picks the request's shard."""
+    property_id = request.values.get("property", type=int)
+    if property_id is None:
+        return None
+    # un id desconocido no debe crear un fichero de base de datos nuevo
+    if not current_app.extensions["shard_router"].exists(property_id):
+        abort(404)
+    g.shard = property_id
+
+
+def _keep_property(endpoint, values):
+    """url_defaults: links, form actions and redirects built in a property's request stay in it."""
+    shard = current_shard()
+    if shard is not None and endpoint != "static":
+        values.setdefault("property", shard)
+
+
+def init_sharding(app, db):
+    """Attach the ``ShardRouter``, the per-request property selection and the property-keeping URLs."""
+    router = ShardRouter(app, db)
+    app.extensions["shard_router"] = router
+    app.before_request(_select_property)
+    app.url_defaults(_keep_property)
+    return router
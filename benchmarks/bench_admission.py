@@ -0,0 +1,118 @@
+"""Flash-sale load test: booking latency and rejections with and without admission control.
+
+Usage: python -m benchmarks.bench_admission [--clients 4] [--surge 10] [--per-client 10]
+                                            [--hot-rooms 5] [--backend thread|file]
+
+Serves the app from a threaded WSGI server and has ``--clients`` client
+threads, then ``--surge`` times as many, POST /reserve for ``--hot-rooms``
+rooms over a few nights, ``--per-client`` bookings each, like the first
+minute of a sale. Each load runs against a fresh database with
+ADMISSION_CONTROL off and on. Reports p50/p95/p99/max latency, the responses
+by status (302 is a booking made or refused as unavailable, 429/503 a fast
+rejection, 500 a failure such as a busy SQLite) and the bookings stored.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import numpy as np
+from tabulate import tabulate
+from werkzeug.serving import make_server
+
+from app import create_app, db
+from app.models import Reservation
+from benchmarks.bench_load import HttpClient
+from benchmarks.seed import PASSWORD, seed_hotel
+
+SALE_START = date(2031, 1, 1)
+STATUSES = (302, 429, 503, 500)
+
+
+def flash_sale(port, clients, per_client, hot_rooms, seed):
+    """Latencies (s) and status counts of ``clients`` threads booking the hot rooms at once."""
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+
+    def worker(index):
+        rng = np.random.default_rng(seed + index)
+        client = HttpClient(port)
+        client.open('POST', '/login', {'username': f'user{index % 100 + 1}', 'password': PASSWORD})
+        ready.wait()
+        mine, seen = [], Counter()
+        for _ in range(per_client):
+            checkin = SALE_START + timedelta(days=int(rng.integers(0, 7)))
+            form = {'room_id': int(rng.integers(1, hot_rooms + 1)), 'checkin': checkin.isoformat(),
+                    'checkout': (checkin + timedelta(days=int(rng.integers(1, 3)))).isoformat()}
+            t0 = time.perf_counter()
+            seen[client.open('POST', '/reserve', form)] += 1
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+            statuses.update(seen)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def run(tmp, name, admission, clients, args):
+    path = os.path.join(tmp, f'{name}.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+                      'ADMISSION_CONTROL': admission, 'ADMISSION_BACKEND': args.backend,
+                      'ADMISSION_LOCK_DIR': os.path.join(tmp, f'{name}-locks')})
+    with app.app_context():
+        seed_hotel(100)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        latencies, statuses, elapsed = flash_sale(server.server_port, clients, args.per_client, args.hot_rooms, seed=7)
+    finally:
+        server.shutdown()
+    with app.app_context():
+        booked = Reservation.query.filter(Reservation.checkin >= SALE_START).count()
+        db.engine.dispose()
+    return latencies, statuses, elapsed, booked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--surge', type=int, default=10, help='multiplier of --clients for the peak load')
+    parser.add_argument('--per-client', type=int, default=10, help='booking attempts per client thread')
+    parser.add_argument('--hot-rooms', type=int, default=5)
+    parser.add_argument('--backend', choices=('thread', 'file'), default='thread')
+    args = parser.parse_args(argv)
+
+    logging.getLogger('app.instrumentation').setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for clients in (args.clients, args.clients * args.surge):
+            for admission in (False, True):
+                name = f"{clients}-{'on' if admission else 'off'}"
+                latencies, statuses, elapsed, booked = run(tmp, name, admission, clients, args)
+                ms = np.asarray(latencies) * 1000
+                p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+                other = sum(n for status, n in statuses.items() if status not in STATUSES)
+                rows.append([clients, 'on' if admission else 'off', f'{p50:.1f}', f'{p95:.1f}', f'{p99:.1f}',
+                             f'{ms.max():.1f}', *(statuses[s] for s in STATUSES), other, booked,
+                             f'{len(latencies) / elapsed:.1f}'])
+    print(f'{args.per_client} attempts per client on {args.hot_rooms} rooms, {args.backend} backend')
+    print(tabulate(rows, headers=['clients', 'admission', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms',
+                                  *map(str, STATUSES), 'other', 'booked', 'req/s'],
+                   disable_numparse=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Occupancy reports from the daily rollup vs aggregating the raw booking tables.
+
+Usage: python -m benchmarks.bench_analytics [--rooms 1000] [--stays 55] [--repeat 20]
+
+Seeds a database with ``rooms`` rooms and ``stays`` non-overlapping stays per
+room (about a year of bookings with the defaults), builds the rollup once
+with rebuild_rollups and times each report against a GROUP BY over
+``RoomNight`` answering the same per-type question.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+from sqlalchemy import func, insert
+from tabulate import tabulate
+
+from app import create_app, db
+from app.analytics import occupancy_report, rebuild_rollups
+from app.availability import rebuild_room_nights
+from app.models import Reservation, Room, RoomNight
+from generadores import chunk_habitaciones, chunk_reservas
+
+
+def timed(repeat, fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def seed(rooms, stays):
+    rng = np.random.default_rng(42)
+    room_rows = chunk_habitaciones(rng, 0, rooms).drop(columns='id')
+    db.session.execute(insert(Room), room_rows.to_dict('records'))
+    res = chunk_reservas(rng, 0, rooms, stays=stays, start_date='2025-01-01', users=1)
+    res['checkin'] = [date.fromisoformat(d) for d in res['checkin']]
+    res['checkout'] = [date.fromisoformat(d) for d in res['checkout']]
+    res['timestamp'] = None
+    db.session.execute(insert(Reservation), res.drop(columns='id').to_dict('records'))
+    db.session.commit()
+    return rebuild_room_nights()
+
+
+def raw_by_type(start, end):
+    return (
+        db.session.query(Room.type, func.count())
+        .join(RoomNight, RoomNight.room_id == Room.id)
+        .filter(RoomNight.night >= start, RoomNight.night < end)
+        .group_by(Room.type)
+        .all()
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--stays', type=int, default=55)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            room_nights = seed(args.rooms, args.stays)
+            start = time.perf_counter()
+            rollup_rows = rebuild_rollups()
+            rebuild_s = time.perf_counter() - start
+
+            year = (date(2025, 1, 1), date(2026, 1, 1))
+            rows = [
+                ['raw GROUP BY over RoomNight, per type (before)', timed(args.repeat, lambda: raw_by_type(*year))],
+                ['rollup report, per night', timed(args.repeat, lambda: occupancy_report(*year, by='night'))],
+                ['rollup report, per type', timed(args.repeat, lambda: occupancy_report(*year, by='type'))],
+                ['rollup report, per month', timed(args.repeat, lambda: occupancy_report(*year, by='month'))],
+            ]
+    print(tabulate(rows, headers=['query (one year)', 'ms'], floatfmt='.1f'))
+    print(f'{room_nights:,} room-nights -> {rollup_rows:,} rollup rows, rebuilt in {rebuild_s:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
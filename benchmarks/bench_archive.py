@@ -0,0 +1,90 @@
+"""Hot-table size and latency before and after archiving the checked-out history.
+
+Usage: python -m benchmarks.bench_archive [--reservations 200000] [--keep-days 90] [--batch-size 2000] [--repeat 50]
+
+Seeds a multi-year booking history and times an availability search and the
+first dashboard page against the full hot tables. Then it archives every
+stay checked out more than ``--keep-days`` before the end of the history
+into a separate SQLite file, timing the batches, and times the same requests
+again.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from tabulate import tabulate
+
+from app import create_app, db
+from app.archive import archive_reservations
+from app.models import Reservation, RoomNight
+from benchmarks.seed import PASSWORD, seed_hotel
+
+
+def timed(client, path, repeat, method='GET', form=None):
+    client.open(path, method=method, data=form)
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        client.open(path, method=method, data=form)
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples)) * 1000
+
+
+def measure(app, client, last_night, repeat):
+    checkin = last_night - timedelta(days=20)
+    search = f'/reserve?checkin={checkin}&checkout={checkin + timedelta(days=3)}'
+    with app.app_context():
+        hot = (Reservation.query.count(), RoomNight.query.count())
+    return {
+        'reservations': hot[0], 'nights': hot[1],
+        'search': timed(client, search, repeat),
+        'dashboard': timed(client, '/dashboard', repeat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reservations', type=int, default=200_000)
+    parser.add_argument('--keep-days', type=int, default=90)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    logging.getLogger('app.instrumentation').setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'hot.db')}",
+                          'ARCHIVE_DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'archive.db')}"})
+        with app.app_context():
+            info = seed_hotel(args.reservations, users=20)
+        last_night = date.fromisoformat(info['last_night'])
+        client = app.test_client()
+        client.post('/login', data={'username': 'user1', 'password': PASSWORD})
+
+        before = measure(app, client, last_night, args.repeat)
+        with app.app_context():
+            start = time.perf_counter()
+            moved = archive_reservations(last_night - timedelta(days=args.keep_days), batch_size=args.batch_size)
+            archive_s = time.perf_counter() - start
+        after = measure(app, client, last_night, args.repeat)
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+    batches = max(1, -(-moved // args.batch_size))
+    print(f"history: {info['reservations']:,} reservations over {info['rooms']:,} rooms up to {last_night}")
+    print(f"archived {moved:,} in {archive_s:.1f} s ({moved / archive_s:,.0f}/s, "
+          f"{1000 * archive_s / batches:.0f} ms per batch of {args.batch_size:,})")
+    print(tabulate([
+        ['reservation rows', f"{before['reservations']:,}", f"{after['reservations']:,}"],
+        ['room_night rows', f"{before['nights']:,}", f"{after['nights']:,}"],
+        ['search p50 (ms)', f"{before['search']:.2f}", f"{after['search']:.2f}"],
+        ['dashboard p50 (ms)', f"{before['dashboard']:.2f}", f"{after['dashboard']:.2f}"],
+    ], headers=['hot tables', 'before', 'after archiving'], colalign=('left', 'right', 'right'), disable_numparse=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Flexible-date search: one occupancy-matrix pass vs one availability query per candidate date.
+
+Usage: python -m benchmarks.bench_flexible [--rooms 2000] [--stays 50] [--tolerance 15] [--nights 3] [--repeat 20]
+
+Seeds ``rooms`` rooms with ``stays`` stays each, then looks for a
+``nights``-night stay within +-``tolerance`` days (a 30-day window with the
+defaults) of a date in the middle of the booked period.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from tabulate import tabulate
+
+from app import create_app, db
+from app.availability import available_rooms_query, flexible_search
+from benchmarks.seed import START_DATE, seed_hotel
+
+
+def per_date_search(checkin, nights, tolerance):
+    """What the guest does by hand today: one search per candidate check-in date."""
+    found = {}
+    for offset in range(-tolerance, tolerance + 1):
+        day = checkin + timedelta(days=offset)
+        for room in available_rooms_query(None, day, day + timedelta(days=nights)):
+            found.setdefault(room.type, []).append((abs(offset), room.number))
+    return found
+
+
+def timed(repeat, fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=2000)
+    parser.add_argument('--stays', type=int, default=50)
+    parser.add_argument('--tolerance', type=int, default=15)
+    parser.add_argument('--nights', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    logging.getLogger('app.instrumentation').setLevel(logging.ERROR)  # la siembra dispara el log de lentas
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'flex.db')}"})
+        with app.app_context():
+            info = seed_hotel(args.rooms * args.stays, stays_per_room=args.stays)
+            first = date.fromisoformat(START_DATE)
+            middle = first + (date.fromisoformat(info['last_night']) - first) / 2
+            rows = [
+                [f'{2 * args.tolerance + 1} searches, one per date (before)',
+                 timed(max(1, args.repeat // 10), lambda: per_date_search(middle, args.nights, args.tolerance))],
+                ['flexible_search, one pass',
+                 timed(args.repeat, lambda: flexible_search(middle, args.nights, args.tolerance))],
+            ]
+            windows = flexible_search(middle, args.nights, args.tolerance)
+            db.engine.dispose()
+    print(tabulate(rows, headers=[f"{info['rooms']:,} rooms, +-{args.tolerance} days", 'ms'], floatfmt='.1f'))
+    for rtype, found in windows.items():
+        best = found[0] if found else None
+        print(f"{rtype}: {best['number']} from {best['checkin']} (offset {best['offset']:+d})" if best else
+              f'{rtype}: nothing free')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""Load test of the hot paths: availability search, booking, login and dashboard.
+
+Usage: python -m benchmarks.bench_load [--scale small|medium|large] [--reservations N]
+                                       [--requests 300] [--logins 30] [--concurrency 8]
+                                       [--drivers client,wsgi] [--out results.json]
+                                       [--compare baseline.json] [--max-regression 0.2]
+
+Seeds a fresh database (100, 10k or 1M reservations), then runs every
+scenario through the Flask test client (in-process, one request at a time)
+and through a threaded WSGI server driven by ``--concurrency`` client
+threads. Reports p50/p95/p99 latency and requests per second, and writes
+them to a JSON file. With ``--compare`` the run is checked against an
+earlier file and the exit status is 1 when any p95 got worse by more than
+``--max-regression``.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+import numpy as np
+from tabulate import tabulate
+from werkzeug.serving import make_server
+
+from app import create_app, db
+from benchmarks.seed import PASSWORD, SCALES, START_DATE, seed_hotel
+
+SCENARIOS = ('search', 'book', 'login', 'dashboard')
+ROOM_TYPES = ('', 'Single', 'Double', 'Suite')
+
+
+class Workload:
+    """Deterministic request generator for one client: ``request(scenario)`` -> (method, path, form)."""
+
+    def __init__(self, info, seed):
+        self.rng = np.random.default_rng(seed)
+        self.rooms = info['rooms']
+        self.users = info['users']
+        self.first = date.fromisoformat(START_DATE)
+        self.span = max(1, (date.fromisoformat(info['last_night']) - self.first).days)
+
+    def _window(self, start, span):
+        checkin = start + timedelta(days=int(self.rng.integers(0, span)))
+        return checkin, checkin + timedelta(days=int(self.rng.integers(1, 8)))
+
+    def user(self):
+        return f'user{int(self.rng.integers(1, self.users + 1))}'
+
+    def request(self, scenario):
+        if scenario == 'search':
+            checkin, checkout = self._window(self.first, self.span)
+            query = urlencode({'type': ROOM_TYPES[self.rng.integers(len(ROOM_TYPES))],
+                               'checkin': checkin.isoformat(), 'checkout': checkout.isoformat()})
+            return 'GET', f'/reserve?{query}', None
+        if scenario == 'book':
+            # más allá del histórico sembrado, para que la mayoría de reservas se acepten
+            checkin, checkout = self._window(self.first + timedelta(days=self.span + 1), 3650)
+            return 'POST', '/reserve', {'room_id': int(self.rng.integers(1, self.rooms + 1)),
+                                        'checkin': checkin.isoformat(), 'checkout': checkout.isoformat()}
+        if scenario == 'login':
+            return 'POST', '/login', {'username': self.user(), 'password': PASSWORD}
+        return 'GET', '/dashboard', None
+
+
+def _ok(status):
+    return status < 400
+
+
+def summarize(latencies, errors, elapsed):
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+    return {
+        'requests': len(latencies), 'errors': errors,
+        'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def run_test_client(app, info, scenario, n):
+    client = app.test_client()
+    workload = Workload(info, seed=1)
+    if scenario != 'login':
+        client.post('/login', data={'username': 'user1', 'password': PASSWORD})
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for _ in range(n):
+        method, path, form = workload.request(scenario)
+        t0 = time.perf_counter()
+        resp = client.open(path, method=method, data=form)
+        latencies.append(time.perf_counter() - t0)
+        errors += not _ok(resp.status_code)
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+class HttpClient:
+    """Keep-alive HTTP client with a session cookie, one per load thread."""
+
+    def __init__(self, port):
+        self.port = port
+        self.cookie = None
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def open(self, method, path, form=None):
+        body = urlencode(form) if form else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in range(2):
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                resp = self.conn.getresponse()
+                resp.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # el servidor cerró la conexión keep-alive: reconectar una vez
+                self.conn.close()
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+                if attempt:
+                    raise
+        set_cookie = resp.getheader('Set-Cookie')
+        if set_cookie:
+            self.cookie = set_cookie.split(';', 1)[0]
+        return resp.status
+
+
+def run_wsgi(port, info, scenario, n, concurrency):
+    per_thread = [n // concurrency + (i < n % concurrency) for i in range(concurrency)]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    ready = threading.Barrier(concurrency + 1)
+
+    def worker(index, count):
+        client = HttpClient(port)
+        workload = Workload(info, seed=100 + index)
+        if scenario != 'login':
+            client.open('POST', '/login', {'username': workload.user(), 'password': PASSWORD})
+        ready.wait()
+        mine, failed = [], 0
+        for _ in range(count):
+            method, path, form = workload.request(scenario)
+            t0 = time.perf_counter()
+            status = client.open(method, path, form)
+            mine.append(time.perf_counter() - t0)
+            failed += not _ok(status)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i, c)) for i, c in enumerate(per_thread)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, max_regression):
+    """Rows comparing p95 and RPS with ``baseline``; returns (rows, regressed keys)."""
+    rows, regressed = [], []
+    for key, now in current['results'].items():
+        before = baseline.get('results', {}).get(key)
+        if not before:
+            continue
+        change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        if change > max_regression:
+            regressed.append(key)
+        rows.append([key, before['p95_ms'], now['p95_ms'], f'{change:+.0%}', before['rps'], now['rps']])
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--reservations', type=int, default=None, help='overrides --scale')
+    parser.add_argument('--requests', type=int, default=300, help='requests per scenario and driver')
+    parser.add_argument('--logins', type=int, default=30, help='requests for the (CPU-bound) login scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--drivers', default='client,wsgi')
+    parser.add_argument('--out', default='bench_load.json')
+    parser.add_argument('--compare', default=None, help='earlier results file to check for regressions')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='allowed relative p95 increase')
+    args = parser.parse_args(argv)
+
+    reservations = args.reservations or SCALES[args.scale]
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    drivers = [d for d in args.drivers.split(',') if d]
+    results = {}
+
+    # el log de consultas lentas se dispara con la contención de escritura y taparía la tabla
+    logging.getLogger('app.instrumentation').setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'load.db')}"})
+        with app.app_context():
+            start = time.perf_counter()
+            info = seed_hotel(reservations)
+            seed_s = time.perf_counter() - start
+        print(f"seeded {info['reservations']:,} reservations / {info['rooms']:,} rooms in {seed_s:.1f} s")
+
+        server = None
+        if 'wsgi' in drivers:
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)  # sin una línea de log por petición
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            for scenario in scenarios:
+                n = args.logins if scenario == 'login' else args.requests
+                if 'client' in drivers:
+                    results[f'client/{scenario}'] = run_test_client(app, info, scenario, n)
+                if server is not None:
+                    results[f'wsgi/{scenario}'] = run_wsgi(server.server_port, info, scenario, n, args.concurrency)
+        finally:
+            if server is not None:
+                server.shutdown()
+            with app.app_context():
+                db.engine.dispose()
+
+    report = {
+        'meta': {
+            'reservations': info['reservations'], 'rooms': info['rooms'], 'concurrency': args.concurrency,
+            'commit': _git_commit(), 'python': platform.python_version(), 'cpus': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    rows = [[key, r['requests'], r['errors'], r['p50_ms'], r['p95_ms'], r['p99_ms'], r['rps']]
+            for key, r in results.items()]
+    print(tabulate(rows, headers=['driver/scenario', 'requests', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s']))
+    with open(args.out, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f'results written to {args.out}')
+
+    if args.compare:
+        with open(args.compare) as fh:
+            rows, regressed = compare(report, json.load(fh), args.max_regression)
+        print(tabulate(rows, headers=['driver/scenario', 'p95 before', 'p95 now', 'change', 'req/s before',
+                                      'req/s now']))
+        if regressed:
+            print(f"p95 regressed more than {args.max_regression:.0%}: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Login and authenticated page-view throughput, before and after the user cache.
+
+Usage: python -m benchmarks.bench_login [--logins 20] [--views 500] [--method pbkdf2:sha256:600000]
+
+"before" reproduces the previous setup (werkzeug's default PBKDF2 cost and a
+database lookup in ``load_user`` on every request); "after" uses the given
+hash method and the user loader cache.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from tabulate import tabulate
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import User
+
+
+def _rate(n, fn):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+def run_scenario(method, user_cache, logins, views):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'PASSWORD_HASH_METHOD': method,
+            'USER_CACHE': user_cache,
+        })
+        with app.app_context():
+            db.session.add(User(username='bench', password=generate_password_hash('secret', method=method)))
+            db.session.commit()
+
+        client = app.test_client()
+        credentials = {'username': 'bench', 'password': 'secret'}
+        logins_per_s = _rate(logins, lambda: client.post('/login', data=credentials))
+        views_per_s = _rate(views, lambda: client.get('/dashboard'))
+
+        with app.app_context():
+            db.engine.dispose()
+    return logins_per_s, views_per_s
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--views', type=int, default=500)
+    parser.add_argument('--method', default='pbkdf2:sha256:600000', help='PASSWORD_HASH_METHOD for "after"')
+    args = parser.parse_args(argv)
+
+    rows = []
+    for name, method, cache in (('before', 'pbkdf2:sha256', False), ('after', args.method, True)):
+        logins_per_s, views_per_s = run_scenario(method, cache, args.logins, args.views)
+        rows.append([name, method, 'on' if cache else 'off', f'{logins_per_s:.1f}', f'{views_per_s:.1f}'])
+    print(tabulate(rows, headers=['scenario', 'hash method', 'user cache', 'logins/s', 'page views/s']))
+
+
+if __name__ == '__main__':
+    main()
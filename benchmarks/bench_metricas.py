@@ -0,0 +1,81 @@
+"""Exit-criteria evaluation on a growing defect history: full recompute vs incremental engine.
+
+Usage: python -m benchmarks.bench_metricas [--rows 10000000] [--batches 10] [--batch-size 10000]
+
+"full" is the previous MetricasTesting behaviour: every new batch is appended
+to the DataFrame and the exit criteria re-run groupby('day'), the rolling
+window and the status scan over the whole history. "incremental" ingests the
+batch into MetricasIncrementales and answers from the running aggregates.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from sistema_metricas import MetricasIncrementales
+
+STATUSES = np.array(['OPEN', 'IN_PROGRESS', 'CLOSED'], dtype=object)
+
+
+def synthetic_defects(n, rng, first_day=0, days=365):
+    return pd.DataFrame({
+        'day': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(first_day, first_day + days, n), unit='D'),
+        'severity': rng.integers(1, 11, n),
+        'occurrence': rng.integers(1, 11, n),
+        'detection': rng.integers(1, 11, n),
+        'status': STATUSES[rng.integers(0, 3, n)],
+    })
+
+
+def full_recompute(df, window=7):
+    """Exit criteria exactly as MetricasTesting computed them before the incremental engine."""
+    open_count = int((df['status'] != 'CLOSED').sum())
+    daily = df.groupby('day').size().rename('defects').sort_index()
+    roll = daily.rolling(window=window, min_periods=1).mean()
+    return open_count, float(roll.iloc[-1]), float(roll.iloc[-2])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    history = synthetic_defects(args.rows, rng)
+    batches = [synthetic_defects(args.batch_size, rng, first_day=365 + i, days=1) for i in range(args.batches)]
+
+    start = time.perf_counter()
+    motor = MetricasIncrementales.desde_df(history)
+    build_s = time.perf_counter() - start
+
+    full_s = incr_s = 0.0
+    df = history
+    for batch in batches:
+        start = time.perf_counter()
+        df = pd.concat([df, batch], ignore_index=True)
+        expected = full_recompute(df)
+        full_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        motor.ingest(batch)
+        res = motor.criterios_salida(90.0, args.rows)
+        incr_s += time.perf_counter() - start
+
+        got = (res['details']['open_defects'], res['details']['trend_last'], res['details']['trend_prev'])
+        assert got[0] == expected[0] and np.allclose(got[1:], expected[1:]), (got, expected)
+
+    n = max(args.batches, 1)
+    print(tabulate([
+        ['full recompute', '-', f'{1000 * full_s / n:.2f}'],
+        ['incremental', f'{build_s:.2f}', f'{1000 * incr_s / n:.3f}'],
+    ], headers=['engine', 'initial build (s)', 'per batch + exit criteria (ms)']))
+    print(f'speed-up per batch: {full_s / incr_s:.0f}x over {args.rows:,} rows')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Render CPU and bytes on the wire for large availability listings and dashboards.
+
+Usage: python -m benchmarks.bench_render [--rooms 5000] [--reservations 1000] [--searches 20] [--repeat 10]
+
+Seeds ``--rooms`` rooms and one user with ``--reservations`` bookings, then
+requests ``--searches`` different /reserve listings ``--repeat`` times each
+and a dashboard page showing every booking, under five setups: plain
+rendering, cached fragments, fragments plus gzip, fragments plus gzip with
+streamed rendering, and streaming alone (every request a fragment miss).
+Reports the median CPU time per request, the bytes
+sent and, for the listing, the time to the first body chunk.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+from tabulate import tabulate
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import Reservation, Room, RoomNight, User
+
+SETUPS = {
+    'plain render': {'FRAGMENT_CACHE': False, 'COMPRESSION': False, 'STREAM_MIN_ROWS': 0},
+    'fragments': {'FRAGMENT_CACHE': True, 'COMPRESSION': False, 'STREAM_MIN_ROWS': 0},
+    'fragments + gzip': {'FRAGMENT_CACHE': True, 'COMPRESSION': True, 'STREAM_MIN_ROWS': 0},
+    'fragments + gzip, streamed': {'FRAGMENT_CACHE': True, 'COMPRESSION': True, 'STREAM_MIN_ROWS': 500},
+    'gzip, streamed, no fragments': {'FRAGMENT_CACHE': False, 'COMPRESSION': True, 'STREAM_MIN_ROWS': 500},
+}
+TYPES = ('Single', 'Double', 'Suite')
+
+
+def seed(rooms, reservations):
+    db.session.add(User(id=1, username='bench', password=generate_password_hash('bench', method='pbkdf2:sha256:1000')))
+    db.session.execute(insert(Room), [{'id': i, 'number': str(1000 + i), 'type': TYPES[i % 3], 'available': True}
+                                      for i in range(1, rooms + 1)])
+    start = date(2031, 1, 1)
+    stays = [{'id': i, 'user_id': 1, 'room_id': i % rooms + 1, 'checkin': start + timedelta(days=i),
+              'checkout': start + timedelta(days=i + 1)} for i in range(1, reservations + 1)]
+    db.session.execute(insert(Reservation), stays)
+    db.session.execute(insert(RoomNight), [{'room_id': s['room_id'], 'night': s['checkin'], 'reservation_id': s['id']}
+                                           for s in stays])
+    db.session.commit()
+
+
+def timed(client, paths, repeat, headers):
+    """Median CPU ms and mean response bytes over ``repeat`` rounds of ``paths`` (after one warm-up round)."""
+    cpu, size, first_chunk = [], [], []
+    for round_ in range(repeat + 1):
+        for path in paths:
+            t0, c0 = time.perf_counter(), time.process_time()
+            response = client.get(path, headers=headers, buffered=False)
+            chunks = iter(response.response)
+            first = next(chunks, b'')
+            ttfb = time.perf_counter() - t0
+            body = first + b''.join(chunks)
+            response.close()
+            if round_:
+                cpu.append(time.process_time() - c0)
+                size.append(len(body))
+                first_chunk.append(ttfb)
+    return float(np.median(cpu)) * 1000, float(np.mean(size)), float(np.median(first_chunk)) * 1000
+
+
+def run(tmp, setup, args):
+    config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'render.db')}",
+              'DASHBOARD_PAGE_SIZE': args.reservations, 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000', **setup}
+    app = create_app(config)
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+    client.get('/dashboard')  # el flash del login solo sale una vez
+    first = date(2030, 1, 1)
+    searches = [f'/reserve?checkin={first + timedelta(days=i)}&checkout={first + timedelta(days=i + 2)}'
+                for i in range(args.searches)]
+    headers = {'Accept-Encoding': 'gzip'}
+    listing = timed(client, searches, args.repeat, headers)
+    dashboard = timed(client, ['/dashboard'], args.repeat, headers)
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    return listing, dashboard
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=5000)
+    parser.add_argument('--reservations', type=int, default=1000)
+    parser.add_argument('--searches', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    logging.getLogger('app.instrumentation').setLevel(logging.ERROR)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'render.db')}"})
+        with app.app_context():
+            seed(args.rooms, args.reservations)
+            db.engine.dispose()
+        for name, setup in SETUPS.items():
+            (l_cpu, l_bytes, l_ttfb), (d_cpu, d_bytes, _) = run(tmp, setup, args)
+            rows.append([name, f'{l_cpu:.1f}', f'{l_bytes / 1024:,.1f}', f'{l_ttfb:.1f}',
+                         f'{d_cpu:.1f}', f'{d_bytes / 1024:,.1f}'])
+    print(f'{args.rooms:,} rooms listed per search, {args.reservations:,} bookings on the dashboard')
+    print(tabulate(rows, headers=['setup', 'listing CPU (ms)', 'listing KiB', 'first chunk (ms)',
+                                  'dashboard CPU (ms)', 'dashboard KiB'],
+                   colalign=('left', 'right', 'right', 'right', 'right', 'right'), disable_numparse=True))
+
+
+if __name__ == '__main__':
+    main()
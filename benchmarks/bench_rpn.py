@@ -0,0 +1,91 @@
+"""RPN risk ranking: pandas full sort / groupby / pivot vs the running MotorRPN aggregates.
+
+Usage: python -m benchmarks.bench_rpn [--rows 50000000] [--batch-size 5000000] [--baseline-rows 5000000] [--k 20]
+
+The baseline computes the RPN column, sorts the open defects to take the top
+``k``, runs ``groupby('day').quantile`` and a severity x occurrence
+``pivot_table`` on ``--baseline-rows`` rows held in memory. The engine streams
+``--rows`` rows in batches (generation time excluded), and its answers on the
+baseline sample are checked against pandas.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from sistema_metricas import MotorRPN, calcular_rpn
+
+STATUSES = ['OPEN', 'IN_PROGRESS', 'CLOSED']
+QUANTILES = (50, 90, 99)
+
+
+def synthetic_defects(n, rng, first_id=0, days=365):
+    return pd.DataFrame({
+        'id': np.arange(first_id, first_id + n, dtype=np.int64),
+        'day': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, days, n), unit='D'),
+        'severity': rng.integers(1, 11, n, dtype=np.int8),
+        'occurrence': rng.integers(1, 11, n, dtype=np.int8),
+        'detection': rng.integers(1, 11, n, dtype=np.int8),
+        'status': pd.Categorical.from_codes(rng.integers(0, 3, n), categories=STATUSES),
+    })
+
+
+def pandas_baseline(df, k):
+    df = df.assign(rpn=calcular_rpn(df))
+    top = df[df['status'] != 'CLOSED'].sort_values(['rpn', 'id'], ascending=[False, True]).head(k)
+    percentiles = df.groupby('day')['rpn'].quantile([q / 100 for q in QUANTILES]).unstack()
+    matrix = df.pivot_table(index='severity', columns='occurrence', values='rpn', aggfunc='mean', observed=True)
+    return top, percentiles, matrix
+
+
+def engine_answers(motor, k):
+    return motor.top_abiertos(k), motor.percentiles_diarios(QUANTILES), motor.matriz_riesgo('rpn_medio')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000_000)
+    parser.add_argument('--batch-size', type=int, default=5_000_000)
+    parser.add_argument('--baseline-rows', type=int, default=5_000_000)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+
+    sample = synthetic_defects(args.baseline_rows, rng)
+    start = time.perf_counter()
+    expected = pandas_baseline(sample, args.k)
+    baseline_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    motor = MotorRPN()
+    motor.ingest(sample)
+    got = engine_answers(motor, args.k)
+    sample_s = time.perf_counter() - start
+    assert (got[0]['id'].to_numpy() == expected[0]['id'].to_numpy()).all()
+    assert np.allclose(got[1].to_numpy(), expected[1].to_numpy())
+    assert np.allclose(got[2].to_numpy(), expected[2].to_numpy())
+    del sample
+
+    motor, ingest_s = MotorRPN(), 0.0
+    for first in range(0, args.rows, args.batch_size):
+        batch = synthetic_defects(min(args.batch_size, args.rows - first), rng, first_id=first)
+        start = time.perf_counter()
+        motor.ingest(batch)
+        ingest_s += time.perf_counter() - start
+    start = time.perf_counter()
+    top, _, _ = engine_answers(motor, args.k)
+    answer_ms = (time.perf_counter() - start) * 1000
+
+    print(tabulate([
+        ['pandas sort + groupby + pivot', f'{args.baseline_rows:,}', f'{baseline_s:.2f}', '-'],
+        ['MotorRPN', f'{args.baseline_rows:,}', f'{sample_s:.2f}', '-'],
+        ['MotorRPN, streamed', f'{args.rows:,}', f'{ingest_s:.2f}', f'{answer_ms:.1f}'],
+    ], headers=['engine', 'rows', 'build + answer (s)', 'answers from aggregates (ms)']))
+    print(f"highest open RPN: {motor.max_rpn_abierto()}, top-{args.k} ids start {top['id'].head(3).tolist()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Booking write throughput: one shared database file vs one shard per property.
+
+Usage: python -m benchmarks.bench_shards [--properties 1,2,4,8] [--bookings 300] [--rooms 50]
+
+For every property count P it starts P writer processes; each books
+``--bookings`` one-night stays through ``book_room``. In the shared layout
+all writers book distinct rooms of the main database, so they only compete
+for SQLite's single write lock. In the sharded layout writer i books in
+property i's shard. Reports bookings per second and the speed-up of the
+shards over the shared file; with fewer CPU cores than writers the shards
+stop scaling at the core count.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import date, timedelta
+
+from tabulate import tabulate
+
+from app import create_app, db
+from app.booking import book_room
+from app.models import Property, Room, User
+from app.sharding import using_property
+
+
+def make_app(tmp):
+    return create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'main.db')}",
+                       'SHARD_URL_TEMPLATE': f"sqlite:///{os.path.join(tmp, 'property_{property}.db')}"})
+
+
+def _add_rooms(count, first_number=1):
+    db.session.add_all([Room(number=str(first_number + i), type='Single', available=True) for i in range(count)])
+    db.session.commit()
+
+
+def prepare(tmp, writers, rooms):
+    app = make_app(tmp)
+    with app.app_context():
+        db.session.add(User(username='bench', password='-'))
+        db.session.add_all([Property(name=f'hotel {i}') for i in range(1, writers + 1)])
+        db.session.commit()
+        # disposición compartida: cada escritor tiene su bloque de habitaciones en la base principal
+        _add_rooms(rooms * writers)
+        for property_id in range(1, writers + 1):
+            with using_property(property_id):
+                _add_rooms(rooms)
+        for engine in db.engines.values():
+            engine.dispose()
+        app.extensions['shard_router'].dispose()
+
+
+def writer(tmp, index, sharded, bookings, rooms, start, results):
+    logging.getLogger('app.instrumentation').setLevel(logging.ERROR)
+    app = make_app(tmp)
+    first_room = 1 if sharded else index * rooms + 1
+    with app.app_context():
+        with using_property(index + 1) if sharded else nullcontext():
+            start.wait()
+            t0 = time.perf_counter()
+            for n in range(bookings):
+                checkin = date(2030, 1, 1) + timedelta(days=n // rooms)
+                book_room(1, first_room + n % rooms, checkin, checkin + timedelta(days=1), retries=50)
+            results.put(time.perf_counter() - t0)
+
+
+def run(writers, sharded, bookings, rooms):
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare(tmp, writers, rooms)
+        ctx = multiprocessing.get_context('spawn')
+        start, results = ctx.Barrier(writers + 1), ctx.Queue()
+        procs = [ctx.Process(target=writer, args=(tmp, i, sharded, bookings, rooms, start, results))
+                 for i in range(writers)]
+        for proc in procs:
+            proc.start()
+        start.wait()
+        t0 = time.perf_counter()
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - t0
+        if any(proc.exitcode for proc in procs):
+            raise SystemExit('a writer failed')
+    return writers * bookings / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--properties', default='1,2,4,8')
+    parser.add_argument('--bookings', type=int, default=300, help='bookings per writer')
+    parser.add_argument('--rooms', type=int, default=50, help='rooms per property')
+    args = parser.parse_args(argv)
+
+    logging.getLogger('app.instrumentation').setLevel(logging.ERROR)
+    rows, base = [], None
+    for writers in (int(p) for p in args.properties.split(',')):
+        shared = run(writers, False, args.bookings, args.rooms)
+        sharded = run(writers, True, args.bookings, args.rooms)
+        base = base or sharded
+        rows.append([writers, f'{shared:,.0f}', f'{sharded:,.0f}', f'{sharded / shared:.2f}x',
+                     f'{sharded / base:.2f}x'])
+    print(f'{os.cpu_count()} CPU core(s), {args.bookings} bookings per writer')
+    print(tabulate(rows, headers=['properties / writers', 'shared file (bookings/s)', 'shards (bookings/s)',
+                                  'shards vs shared', 'shards vs 1 property'],
+                   colalign=('right', 'right', 'right', 'right', 'right'), disable_numparse=True))
+
+
+if __name__ == '__main__':
+    main()
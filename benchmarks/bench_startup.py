@@ -0,0 +1,123 @@
+"""Cold start and per-worker memory, before and after the production entry point.
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--workers 4]
+
+"before" boots the way run.py did: ``create_app()`` running the schema
+creation on every boot and compiling each template on its first request.
+"after" imports ``wsgi`` (schema creation off, templates precompiled, Jinja
+bytecode cache on disk). Each boot runs in a fresh interpreter and is timed
+up to the first served request. Memory is read from /proc for the workers of
+``python wsgi.py``: RSS, PSS (shared pages split between processes) and USS
+(pages private to the worker), so the copy-on-write sharing of the preloaded
+app is visible. Linux only for the memory part.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from tabulate import tabulate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = r'''
+import json, time
+t0 = time.perf_counter()
+if {after}:
+    import wsgi
+    app = wsgi.app
+else:
+    from app import create_app
+    app = create_app()
+t1 = time.perf_counter()
+app.test_client().get("/login")
+t2 = time.perf_counter()
+print(json.dumps({{"boot": t1 - t0, "first_request": t2 - t1}}))
+'''
+
+
+def cold_start(after, env, runs):
+    boots, firsts, totals = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', BOOT.format(after=after)], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        total = time.perf_counter() - start
+        data = json.loads(out.strip().splitlines()[-1])
+        boots.append(data['boot'])
+        firsts.append(data['first_request'])
+        totals.append(total)
+    return [statistics.median(v) * 1000 for v in (totals, boots, firsts)]
+
+
+def _smaps(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    uss = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values.get('Rss', 0) / 1024, values.get('Pss', 0) / 1024, uss / 1024
+
+
+def worker_memory(env, workers, port=8799, requests=50):
+    server = subprocess.Popen([sys.executable, 'wsgi.py', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f'http://127.0.0.1:{port}/login'
+        start = time.perf_counter()
+        while True:
+            try:
+                urllib.request.urlopen(url).read()
+                break
+            except OSError:
+                if time.perf_counter() - start > 30:
+                    raise RuntimeError('server did not start')
+                time.sleep(0.02)
+        ready_ms = (time.perf_counter() - start) * 1000
+        for _ in range(requests):
+            urllib.request.urlopen(url).read()
+        with open(f'/proc/{server.pid}/task/{server.pid}/children') as fh:
+            children = [int(p) for p in fh.read().split()]
+        rows = [['master', *_smaps(server.pid)]] + [[f'worker {i + 1}', *_smaps(p)] for i, p in enumerate(children)]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return ready_ms, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+                   TEMPLATE_CACHE_DIR=os.path.join(tmp, 'jinja'), PYTHONPATH=ROOT)
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'wsgi', 'init-db'], cwd=ROOT, env=env,
+                       capture_output=True, check=True)
+        before_env = dict(env, AUTO_CREATE_SCHEMA='1')
+        before_env.pop('TEMPLATE_CACHE_DIR')
+        rows = [
+            ['before (create_app + create_all)', *cold_start(False, before_env, args.runs)],
+            ['after (wsgi preload)', *cold_start(True, env, args.runs)],
+        ]
+        print(tabulate(rows, headers=['cold start (median ms)', 'process total', 'app ready', 'first request'],
+                       floatfmt='.1f'))
+
+        if os.path.exists('/proc/self/smaps_rollup'):
+            ready_ms, memory = worker_memory(env, args.workers)
+            print()
+            print(tabulate(memory, headers=['process', 'RSS MiB', 'PSS MiB', 'USS MiB'], floatfmt='.1f'))
+            print(f'{args.workers} workers answering after {ready_ms:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
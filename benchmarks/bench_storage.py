@@ -0,0 +1,60 @@
+"""Memory and load time of the defect history: inferred CSV vs typed CSV vs Parquet.
+
+Usage: python -m benchmarks.bench_storage [--rows 50000000] [--days 730] [--last-days 7] [--workdir DIR]
+
+Writes a synthetic defects CSV, converts it once with convertir_a_parquet and
+reports load time and in-memory size (``memory_usage(deep=True)``) for each
+storage path. Parquet needs the optional ``pyarrow`` package.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from tabulate import tabulate
+
+from generadores import generar_defectos
+from sistema_metricas import cargar_parquet, convertir_a_parquet, leer_defectos_csv
+
+def measure(label, load):
+    start = time.perf_counter()
+    df = load()
+    elapsed = time.perf_counter() - start
+    return [label, f'{len(df):,}', f'{elapsed:.2f}', f'{df.memory_usage(deep=True).sum() / 2**20:,.1f}']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000_000)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--last-days', type=int, default=7)
+    parser.add_argument('--workdir', default=None, help='keep generated files here instead of a temp dir')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        csv_path = os.path.join(workdir, 'defects.csv')
+        parquet_dir = os.path.join(workdir, 'defects_parquet')
+        if not os.path.exists(csv_path):
+            generar_defectos(csv_path, args.rows, start_date='2024-01-01', days=args.days, seed=42)
+
+        start = time.perf_counter()
+        if not os.path.exists(parquet_dir):
+            convertir_a_parquet(csv_path, parquet_dir)
+        convert_s = time.perf_counter() - start
+
+        last_day = pd.Timestamp('2024-01-01') + pd.Timedelta(days=args.days - 1)
+        rows = [
+            measure('CSV, inferred dtypes (before)', lambda: pd.read_csv(csv_path, parse_dates=['day'])),
+            measure('CSV, typed columns', lambda: leer_defectos_csv(csv_path)),
+            measure('Parquet, typed columns', lambda: cargar_parquet(parquet_dir)),
+            measure(f'Parquet, last {args.last_days} days', lambda: cargar_parquet(
+                parquet_dir, ultimos_dias=args.last_days, hasta=last_day)),
+        ]
+    print(tabulate(rows, headers=['storage', 'rows', 'load (s)', 'memory (MiB)']))
+    print(f'one-off CSV -> Parquet conversion: {convert_s:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""Vectorized synthetic data generators for load testing.
+
+Both generators run on the same chunk engine (``escribir_en_chunks``): the
+output is split into fixed-size chunks, each chunk is built with NumPy from
+its own seeded ``Generator`` (so the result does not depend on the number of
+workers) and written to a part file, optionally from a process pool. Memory
+is bounded by ``chunksize`` whatever the total size.
+
+    python generadores.py defectos data/defectos.csv --rows 10000000 --workers 4
+    python generadores.py hotel data/fixtures --rooms 2000 --stays 50
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+STATUSES = ('OPEN', 'IN_PROGRESS', 'CLOSED')
+ROOM_TYPES = {'Single': 0.5, 'Double': 0.35, 'Suite': 0.15}
+
+
+def _rng(seed: Optional[int], chunk: int) -> np.random.Generator:
+    """Independent, reproducible stream per chunk."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)) if seed is not None else None)
+
+
+def _weights(weights, size: int) -> Optional[np.ndarray]:
+    if weights is None:
+        return None
+    p = np.asarray(weights, dtype=float)
+    if p.shape != (size,):
+        raise ValueError(f"expected {size} weights, got {p.shape}")
+    return p / p.sum()
+
+
+# ---------------------------
+# MOTOR DE CHUNKS
+# ---------------------------
+def _formato(path: str, formato: Optional[str]) -> str:
+    if formato:
+        return formato
+    return 'parquet' if path.endswith('.parquet') or os.path.splitext(path)[1] == '' else 'csv'
+
+
+def _escribir_parte(generar_chunk: Callable, seed, formato: str, part_dir: str, task) -> str:
+    index, offset, count = task
+    df = generar_chunk(_rng(seed, index), offset, count)
+    part = os.path.join(part_dir, f"part-{index:05d}.{'parquet' if formato == 'parquet' else 'csv'}")
+    if formato == 'parquet':
+        df.to_parquet(part, index=False)
+    else:
+        _to_csv(df, part, header=index == 0)
+    return part
+
+
+def _to_csv(df: pd.DataFrame, path: str, header: bool) -> None:
+    """CSV through pyarrow's writer (an order of magnitude faster than ``DataFrame.to_csv``)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        df.to_csv(path, index=False, header=header)
+        return
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, column in enumerate(table.schema):
+        if pa.types.is_dictionary(column.type):
+            table = table.set_column(i, column.name, table.column(i).cast(pa.string()))
+    with open(path, 'wb') as out:
+        if header:
+            out.write((','.join(df.columns) + '\n').encode())
+        pa_csv.write_csv(table, out, pa_csv.WriteOptions(include_header=False, quoting_style='needed'))
+
+
+def escribir_en_chunks(path: str, total: int, generar_chunk: Callable, chunksize: int = 1_000_000,
+                       workers: int = 1, seed: Optional[int] = None, formato: Optional[str] = None) -> str:
+    """Write ``total`` units generated by ``generar_chunk(rng, offset, count)`` to ``path``.
+
+    CSV output is a single file (the part files are concatenated in order);
+    Parquet output is a directory of ``part-NNNNN.parquet`` files, or a single
+    file when ``path`` ends in ``.parquet`` and everything fits in one chunk.
+    ``generar_chunk`` must be a module-level function (or a ``partial`` of
+    one) when ``workers > 1``. With ``total=0`` the output holds no rows but
+    keeps the columns (CSV header, Parquet schema).
+    """
+    formato = _formato(path, formato)
+    tasks = [(i, offset, min(chunksize, total - offset)) for i, offset in enumerate(range(0, total, chunksize))]
+    if not tasks:
+        # un chunk vacío: el fichero lleva las columnas y los tipos aunque no haya filas
+        tasks = [(0, 0, 0)]
+    single_parquet = formato == 'parquet' and path.endswith('.parquet')
+    if single_parquet and len(tasks) > 1:
+        raise ValueError("a single .parquet file holds one chunk; give a directory path for larger outputs")
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as part_dir:
+        write = partial(_escribir_parte, generar_chunk, seed, formato, part_dir)
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(write, tasks))
+        else:
+            parts = [write(task) for task in tasks]
+
+        if single_parquet or formato == 'csv':
+            target = path
+            if formato == 'csv':
+                with open(path, 'wb') as out:
+                    for part in parts:
+                        with open(part, 'rb') as src:
+                            shutil.copyfileobj(src, out, 16 * 2**20)
+            else:
+                shutil.move(parts[0], path)
+        else:
+            os.makedirs(path, exist_ok=True)
+            for part in parts:
+                shutil.move(part, os.path.join(path, os.path.basename(part)))
+            target = path
+    return target
+
+
+# ---------------------------
+# DEFECTOS
+# ---------------------------
+def chunk_defectos(rng: np.random.Generator, offset: int, count: int, start_date: str = '2025-01-01',
+                   days: int = 30, distribuciones: Optional[Dict[str, Sequence[float]]] = None) -> pd.DataFrame:
+    """``count`` defect rows with ids starting at ``offset + 1``.
+
+    ``distribuciones`` may give weights for ``severity``/``occurrence``/
+    ``detection`` (10 values, for scores 1..10), ``status`` (3 values, for
+    OPEN/IN_PROGRESS/CLOSED) and ``day`` (``days`` values). Missing entries
+    are uniform.
+    """
+    dist = distribuciones or {}
+    ids = np.arange(offset + 1, offset + count + 1, dtype=np.int64)
+    day_offsets = rng.choice(days, size=count, p=_weights(dist.get('day'), days))
+    df = pd.DataFrame({
+        'id': ids,
+        'day': pd.Series(_fechas_iso(start_date, days)[day_offsets], dtype=str),
+    })
+    for column in ('severity', 'occurrence', 'detection'):
+        df[column] = rng.choice(np.arange(1, 11, dtype=np.int8), size=count, p=_weights(dist.get(column), 10))
+    df['description'] = 'Defecto simulado ' + pd.Series(ids).astype(str)
+    df['status'] = pd.Categorical.from_codes(rng.choice(3, size=count, p=_weights(dist.get('status'), 3)),
+                                             categories=list(STATUSES))
+    return df
+
+
+def _fechas_iso(start_date: str, days: int) -> np.ndarray:
+    # formatear sólo los días distintos y luego indexar es mucho más barato que strftime por fila
+    return pd.date_range(start=start_date, periods=days).strftime('%Y-%m-%d').to_numpy(dtype=object)
+
+
+def generar_defectos(path: str, n: int, start_date: str = '2025-01-01', days: int = 30,
+                     distribuciones: Optional[Dict[str, Sequence[float]]] = None, seed: Optional[int] = None,
+                     chunksize: int = 1_000_000, workers: int = 1, formato: Optional[str] = None) -> str:
+    """Write ``n`` synthetic defects to a CSV file or Parquet dataset."""
+    generar = partial(chunk_defectos, start_date=start_date, days=days, distribuciones=distribuciones)
+    return escribir_en_chunks(path, n, generar, chunksize=chunksize, workers=workers, seed=seed, formato=formato)
+
+
+# ---------------------------
+# HOTEL: HABITACIONES Y RESERVAS
+# ---------------------------
+def chunk_habitaciones(rng: np.random.Generator, offset: int, count: int,
+                       tipos: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """Rooms ``offset + 1`` .. ``offset + count`` with numbers ``R000001``... and weighted types."""
+    tipos = tipos or ROOM_TYPES
+    ids = np.arange(offset + 1, offset + count + 1, dtype=np.int64)
+    names = np.array(list(tipos), dtype=object)
+    return pd.DataFrame({
+        'id': ids,
+        'number': pd.Series(ids).map('R{:06d}'.format),
+        'type': names[rng.choice(len(names), size=count, p=_weights(list(tipos.values()), len(names)))],
+        'available': True,
+    })
+
+
+def chunk_reservas(rng: np.random.Generator, offset: int, count: int, stays: int = 20,
+                   start_date: str = '2025-01-01', max_nights: int = 7, max_gap: int = 5,
+                   users: int = 1000) -> pd.DataFrame:
+    """``stays`` non-overlapping reservations for each of rooms ``offset + 1`` .. ``offset + count``.
+
+    Stay lengths and gaps are drawn as a (rooms x stays) matrix and
+    accumulated along each row, so the checkins of one room never overlap.
+    """
+    nights = rng.integers(1, max_nights + 1, size=(count, stays))
+    gaps = rng.integers(0, max_gap + 1, size=(count, stays))
+    checkout = np.cumsum(nights + gaps, axis=1)
+    checkin = checkout - nights
+    base = np.datetime64(start_date, 'D')
+    room_ids = np.repeat(np.arange(offset + 1, offset + count + 1, dtype=np.int64), stays)
+    return pd.DataFrame({
+        'id': np.arange(offset * stays + 1, (offset + count) * stays + 1, dtype=np.int64),
+        'user_id': rng.integers(1, users + 1, size=count * stays),
+        'room_id': room_ids,
+        'checkin': np.datetime_as_string(base + checkin.ravel().astype('timedelta64[D]'), unit='D'),
+        'checkout': np.datetime_as_string(base + checkout.ravel().astype('timedelta64[D]'), unit='D'),
+    })
+
+
+def generar_fixtures_hotel(out_dir: str, rooms: int, stays: int = 20, start_date: str = '2025-01-01',
+                           tipos: Optional[Dict[str, float]] = None, users: int = 1000, seed: Optional[int] = None,
+                           chunksize: int = 100_000, workers: int = 1, formato: str = 'csv') -> Dict[str, str]:
+    """Write ``rooms`` rooms and ``rooms * stays`` reservations (CSV or Parquet) under ``out_dir``.
+
+    The CSV files have the columns accepted by the bulk import endpoints.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    ext = '.csv' if formato == 'csv' else ''
+    rooms_path = escribir_en_chunks(
+        os.path.join(out_dir, 'rooms' + ext), rooms, partial(chunk_habitaciones, tipos=tipos),
+        chunksize=chunksize, workers=workers, seed=seed, formato=formato)
+    reservations_path = escribir_en_chunks(
+        os.path.join(out_dir, 'reservations' + ext), rooms,
+        partial(chunk_reservas, stays=stays, start_date=start_date, users=users),
+        chunksize=max(1, chunksize // max(stays, 1)), workers=workers,
+        seed=None if seed is None else seed + 1, formato=formato)
+    return {'rooms': rooms_path, 'reservations': reservations_path}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic defect or hotel datasets")
+    sub = parser.add_subparsers(dest='kind', required=True)
+
+    p = sub.add_parser('defectos', help='defect history (CSV file or Parquet directory)')
+    p.add_argument('path')
+    p.add_argument('--rows', type=int, default=500)
+    p.add_argument('--days', type=int, default=30)
+    p.add_argument('--start-date', default='2025-01-01')
+
+    h = sub.add_parser('hotel', help='rooms and reservations fixtures')
+    h.add_argument('out_dir')
+    h.add_argument('--rooms', type=int, default=2000)
+    h.add_argument('--stays', type=int, default=20)
+    h.add_argument('--users', type=int, default=1000)
+    h.add_argument('--start-date', default='2025-01-01')
+
+    for sp in (p, h):
+        sp.add_argument('--seed', type=int, default=None)
+        sp.add_argument('--chunksize', type=int, default=1_000_000)
+        sp.add_argument('--workers', type=int, default=1)
+        sp.add_argument('--format', choices=('csv', 'parquet'), default=None)
+    args = parser.parse_args(argv)
+
+    if args.kind == 'defectos':
+        print(generar_defectos(args.path, args.rows, start_date=args.start_date, days=args.days, seed=args.seed,
+                               chunksize=args.chunksize, workers=args.workers, formato=args.format))
+    else:
+        print(generar_fixtures_hotel(args.out_dir, args.rooms, stays=args.stays, start_date=args.start_date,
+                                     users=args.users, seed=args.seed, chunksize=args.chunksize,
+                                     workers=args.workers, formato=args.format or 'csv'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Batch renderer for the defect dashboards of many projects.
+
+Each input file (a defects CSV or Parquet dataset, one per project) is read
+once through ``MetricasTesting`` streaming mode; the trend line, severity
+histogram and exit-criteria panel are all drawn from those aggregates.
+Projects are processed in a process pool with the headless Agg backend, and
+a manifest in the output directory lets reruns skip charts whose input,
+render parameters and drawing code (``CHARTS_VERSION``) are unchanged.
+
+    python make_dashboards.py data/proyectos/ --out dashboards --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure  # noqa: E402
+
+from sistema_metricas import MetricasTesting  # noqa: E402
+
+MANIFEST = ".dashboards.json"
+CHARTS = ("trend", "severity", "criteria")
+# subirlo al cambiar cómo se dibuja un gráfico: invalida todos los PNG del manifest
+CHARTS_VERSION = 1
+
+
+def encontrar_proyectos(inputs):
+    """Map project name -> data path for every CSV/Parquet file or dataset under ``inputs``."""
+    proyectos = {}
+    for entry in inputs:
+        if os.path.isdir(entry) and not _es_dataset(entry):
+            for name in sorted(os.listdir(entry)):
+                path = os.path.join(entry, name)
+                if name.endswith((".csv", ".parquet")) or (os.path.isdir(path) and _es_dataset(path)):
+                    proyectos[os.path.splitext(name)[0]] = path
+        else:
+            proyectos[os.path.splitext(os.path.basename(entry.rstrip(os.sep)))[0]] = entry
+    return proyectos
+
+
+def _es_dataset(path):
+    return any(n.endswith(".parquet") or n.startswith("month=") for n in os.listdir(path))
+
+
+def huella(path):
+    """Cheap fingerprint of a data file or dataset directory (sizes and mtimes)."""
+    h = hashlib.sha1()
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(root, f) for root, _, files in os.walk(path) for f in files)
+    for p in paths:
+        st = os.stat(p)
+        h.update(f"{os.path.relpath(p, path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+
+def agregados(path, window, coverage, max_open, chunksize):
+    """All chart inputs from one streaming pass over the project's history."""
+    metricas = MetricasTesting(path, chunksize=chunksize)
+    trend = metricas.detectar_tendencia(window=window)
+    return {
+        "trend": {
+            "days": [d.strftime("%Y-%m-%d") for d in trend.index],
+            "rolling": [round(float(v), 6) for v in trend.values],
+            "daily": [int(v) for v in metricas.motor.serie_diaria().values],
+        },
+        "severity": {str(k): int(v) for k, v in sorted(metricas.motor.severity_counts.items())},
+        "criteria": metricas.criterios_salida(coverage, max_open, trend_window=window),
+    }
+
+
+def _hash(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def render_trend(data, title, out):
+    fig = Figure(figsize=(8, 3.5))
+    ax = fig.subplots()
+    days = range(len(data["days"]))
+    ax.bar(days, data["daily"], color="#c8d6e5", label="defectos/día")
+    ax.plot(days, data["rolling"], color="#ee5253", label="media móvil")
+    step = max(1, len(data["days"]) // 8)
+    ax.set_xticks(list(days)[::step], data["days"][::step], rotation=30, ha="right", fontsize=7)
+    ax.set_title(f"{title}: tendencia de defectos")
+    ax.legend(fontsize=8, loc="upper left")
+    fig.subplots_adjust(left=0.07, right=0.98, top=0.9, bottom=0.22)
+    fig.savefig(out, dpi=100)
+
+
+def render_severity(data, title, out):
+    fig = Figure(figsize=(5, 3.5))
+    ax = fig.subplots()
+    ax.bar(list(data), list(data.values()), color="#576574")
+    ax.set_xlabel("severidad")
+    ax.set_ylabel("defectos")
+    ax.set_title(f"{title}: severidad")
+    fig.subplots_adjust(left=0.14, right=0.97, top=0.9, bottom=0.15)
+    fig.savefig(out, dpi=100)
+
+
+def render_criteria(data, title, out):
+    fig = Figure(figsize=(5, 2.5))
+    ax = fig.subplots()
+    ax.axis("off")
+    details = data["details"]
+    rows = [
+        ("Cobertura", f"{details.get('coverage_pct')} %", data["coverage_ok"]),
+        ("Defectos abiertos", details.get("open_defects"), data["open_defects_ok"]),
+        ("Tendencia", f"{details.get('trend_prev')} -> {details.get('trend_last')}", data["trend_ok"]),
+    ]
+    for i, (label, value, ok) in enumerate(rows):
+        y = 0.8 - i * 0.3
+        ax.text(0.02, y, label, fontsize=10, transform=ax.transAxes)
+        ax.text(0.45, y, str(value), fontsize=10, transform=ax.transAxes)
+        ax.text(0.9, y, "OK" if ok else "NO", fontsize=10, fontweight="bold",
+                color="#10ac84" if ok else "#ee5253", transform=ax.transAxes)
+    ax.set_title(f"{title}: criterios de salida")
+    fig.savefig(out, dpi=100)
+
+
+# fixed margins instead of tight_layout(), which cost about a third of each render
+RENDERERS = {"trend": render_trend, "severity": render_severity, "criteria": render_criteria}
+
+
+def procesar_proyecto(task, out_dir, window, coverage, max_open, chunksize, force):
+    """Aggregate one project and render the charts whose input changed. Runs in a worker."""
+    name, path, previous = task
+    params = {"window": window, "coverage": coverage, "max_open": max_open, "version": CHARTS_VERSION}
+    fingerprint = _hash([huella(path), params])
+    outputs = {chart: os.path.join(out_dir, f"{name}_{chart}.png") for chart in CHARTS}
+    if not force and previous.get("fingerprint") == fingerprint and all(map(os.path.exists, outputs.values())):
+        return name, previous, []
+
+    data = agregados(path, window, coverage, max_open, chunksize)
+    hashes = {chart: _hash([CHARTS_VERSION, data[chart]]) for chart in CHARTS}
+    rendered = []
+    for chart in CHARTS:
+        if force or previous.get("charts", {}).get(chart) != hashes[chart] or not os.path.exists(outputs[chart]):
+            RENDERERS[chart](data[chart], name, outputs[chart])
+            rendered.append(chart)
+    return name, {"fingerprint": fingerprint, "charts": hashes}, rendered
+
+
+def generar_dashboards(inputs, out_dir, workers=None, window=7, coverage=100.0, max_open=50,
+                       chunksize=1_000_000, force=False):
+    """Render the dashboards of every project; returns ``{project: [rendered charts]}``."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as fh:
+            manifest = json.load(fh)
+
+    tasks = [(name, path, manifest.get(name, {})) for name, path in encontrar_proyectos(inputs).items()]
+    work = partial(procesar_proyecto, out_dir=out_dir, window=window, coverage=coverage, max_open=max_open,
+                   chunksize=chunksize, force=force)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(work, tasks))
+    else:
+        results = [work(task) for task in tasks]
+
+    rendered = {}
+    for name, entry, charts in results:
+        manifest[name] = entry
+        rendered[name] = charts
+    with open(manifest_path, "w") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    return rendered
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render defect dashboards for many projects")
+    parser.add_argument("inputs", nargs="+", help="defect CSV/Parquet files, or directories containing them")
+    parser.add_argument("--out", default="dashboards")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--window", type=int, default=7, help="rolling window in days")
+    parser.add_argument("--coverage", type=float, default=100.0, help="coverage %% for the exit criteria")
+    parser.add_argument("--max-open", type=int, default=50, help="max open defects for the exit criteria")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--force", action="store_true", help="re-render every chart")
+    args = parser.parse_args(argv)
+
+    rendered = generar_dashboards(args.inputs, args.out, workers=args.workers, window=args.window,
+                                  coverage=args.coverage, max_open=args.max_open, chunksize=args.chunksize,
+                                  force=args.force)
+    charts = sum(len(c) for c in rendered.values())
+    print(f"{len(rendered)} proyectos, {charts} gráficos generados, "
+          f"{len(rendered) * len(CHARTS) - charts} sin cambios")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+# Servidor de desarrollo. En producción: ``flask --app wsgi init-db`` y ``python wsgi.py`` (ver wsgi.py).
 from app import create_app
 
 app = create_app()
@@ -1,19 +1,470 @@
+import bisect
+import os
+import shutil
+import tempfile
 import pandas as pd
 import numpy as np
-from dataclasses import dataclass
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+# Columnas que usan las métricas y sus tipos compactos (description nunca se carga)
+COLUMNAS_METRICAS = ['id', 'day', 'severity', 'occurrence', 'detection', 'status']
+DTYPES_DEFECTOS = {
+    'id': 'int64',
+    'severity': 'int8',
+    'occurrence': 'int8',
+    'detection': 'int8',
+    'status': 'category',
+}
+COLUMNAS_RPN = ['severity', 'occurrence', 'detection']
+ESCALA_RPN = 10  # cada puntuación va de 1 a 10
+RPN_MAX = ESCALA_RPN ** 3
+
+
+def leer_defectos_csv(path: str, columns: List[str] = COLUMNAS_METRICAS, **kwargs) -> pd.DataFrame:
+    """Read a defects CSV keeping only ``columns``, with categorical status and int8 scores."""
+    wanted = set(columns)
+    return pd.read_csv(path, usecols=lambda c: c in wanted, dtype=DTYPES_DEFECTOS, parse_dates=['day'], **kwargs)
+
+
+def convertir_a_parquet(csv_path: str, out_dir: str, chunksize: int = 1_000_000) -> str:
+    """Convert a defects CSV once into a Parquet dataset partitioned by month.
+
+    The CSV is read in chunks with the compact dtypes and each chunk is
+    appended to ``out_dir/month=YYYYMM/``, so loads of the last N days only
+    open the most recent partitions. The dataset is written to a temporary
+    directory next to ``out_dir`` and swapped in at the end, replacing any
+    earlier conversion. Requires ``pyarrow``.
+    """
+    out_dir = os.path.abspath(out_dir)
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(out_dir) + '.tmp-', dir=os.path.dirname(out_dir))
+    try:
+        for chunk in leer_defectos_csv(csv_path, chunksize=chunksize):
+            # YYYYMM entero: mucho más barato que strftime por fila
+            chunk['month'] = chunk['day'].dt.year * 100 + chunk['day'].dt.month
+            chunk.to_parquet(tmp_dir, partition_cols=['month'], index=False)
+        # to_parquet añade ficheros a lo que ya hubiera: el dataset anterior se sustituye entero
+        if os.path.exists(out_dir):
+            old_dir = tmp_dir + '.old'
+            os.rename(out_dir, old_dir)
+            os.rename(tmp_dir, out_dir)
+            shutil.rmtree(old_dir)
+        else:
+            os.rename(tmp_dir, out_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_dir
+
+
+def cargar_parquet(path: str, columns: List[str] = COLUMNAS_METRICAS, ultimos_dias: Optional[int] = None,
+                   hasta: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Load a defects Parquet dataset written by ``convertir_a_parquet``.
+
+    Only ``columns`` are read. With ``ultimos_dias`` the month partitions
+    older than the window are pruned and the remaining rows are filtered on
+    ``day``; the window ends at ``hasta`` (default: today).
+    """
+    filters = None
+    if ultimos_dias is not None:
+        end = pd.Timestamp(hasta) if hasta is not None else pd.Timestamp.today().normalize()
+        start = end - pd.Timedelta(days=ultimos_dias - 1)
+        filters = [('month', '>=', start.year * 100 + start.month), ('day', '>=', start), ('day', '<=', end)]
+    df = pd.read_parquet(path, columns=list(columns), filters=filters)
+    return df.astype({c: t for c, t in DTYPES_DEFECTOS.items() if c in df.columns})
+
+
+def _es_parquet(path: str) -> bool:
+    return os.path.isdir(path) or path.endswith('.parquet')
+
+
+def iterar_defectos(path: str, chunksize: int = 1_000_000, columns: List[str] = COLUMNAS_METRICAS,
+                    ultimos_dias: Optional[int] = None, hasta: Optional[pd.Timestamp] = None) -> Iterator[pd.DataFrame]:
+    """Yield the defect history as DataFrames of at most ``chunksize`` rows.
+
+    Works on a CSV file or a Parquet file/dataset; only one batch is in
+    memory at a time. ``ultimos_dias``/``hasta`` apply to Parquet only.
+    """
+    if not _es_parquet(path):
+        yield from leer_defectos_csv(path, columns, chunksize=chunksize)
+        return
+
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    condition = None
+    if ultimos_dias is not None:
+        end = pd.Timestamp(hasta) if hasta is not None else pd.Timestamp.today().normalize()
+        start = end - pd.Timedelta(days=ultimos_dias - 1)
+        condition = (ds.field('day') >= start.to_pydatetime()) & (ds.field('day') <= end.to_pydatetime())
+        if 'month' in dataset.schema.names:
+            condition &= ds.field('month') >= start.year * 100 + start.month
+    dtypes = {c: t for c, t in DTYPES_DEFECTOS.items() if c in columns}
+    for batch in dataset.to_batches(columns=list(columns), filter=condition, batch_size=chunksize):
+        if batch.num_rows:
+            yield batch.to_pandas().astype(dtypes)
+
+
+def calcular_rpn(df: pd.DataFrame) -> np.ndarray:
+    """Risk Priority Number (severity x occurrence x detection) of every row, as int16.
+
+    Raises ValueError when a score is outside 1..10.
+    """
+    scores = [df[c].to_numpy() for c in COLUMNAS_RPN]
+    for name, values in zip(COLUMNAS_RPN, scores):
+        if len(values) and (values.min() < 1 or values.max() > ESCALA_RPN):
+            raise ValueError(f"{name} must be between 1 and {ESCALA_RPN}")
+    severity, occurrence, detection = (v.astype(np.int16) for v in scores)
+    return severity * occurrence * detection
+
+
+def _clave_ranking(rpn: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    # un único int64 ordena por RPN descendente y, a igual RPN, por id ascendente
+    return (rpn.astype(np.int64) << 40) | ((1 << 40) - 1 - ids.astype(np.int64))
+
+
+@dataclass
+class MotorRPN:
+    """Running Risk Priority Number aggregates, fed by the same batches as ``MetricasIncrementales``.
+
+    RPN is an integer in 1..1000, so each day keeps an exact histogram of it
+    (percentiles come from its cumulative counts, never from the rows), the
+    risk matrix keeps counts per (severity, occurrence) cell, and the open
+    defects keep their RPN histogram plus the ``capacidad_top`` highest-risk
+    rows. An ingest is a few ``bincount`` calls and an ``argpartition`` over
+    the candidates that can still enter the top, never a sort of the batch.
+    Rows with a score outside 1..10 (or missing) are left out of every RPN
+    aggregate and counted in ``invalidas``.
+    """
+    capacidad_top: int = 1000
+    por_dia: Dict[pd.Timestamp, np.ndarray] = field(default_factory=dict)
+    abiertos: np.ndarray = field(default_factory=lambda: np.zeros(RPN_MAX + 1, dtype=np.int64))
+    celdas: np.ndarray = field(default_factory=lambda: np.zeros((3, ESCALA_RPN + 1, ESCALA_RPN + 1), dtype=np.int64))
+    top: pd.DataFrame = None
+    vistos: int = 0
+    invalidas: int = 0
+
+    def ingest(self, batch: pd.DataFrame) -> None:
+        """Add a batch with ``severity``/``occurrence``/``detection`` (and ``day``, ``status``, ``id`` if present)."""
+        if batch is None or batch.empty:
+            return
+        ids = batch['id'].to_numpy() if 'id' in batch.columns else np.arange(self.vistos, self.vistos + len(batch))
+        self.vistos += len(batch)
+        # una puntuación fuera de escala no invalida el resto del histórico: la fila se cuenta y se descarta
+        validas = np.ones(len(batch), bool)
+        for c in COLUMNAS_RPN:
+            validas &= batch[c].between(1, ESCALA_RPN).to_numpy(dtype=bool, na_value=False)
+        if not validas.all():
+            self.invalidas += int((~validas).sum())
+            batch, ids = batch[validas], ids[validas]
+            if batch.empty:
+                return
+        rpn = calcular_rpn(batch)
+        abierto = (batch['status'] != 'CLOSED').to_numpy() if 'status' in batch.columns else np.ones(len(rpn), bool)
+
+        # matriz de riesgo: defectos, suma de RPN y abiertos por celda (severity, occurrence)
+        size = (ESCALA_RPN + 1) ** 2
+        celda = batch['severity'].to_numpy(np.int16) * (ESCALA_RPN + 1) + batch['occurrence'].to_numpy(np.int16)
+        self.celdas[0] += np.bincount(celda, minlength=size).reshape(ESCALA_RPN + 1, -1)
+        self.celdas[1] += np.bincount(celda, weights=rpn, minlength=size).astype(np.int64).reshape(ESCALA_RPN + 1, -1)
+        self.celdas[2] += np.bincount(celda[abierto], minlength=size).reshape(ESCALA_RPN + 1, -1)
+
+        if 'day' in batch.columns:
+            codes, days = pd.factorize(batch['day'])
+            hist = np.bincount(codes * (RPN_MAX + 1) + rpn, minlength=len(days) * (RPN_MAX + 1))
+            for day, row in zip(days, hist.reshape(len(days), RPN_MAX + 1)):
+                day = pd.Timestamp(day)
+                previo = self.por_dia.get(day)
+                self.por_dia[day] = row if previo is None else previo + row
+
+        hist_abiertos = np.bincount(rpn[abierto], minlength=RPN_MAX + 1)
+        self.abiertos += hist_abiertos
+        # sólo pueden entrar en el top las filas con RPN >= el capacidad_top-ésimo mayor del lote
+        minimo = _umbral_top(hist_abiertos, self.capacidad_top)
+        lleno = self.top is not None and len(self.top) >= self.capacidad_top
+        if lleno:
+            minimo = max(minimo, int(self.top['rpn'].iloc[-1]))
+        candidatas = np.flatnonzero(abierto & (rpn >= minimo))
+        if lleno and len(candidatas):
+            # con el top lleno sólo entra quien supera al último (en el empate de RPN, por id)
+            ultimo = _clave_ranking(self.top['rpn'].to_numpy()[-1:], self.top['id'].to_numpy()[-1:])[0]
+            candidatas = candidatas[_clave_ranking(rpn[candidatas], ids[candidatas]) > ultimo]
+        if len(candidatas):
+            columnas = [c for c in COLUMNAS_METRICAS if c in batch.columns and c != 'id']
+            nuevas = batch.iloc[candidatas][columnas].reset_index(drop=True)
+            nuevas.insert(0, 'id', ids[candidatas])
+            nuevas['rpn'] = rpn[candidatas]
+            self._fusionar_top(nuevas)
+
+    def merge(self, other: "MotorRPN") -> "MotorRPN":
+        """Fold another engine's aggregates into this one."""
+        self.vistos += other.vistos
+        self.invalidas += other.invalidas
+        self.abiertos += other.abiertos
+        self.celdas += other.celdas
+        for day, row in other.por_dia.items():
+            previo = self.por_dia.get(day)
+            self.por_dia[day] = row.copy() if previo is None else previo + row
+        if other.top is not None:
+            self._fusionar_top(other.top)
+        return self
+
+    def _fusionar_top(self, nuevas: pd.DataFrame) -> None:
+        top = nuevas if self.top is None else pd.concat([self.top, nuevas], ignore_index=True)
+        clave = _clave_ranking(top['rpn'].to_numpy(), top['id'].to_numpy())
+        if len(top) > self.capacidad_top:
+            elegidas = np.argpartition(-clave, self.capacidad_top - 1)[:self.capacidad_top]
+            top, clave = top.iloc[elegidas], clave[elegidas]
+        self.top = top.iloc[np.argsort(-clave, kind='stable')].reset_index(drop=True)
+
+    def top_abiertos(self, k: int = 10) -> pd.DataFrame:
+        """The ``k`` open defects with the highest RPN (ties: lowest id first)."""
+        if k > self.capacidad_top:
+            raise ValueError(f"k={k} exceeds the tracked top ({self.capacidad_top}); raise capacidad_top")
+        if self.top is None:
+            return pd.DataFrame(columns=['id', 'rpn'])
+        return self.top.head(k).copy()
+
+    def max_rpn_abierto(self) -> Optional[int]:
+        """Highest RPN among open defects, or None when nothing is open."""
+        nonzero = np.flatnonzero(self.abiertos)
+        return int(nonzero[-1]) if len(nonzero) else None
+
+    def percentiles_diarios(self, qs: Iterable[float] = (50, 90, 99)) -> pd.DataFrame:
+        """RPN percentiles per day (linear interpolation, same values as ``np.percentile``)."""
+        qs = list(qs)
+        days = sorted(self.por_dia)
+        columns = [f'p{q:g}' for q in qs]
+        if not days:
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name='day'), dtype=float)
+        hist = np.stack([self.por_dia[d] for d in days])
+        cum = hist.cumsum(axis=1)
+        n = cum[:, -1]
+        values = np.empty((len(days), len(qs)))
+        for j, q in enumerate(qs):
+            pos = q / 100 * (n - 1)
+            lo, hi = np.floor(pos), np.ceil(pos)
+            # el valor en la posición i ordenada es el primer RPN cuya frecuencia acumulada supera i
+            v_lo = (cum > lo[:, None]).argmax(axis=1)
+            v_hi = (cum > hi[:, None]).argmax(axis=1)
+            values[:, j] = v_lo + (v_hi - v_lo) * (pos - lo)
+        return pd.DataFrame(values, columns=columns, index=pd.DatetimeIndex(days, name='day'))
+
+    def matriz_riesgo(self, valor: str = 'defectos') -> pd.DataFrame:
+        """Severity x occurrence pivot of ``valor``: "defectos", "abiertos" or "rpn_medio"."""
+        scores = pd.RangeIndex(1, ESCALA_RPN + 1)
+        counts, rpn_sum, abiertos = (c[1:, 1:] for c in self.celdas)
+        if valor == 'defectos':
+            data = counts
+        elif valor == 'abiertos':
+            data = abiertos
+        elif valor == 'rpn_medio':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                data = np.where(counts > 0, rpn_sum / counts, np.nan)
+        else:
+            raise ValueError("valor must be 'defectos', 'abiertos' or 'rpn_medio'")
+        return pd.DataFrame(data, index=scores.rename('severity'), columns=scores.rename('occurrence'))
+
+
+def _umbral_top(hist: np.ndarray, k: int) -> int:
+    """Lowest RPN that can be among the ``k`` highest of ``hist`` (1 when it holds fewer than k)."""
+    desde_arriba = np.cumsum(hist[::-1])
+    llega = np.flatnonzero(desde_arriba >= k)
+    return int(len(hist) - 1 - llega[0]) if len(llega) else 1
+
+
+@dataclass
+class MetricasIncrementales:
+    """Running defect aggregates fed by appended batches.
+
+    Keeps per-day counts (with the days in sorted order), a status histogram
+    and a severity histogram, so ingesting a batch costs O(batch) and the
+    exit criteria only look at the last ``window + 1`` days instead of the
+    whole history.
+    """
+    daily_counts: Dict[pd.Timestamp, int] = field(default_factory=dict)
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    severity_counts: Dict[int, int] = field(default_factory=dict)
+    total: int = 0
+    has_status: bool = False
+    rpn: MotorRPN = field(default_factory=MotorRPN, repr=False)
+    _days: List[pd.Timestamp] = field(default_factory=list, repr=False)
+
+    @classmethod
+    def desde_df(cls, df: pd.DataFrame) -> "MetricasIncrementales":
+        motor = cls()
+        motor.ingest(df)
+        return motor
+
+    @classmethod
+    def desde_lotes(cls, lotes: Iterable[pd.DataFrame]) -> "MetricasIncrementales":
+        """Aggregate a stream of row batches; memory is bounded by the largest batch."""
+        motor = cls()
+        for lote in lotes:
+            motor.ingest(lote)
+        return motor
+
+    def ingest(self, batch: pd.DataFrame) -> None:
+        """Add a batch of defect rows (columns ``day`` and optionally ``status``/``severity``)."""
+        if batch is None or batch.empty:
+            return
+        self.total += int(len(batch))
+        if 'day' in batch.columns:
+            days = batch['day']
+            if not pd.api.types.is_datetime64_any_dtype(days):
+                days = pd.to_datetime(days)
+            self._add_days(days.value_counts(sort=False).items())
+        if 'status' in batch.columns:
+            self.has_status = True
+            _merge_counts(self.status_counts, batch['status'].value_counts(sort=False))
+        if 'severity' in batch.columns:
+            _merge_counts(self.severity_counts, batch['severity'].value_counts(sort=False))
+        if all(c in batch.columns for c in COLUMNAS_RPN):
+            self.rpn.ingest(batch)
+
+    def merge(self, other: "MetricasIncrementales") -> "MetricasIncrementales":
+        """Fold another engine's aggregates into this one (e.g. partial results of a split history)."""
+        self.total += other.total
+        self.has_status = self.has_status or other.has_status
+        self._add_days(other.daily_counts.items())
+        _merge_counts(self.status_counts, other.status_counts)
+        _merge_counts(self.severity_counts, other.severity_counts)
+        self.rpn.merge(other.rpn)
+        return self
+
+    def _add_days(self, counts) -> None:
+        for day, count in counts:
+            if day not in self.daily_counts:
+                # los lotes suelen traer días nuevos al final: insort es O(1) amortizado en ese caso
+                bisect.insort(self._days, day)
+                self.daily_counts[day] = 0
+            self.daily_counts[day] += int(count)
+
+    @property
+    def empty(self) -> bool:
+        return self.total == 0
+
+    def open_count(self) -> int:
+        """Defects whose status is not CLOSED (all defects when there is no status column)."""
+        if not self.has_status:
+            return self.total
+        return self.total - self.status_counts.get('CLOSED', 0)
+
+    def serie_diaria(self) -> pd.Series:
+        """Defects per day as a Series indexed by day."""
+        return pd.Series([self.daily_counts[d] for d in self._days], index=pd.DatetimeIndex(self._days, name='day'),
+                         name='defects', dtype='int64')
+
+    def detectar_tendencia(self, window: int = 7) -> pd.Series:
+        """Rolling mean of defects per day, like ``MetricasTesting.detectar_tendencia``."""
+        if not self._days:
+            return pd.Series(dtype=float)
+        return self.serie_diaria().rolling(window=window, min_periods=1).mean()
+
+    def ultimas_tendencias(self, window: int = 7):
+        """Last and previous rolling-mean values in O(window), or ``(None, None)`` with fewer than two days."""
+        if len(self._days) < 2:
+            return None, None
+        counts = [self.daily_counts[d] for d in self._days[-(window + 1):]]
+        last = counts[-window:]
+        prev = counts[:-1][-window:]
+        return sum(last) / len(last), sum(prev) / len(prev)
+
+    def criterios_salida(self, coverage_pct: float, max_open_defects: int, trend_window: int = 7,
+                         max_rpn_abierto: Optional[int] = None) -> Dict[str, Any]:
+        """Same evaluation as ``MetricasTesting.criterios_salida``, from the running aggregates."""
+        res = {"coverage_ok": False, "open_defects_ok": False, "trend_ok": False, "details": {}}
+        res['details']['coverage_pct'] = coverage_pct
+        res['coverage_ok'] = coverage_pct >= 80.0
+        if max_rpn_abierto is not None:
+            highest = self.rpn.max_rpn_abierto()
+            res['details']['max_open_rpn'] = highest
+            res['details']['invalid_rpn_rows'] = self.rpn.invalidas
+            res['rpn_ok'] = highest is None or highest <= max_rpn_abierto
+
+        if self.empty:
+            res['details']['open_defects'] = 0
+            res['open_defects_ok'] = max_open_defects >= 0
+            res['details']['trend'] = None
+            res['trend_ok'] = False
+            return res
+
+        open_count = self.open_count()
+        res['details']['open_defects'] = open_count
+        res['open_defects_ok'] = open_count <= max_open_defects
+
+        last, prev = self.ultimas_tendencias(trend_window)
+        res['details']['trend_last'] = last
+        res['details']['trend_prev'] = prev
+        res['trend_ok'] = last is not None and last <= prev
+        return res
+
+    def defect_summary(self) -> Dict[str, Any]:
+        if self.empty:
+            return {}
+        s = {'total_defects': self.total}
+        if self.severity_counts:
+            s['by_severity'] = dict(sorted(self.severity_counts.items(), key=lambda kv: (-kv[1], kv[0])))
+        return s
+
+
+def _merge_counts(target: Dict, counts) -> None:
+    for key, count in counts.items():
+        key = key.item() if hasattr(key, 'item') else key
+        target[key] = target.get(key, 0) + int(count)
 
 
 @dataclass
 class MetricasTesting:
     defects_csv: str
     history_df: pd.DataFrame = None
+    ultimos_dias: Optional[int] = None  # sólo para datasets Parquet: cargar la ventana reciente
+    chunksize: Optional[int] = None  # modo streaming: agregar por lotes sin materializar history_df
+    motor: MetricasIncrementales = field(default=None, init=False, repr=False)
+    _cache_rpn: Dict[Any, Any] = field(default_factory=dict, init=False, repr=False)
 
     def __post_init__(self):
-        try:
-            self.history_df = pd.read_csv(self.defects_csv, parse_dates=["day"]) if self.defects_csv else pd.DataFrame()
-        except Exception:
+        """Load the history and build the aggregates.
+
+        Read errors are raised, never turned into an empty history: "no data"
+        exit criteria must mean the history really is empty. With
+        ``chunksize`` the file is streamed and ``history_df`` stays None.
+        """
+        if not self.defects_csv:
             self.history_df = pd.DataFrame()
+        elif self.chunksize:
+            self.history_df = None
+            self.motor = MetricasIncrementales.desde_lotes(
+                iterar_defectos(self.defects_csv, self.chunksize, ultimos_dias=self.ultimos_dias))
+            return
+        else:
+            try:
+                self.history_df = self._cargar()
+            except MemoryError as exc:
+                raise MemoryError(
+                    f"{self.defects_csv} does not fit in memory; use MetricasTesting(..., chunksize=N)") from exc
+        # agregados incrementales: se calculan una vez y se actualizan con agregar_defectos
+        self.motor = MetricasIncrementales.desde_df(self.history_df)
+
+    @classmethod
+    def desde_lotes(cls, lotes: Iterable[pd.DataFrame]) -> "MetricasTesting":
+        """Metrics over a generator of row batches instead of a file (streaming mode)."""
+        metricas = cls('')
+        metricas.history_df = None
+        metricas.motor = MetricasIncrementales.desde_lotes(lotes)
+        return metricas
+
+    def _cargar(self) -> pd.DataFrame:
+        """Load ``defects_csv``: a CSV file, or a Parquet file/dataset directory."""
+        if _es_parquet(self.defects_csv):
+            return cargar_parquet(self.defects_csv, ultimos_dias=self.ultimos_dias)
+        return leer_defectos_csv(self.defects_csv)
+
+    def agregar_defectos(self, batch: pd.DataFrame) -> None:
+        """Append new defect rows to the metrics without re-reading or re-scanning the history.
+
+        ``history_df`` stays the frame loaded from ``defects_csv``; appended
+        rows are only folded into the running aggregates.
+        """
+        self.motor.ingest(batch)
 
     def calcular_cobertura(self, total_tests: int, executed_tests: int) -> float:
         """Simple coverage percentage: executed / total (0-100)."""
@@ -25,84 +476,70 @@ class MetricasTesting:
         """Detect trend of daily defects using rolling mean slope.
         Returns a pandas Series indexed by day with the rolling mean of defects.
         """
-        if self.history_df is None or self.history_df.empty:
-            return pd.Series(dtype=float)
-        # Count defects per day
-        daily = self.history_df.groupby('day').size().rename('defects').sort_index()
-        roll = daily.rolling(window=window, min_periods=1).mean()
-        return roll
+        return self.motor.detectar_tendencia(window=window)
 
-    def criterios_salida(self, coverage_pct: float, max_open_defects: int, trend_window: int = 7) -> Dict[str, Any]:
+    def criterios_salida(self, coverage_pct: float, max_open_defects: int, trend_window: int = 7,
+                         max_rpn_abierto: Optional[int] = None) -> Dict[str, Any]:
         """Return a dict of exit criteria evaluation booleans and reasons.
         Example criteria:
         - coverage_pct >= 80
         - open defects <= max_open_defects
         - trend decreasing (rolling mean last value <= previous)
+        - with max_rpn_abierto: no open defect above that RPN (``rpn_ok``)
+        Evaluated from the running aggregates in O(trend_window).
         """
-        res = {"coverage_ok": False, "open_defects_ok": False, "trend_ok": False, "details": {}}
-        res['details']['coverage_pct'] = coverage_pct
-        res['coverage_ok'] = coverage_pct >= 80.0
+        return self.motor.criterios_salida(coverage_pct, max_open_defects, trend_window=trend_window,
+                                          max_rpn_abierto=max_rpn_abierto)
 
-        if self.history_df is None or self.history_df.empty:
-            res['details']['open_defects'] = 0
-            res['open_defects_ok'] = max_open_defects >= 0
-            res['details']['trend'] = None
-            res['trend_ok'] = False
-            return res
+    # ---------------------------
+    # RIESGO (RPN)
+    # ---------------------------
+    def huella(self) -> tuple:
+        """Fingerprint of the loaded history: source file size and mtime, window and rows folded in."""
+        try:
+            stat = os.stat(self.defects_csv)
+            source = (self.defects_csv, stat.st_size, stat.st_mtime_ns)
+        except (OSError, TypeError, ValueError):
+            source = (self.defects_csv,)
+        return source + (self.ultimos_dias, self.motor.total)
 
-        # open defects are those with status != CLOSED if such column exists; otherwise use all defects
-        if 'status' in self.history_df.columns:
-            open_count = int((self.history_df['status'] != 'CLOSED').sum())
-        else:
-            open_count = int(len(self.history_df))
-        res['details']['open_defects'] = open_count
-        res['open_defects_ok'] = open_count <= max_open_defects
+    def _rpn_cacheado(self, key, compute):
+        # agregar_defectos cambia la huella: los resultados de la historia anterior se descartan
+        huella = self.huella()
+        if self._cache_rpn.get('huella') != huella:
+            self._cache_rpn = {'huella': huella}
+        if key not in self._cache_rpn:
+            self._cache_rpn[key] = compute()
+        return self._cache_rpn[key].copy()
 
-        trend_series = self.detectar_tendencia(window=trend_window)
-        if not trend_series.empty and len(trend_series) >= 2:
-            last = trend_series.iloc[-1]
-            prev = trend_series.iloc[-2]
-            res['details']['trend_last'] = float(last)
-            res['details']['trend_prev'] = float(prev)
-            res['trend_ok'] = last <= prev
-        else:
-            res['details']['trend_last'] = None
-            res['details']['trend_prev'] = None
-            res['trend_ok'] = False
+    def ranking_rpn(self, k: int = 10) -> pd.DataFrame:
+        """The ``k`` open defects with the highest Risk Priority Number, highest first."""
+        return self._rpn_cacheado(('top', k), lambda: self.motor.rpn.top_abiertos(k))
 
-        return res
+    def percentiles_rpn(self, qs: Iterable[float] = (50, 90, 99)) -> pd.DataFrame:
+        """Per-day RPN percentiles, one column ``p<q>`` per requested percentile."""
+        qs = tuple(qs)
+        return self._rpn_cacheado(('percentiles', qs), lambda: self.motor.rpn.percentiles_diarios(qs))
+
+    def matriz_riesgo(self, valor: str = 'defectos') -> pd.DataFrame:
+        """Severity x occurrence risk matrix of defect counts, open counts or mean RPN."""
+        return self._rpn_cacheado(('matriz', valor), lambda: self.motor.rpn.matriz_riesgo(valor))
 
     # helper functions
     def defect_summary(self) -> Dict[str, Any]:
-        if self.history_df is None or self.history_df.empty:
-            return {}
-        s = {}
-        s['total_defects'] = int(len(self.history_df))
-        if 'severity' in self.history_df.columns:
-            s['by_severity'] = self.history_df['severity'].value_counts().to_dict()
-        return s
+        return self.motor.defect_summary()
 
 
 # Small utility to generate a defects CSV (used if user wants to regenerate)
-def generar_dataset(path: str, n: int = 500, start_date: str = '2025-01-01'):
-    import random
-    import pandas as pd
-    dates = pd.date_range(start=start_date, periods=30).to_pydatetime().tolist()
-    rows = []
-    for i in range(1, n + 1):
-        d = random.choice(dates)
-        severity = random.randint(1, 10)
-        occurrence = random.randint(1, 10)
-        detection = random.randint(1, 10)
-        rows.append({
-            'id': i,
-            'day': d.date().isoformat(),
-            'severity': severity,
-            'occurrence': occurrence,
-            'detection': detection,
-            'description': f"Defecto simulado {i}",
-            'status': random.choice(['OPEN', 'IN_PROGRESS', 'CLOSED'])
-        })
-    df = pd.DataFrame(rows)
+def generar_dataset(path: str, n: int = 500, start_date: str = '2025-01-01', seed: Optional[int] = None,
+                    days: int = 30, distribuciones: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Vectorized defect generator; writes ``path`` and returns the DataFrame.
+
+    For outputs larger than memory, Parquet or a process pool use
+    ``generadores.generar_defectos``, which runs the same generator in chunks.
+    """
+    from generadores import chunk_defectos
+    df = chunk_defectos(np.random.default_rng(seed), 0, n, start_date=start_date, days=days,
+                        distribuciones=distribuciones)
     df.to_csv(path, index=False)
     return df
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import User
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    })
+    with app.app_context():
+        db.session.add(User(username='admin', password=generate_password_hash('devpass', method='pbkdf2:sha256:1000')))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_client(client):
+    """Client with the admin user logged in"""
+    client.post('/login', data={'username': 'admin', 'password': 'devpass'})
+    return client
+
+
+@pytest.fixture
+def count_queries(app):
+    """Factory for a context manager counting SQL statements sent to the app's engine"""
+    with app.app_context():
+        engine = db.engine
+    return lambda: QueryCounter(engine)
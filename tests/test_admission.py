@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from app import db
+from app.admission import BookingGate, FileLocks, Overloaded, ThreadLocks, _QueueTimeout
+from app.booking import RoomUnavailable
+from app.models import Reservation, Room
+
+
+@pytest.fixture
+def rooms(app):
+    with app.app_context():
+        db.session.add_all([Room(number='101', type='Single', available=True),
+                            Room(number='102', type='Single', available=True)])
+        db.session.commit()
+    return 1, 2
+
+
+def _gate(app, **kwargs):
+    gate = BookingGate(ThreadLocks(4), **{'room_queue': 2, 'backlog': 3, 'timeout': 5.0, **kwargs})
+    app.extensions['booking_gate'] = gate
+    return gate
+
+
+def _until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def _book_in_thread(app, gate, results, i, room_id, day):
+    def run():
+        with app.app_context():
+            try:
+                results[i] = gate.book(1, room_id, date(2025, 12, day), date(2025, 12, day + 1)).id
+            except (Overloaded, RoomUnavailable) as exc:
+                results[i] = exc
+            finally:
+                db.session.remove()
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_duplicate_attempts_share_one_booking(app, rooms):
+    gate = _gate(app)
+    results = [None] * 3
+    with gate.locks.room((0, 1), 1):
+        threads = [_book_in_thread(app, gate, results, i, 1, 1) for i in range(3)]
+        _until(lambda: gate.stats['coalesced'] == 2)
+    for t in threads:
+        t.join()
+    assert results[0] == results[1] == results[2]
+    with app.app_context():
+        assert Reservation.query.count() == 1
+    assert gate.as_dict()['admitted'] == 1 and gate.waiting == 0
+
+
+def test_full_room_queue_is_rejected_fast_with_429(auth_client, app, rooms):
+    gate = _gate(app)
+    results = [None] * 2
+    with gate.locks.room((0, 1), 1):
+        threads = [_book_in_thread(app, gate, results, i, 1, i + 1) for i in range(2)]
+        _until(lambda: gate.waiting == 2)
+        start = time.monotonic()
+        response = auth_client.post('/reserve', data={'room_id': 1, 'checkin': '2025-12-10', 'checkout': '2025-12-11'})
+        assert response.status_code == 429 and response.headers['Retry-After'] == '1'
+        assert time.monotonic() - start < 0.5
+        # otra habitación sigue admitiendo reservas
+        response = auth_client.post('/reserve', data={'room_id': 2, 'checkin': '2025-12-10', 'checkout': '2025-12-11'})
+        assert response.status_code == 302
+    for t in threads:
+        t.join()
+    assert all(isinstance(r, int) for r in results)
+
+
+def test_backlog_and_queue_timeout_answer_503(auth_client, app, rooms):
+    gate = _gate(app, room_queue=5, backlog=2, timeout=0.2)
+    results = [None] * 2
+    body = {'room_id': 1, 'checkin': '2025-12-10', 'checkout': '2025-12-11'}
+    with gate.locks.room((0, 1), 1):
+        threads = [_book_in_thread(app, gate, results, i, 1, i + 1) for i in range(2)]
+        _until(lambda: gate.waiting == 2)
+        response = auth_client.post('/api/v1/reservations', json=body)
+        assert response.status_code == 503 and 'Retry-After' in response.headers
+        for t in threads:
+            t.join()
+    assert all(isinstance(r, Overloaded) and r.status == 503 for r in results)
+    assert gate.as_dict() == {'admitted': 2, 'coalesced': 0, 'rejected_room': 0, 'rejected_backlog': 1,
+                              'timeouts': 2, 'waiting': 0}
+    assert auth_client.post('/api/v1/reservations', json=body).status_code == 201
+    assert b'hotel_booking_admission{stat="timeouts"} 2' in auth_client.get('/metrics').data
+
+
+def test_file_locks_are_shared_between_workers(tmp_path):
+    worker_a, worker_b = FileLocks(str(tmp_path), slots=1), FileLocks(str(tmp_path), slots=1)
+    with worker_a.room((0, 7), 1):
+        with pytest.raises(_QueueTimeout):
+            with worker_b.room((0, 7), 0.02):
+                pass
+        with worker_b.room((0, 8), 0.02):
+            pass
+    with worker_b.room((0, 7), 0.02):
+        with worker_a.slot(1):
+            with pytest.raises(_QueueTimeout):
+                with worker_b.slot(0.02):
+                    pass
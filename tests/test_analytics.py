@@ -0,0 +1,107 @@
+from datetime import date, datetime
+
+import pytest
+
+from app import db
+from app.analytics import daily_rollup, occupancy_report, rebuild_rollups, record_stay, record_stays
+from app.booking import book_room, cancel_booking
+from app.bulk import import_reservations
+from app.models import OccupancyRollup, Reservation, Room
+
+
+def _rooms(app):
+    with app.app_context():
+        db.session.add_all([Room(number='S1', type='Single'), Room(number='S2', type='Single'),
+                            Room(number='D1', type='Double')])
+        db.session.commit()
+        return {r.number: r.id for r in Room.query}
+
+
+def _snapshot():
+    return sorted(
+        (r.night, r.room_type, r.occupied, r.arrivals, r.stay_nights, r.lead_days)
+        for r in OccupancyRollup.query if r.occupied or r.arrivals
+    )
+
+
+def test_bookings_update_rollup_incrementally(app):
+    rooms = _rooms(app)
+    with app.app_context():
+        book_room(1, rooms['S1'], date(2030, 3, 1), date(2030, 3, 4))
+        book_room(1, rooms['S2'], date(2030, 3, 2), date(2030, 3, 3))
+        kept = book_room(1, rooms['D1'], date(2030, 3, 1), date(2030, 3, 2))
+        cancel_booking(book_room(1, rooms['D1'], date(2030, 3, 2), date(2030, 3, 5)))
+
+        frame = daily_rollup(date(2030, 3, 1), date(2030, 3, 5)).set_index(['night', 'room_type'])
+        assert frame['occupied'].loc[:, 'Single'].tolist() == [1, 2, 1, 0]
+        assert frame['occupied'].loc[:, 'Double'].tolist() == [1, 0, 0, 0]
+        assert frame.loc[('2030-03-01', 'Single'), 'capacity'] == 2
+
+        lead = (date(2030, 3, 1) - kept.timestamp.date()).days
+        by_type = occupancy_report(date(2030, 3, 1), date(2030, 3, 5), by='type').set_index('room_type')
+        assert by_type.loc['Single', 'occupancy_rate'] == pytest.approx(4 / 8)
+        assert by_type.loc['Single', 'avg_length_of_stay'] == pytest.approx(2)
+        assert by_type.loc['Double', 'avg_lead_days'] == pytest.approx(lead)
+
+
+def test_rebuild_matches_incremental_rollup(app):
+    rooms = _rooms(app)
+    with app.app_context():
+        book_room(1, rooms['S1'], date(2030, 1, 30), date(2030, 2, 2))
+        import_reservations(1, enumerate([
+            {'room_id': rooms['S2'], 'checkin': '2030-02-01', 'checkout': '2030-02-03'},
+            {'room_id': rooms['D1'], 'checkin': '2030-01-31', 'checkout': '2030-02-01'},
+        ]))
+        incremental = _snapshot()
+        assert rebuild_rollups() > 0
+        assert _snapshot() == incremental
+
+        months = occupancy_report(date(2030, 1, 1), date(2030, 3, 1), by='month').set_index(['month', 'room_type'])
+        assert months.loc[('2030-01', 'Single'), 'occupied'] == 2
+        assert months.loc[('2030-02', 'Single'), 'occupied'] == 3
+        assert months.loc[('2030-01', 'Single'), 'room_nights'] == 62
+
+
+def test_single_stay_deltas_match_the_vectorized_path(app):
+    stays = [('Single', date(2030, 3, 30), date(2030, 4, 2), datetime(2030, 3, 1, 18, 30)),
+             ('Suite', date(2030, 4, 1), date(2030, 4, 2), None),
+             ('Single', date(2030, 4, 1), date(2030, 4, 3), datetime(2030, 4, 5))]
+    with app.app_context():
+        record_stays(stays)
+        vectorized = _snapshot()
+        record_stays(stays, sign=-1)
+        assert _snapshot() == []
+
+        for stay in stays:
+            record_stay(*stay)
+        assert _snapshot() == vectorized
+        record_stay(*stays[0], sign=-1)
+        record_stays(stays[:1])
+        assert _snapshot() == vectorized
+
+
+def test_legacy_reservation_without_timestamp_counts_zero_lead(app):
+    rooms = _rooms(app)
+    with app.app_context():
+        db.session.add(Reservation(user_id=1, room_id=rooms['D1'], checkin=date(2030, 5, 1),
+                                   checkout=date(2030, 5, 3), timestamp=None))
+        db.session.commit()
+        db.session.query(Reservation).update({'timestamp': None})
+        db.session.commit()
+        rebuild_rollups()
+        row = db.session.get(OccupancyRollup, (date(2030, 5, 1), 'Double'))
+        assert (row.arrivals, row.stay_nights, row.lead_days) == (1, 2, 0)
+
+
+def test_analytics_api(auth_client, app):
+    rooms = _rooms(app)
+    with app.app_context():
+        book_room(1, rooms['S1'], date(2030, 3, 1), date(2030, 3, 3))
+    resp = auth_client.get('/api/v1/analytics/occupancy?start=2030-03-01&end=2030-03-03&by=type')
+    assert resp.status_code == 200
+    rows = {r['room_type']: r for r in resp.get_json()['rows']}
+    assert rows['Single']['occupancy_rate'] == 0.5
+    assert rows['Double']['avg_length_of_stay'] is None
+    assert auth_client.get('/api/v1/analytics/occupancy?start=2030-03-01&end=2030-03-03&by=week').status_code == 400
+    etag = resp.headers['ETag']
+    assert auth_client.get(resp.request.url, headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,113 @@
+from app import create_app, db
+from app.models import Room
+
+AVAILABILITY = '/api/v1/availability?type=Single&checkin=2025-12-01&checkout=2025-12-05'
+
+
+def _seed(app):
+    with app.app_context():
+        db.session.add_all([Room(number=f'{i}', type='Single', available=True) for i in range(3)])
+        db.session.commit()
+        return [r.id for r in Room.query.order_by(Room.number)]
+
+
+def test_api_requires_authentication(client):
+    assert client.get(AVAILABILITY).status_code == 401
+
+
+def test_availability_etag_returns_304_until_inventory_changes(auth_client, app):
+    room_ids = _seed(app)
+    first = auth_client.get(AVAILABILITY)
+    assert first.status_code == 200
+    assert len(first.get_json()['rooms']) == 3
+    etag = first.headers['ETag']
+
+    again = auth_client.get(AVAILABILITY, headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+
+    booked = auth_client.post('/api/v1/reservations', json={
+        'room_id': room_ids[0], 'checkin': '2025-12-02', 'checkout': '2025-12-03',
+    })
+    assert booked.status_code == 201
+
+    changed = auth_client.get(AVAILABILITY, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert [r['id'] for r in changed.get_json()['rooms']] == room_ids[1:]
+
+
+def test_other_workers_never_serve_cached_rooms_under_a_newer_version(auth_client, app):
+    room_ids = _seed(app)
+    # otro worker sobre la misma base de datos, con su propia caché de búsquedas y de fragmentos
+    worker = create_app({**app.config, 'FRAGMENT_VERSION_TTL': 0})
+    other = worker.test_client()
+    other.post('/login', data={'username': 'admin', 'password': 'devpass'})
+    page = '/reserve?type=Single&checkin=2025-12-01&checkout=2025-12-05'
+    etag = other.get(AVAILABILITY).headers['ETag']
+    assert f'<option value="{room_ids[0]}">' in other.get(page).get_data(as_text=True)
+
+    auth_client.post('/api/v1/reservations', json={'room_id': room_ids[0], 'checkin': '2025-12-02',
+                                                   'checkout': '2025-12-03'})
+    changed = other.get(AVAILABILITY, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert [r['id'] for r in changed.get_json()['rooms']] == room_ids[1:]
+    assert other.get(AVAILABILITY, headers={'If-None-Match': changed.headers['ETag']}).status_code == 304
+    assert f'<option value="{room_ids[0]}">' not in other.get(page).get_data(as_text=True)
+    with worker.app_context():
+        db.engine.dispose()
+
+
+def test_field_selection(auth_client, app):
+    _seed(app)
+    rooms = auth_client.get(AVAILABILITY + '&fields=number').get_json()['rooms']
+    assert rooms == [{'number': '0'}, {'number': '1'}, {'number': '2'}]
+
+
+def test_booking_conflict_and_cancel(auth_client, app):
+    room_id = _seed(app)[0]
+    body = {'room_id': room_id, 'checkin': '2025-12-01', 'checkout': '2025-12-03'}
+    created = auth_client.post('/api/v1/reservations', json=body)
+    assert auth_client.post('/api/v1/reservations', json=body).status_code == 409
+
+    listed = auth_client.get('/api/v1/reservations').get_json()['reservations']
+    assert [r['room_number'] for r in listed] == ['0']
+
+    reservation_id = created.get_json()['reservation']['id']
+    assert auth_client.delete(f'/api/v1/reservations/{reservation_id}').status_code == 204
+    assert auth_client.post('/api/v1/reservations', json=body).status_code == 201
+
+
+def test_reservation_list_limit_must_be_positive(auth_client, app):
+    room_ids = _seed(app)
+    auth_client.post('/api/v1/reservations', json={'room_id': room_ids[0], 'checkin': '2025-12-02',
+                                                   'checkout': '2025-12-03'})
+    for limit in ('0', '-3'):
+        assert auth_client.get(f'/api/v1/reservations?limit={limit}').status_code == 400
+    assert len(auth_client.get('/api/v1/reservations?limit=1').get_json()['reservations']) == 1
+
+
+def test_reservation_body_must_be_a_json_object(auth_client):
+    for body in ([{'room_id': 1}], 'room', 7, None):
+        response = auth_client.post('/api/v1/reservations', json=body)
+        assert response.status_code == 400 and 'room_id' in response.get_json()['error']
+
+
+def test_invalid_availability_dates(auth_client):
+    response = auth_client.get('/api/v1/availability?checkin=2025-12-05&checkout=2025-12-01')
+    assert response.status_code == 400
+
+
+def test_flexible_availability(auth_client, app):
+    room_ids = _seed(app)
+    for room_id in room_ids:
+        auth_client.post('/api/v1/reservations', json={'room_id': room_id, 'checkin': '2030-12-10', 'checkout': '2030-12-12'})
+
+    response = auth_client.get('/api/v1/availability/flexible?checkin=2030-12-11&nights=2&tolerance=2&limit=4')
+    assert response.status_code == 200
+    windows = response.get_json()['windows']['Single']
+    assert [(w['number'], w['checkin'], w['offset']) for w in windows] == [
+        ('0', '2030-12-12', 1), ('1', '2030-12-12', 1), ('2', '2030-12-12', 1), ('0', '2030-12-13', 2),
+    ]
+
+    assert auth_client.get('/api/v1/availability/flexible?checkin=2030-12-11').status_code == 400
+    assert auth_client.get('/api/v1/availability/flexible?checkin=2030-12-11&nights=2&tolerance=999').status_code == 400
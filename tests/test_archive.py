@@ -0,0 +1,109 @@
+import sqlite3
+from datetime import date
+
+from app import create_app, db
+from app.analytics import daily_rollup, rebuild_rollups
+from app.archive import archive_reservations
+from app.models import ArchivedReservation, Reservation, Room, RoomNight
+
+
+def _book_history(auth_client, app):
+    with app.app_context():
+        db.session.add_all([Room(number='101', type='Single', available=True),
+                            Room(number='201', type='Suite', available=True)])
+        db.session.commit()
+    stays = [(1, '2024-01-10', '2024-01-12'), (2, '2024-02-01', '2024-02-05'), (1, '2024-03-01', '2024-03-02'),
+             (2, '2030-05-01', '2030-05-03')]
+    for room_id, checkin, checkout in stays:
+        response = auth_client.post('/api/v1/reservations', json={'room_id': room_id, 'checkin': checkin,
+                                                                  'checkout': checkout})
+        assert response.status_code == 201
+
+
+def test_archive_moves_checked_out_stays_in_batches(auth_client, app):
+    _book_history(auth_client, app)
+    with app.app_context():
+        before = daily_rollup(date(2024, 1, 1), date(2024, 4, 1))
+
+        assert archive_reservations(date(2025, 1, 1), batch_size=2) == 3
+        assert [r.checkin for r in Reservation.query] == [date(2030, 5, 1)]
+        assert {n.night for n in RoomNight.query} == {date(2030, 5, 1), date(2030, 5, 2)}
+        archived = ArchivedReservation.query.order_by(ArchivedReservation.id).all()
+        assert [(a.room_number, a.room_type) for a in archived] == [('101', 'Single'), ('201', 'Suite'),
+                                                                     ('101', 'Single')]
+        assert archive_reservations(date(2025, 1, 1)) == 0
+
+        # los informes no cambian, ni antes ni después de reconstruir los rollups desde el archivo
+        assert daily_rollup(date(2024, 1, 1), date(2024, 4, 1)).equals(before)
+        rebuild_rollups()
+        assert daily_rollup(date(2024, 1, 1), date(2024, 4, 1)).equals(before)
+
+
+def test_archived_history_only_when_asked(auth_client, app):
+    _book_history(auth_client, app)
+    with app.app_context():
+        archive_reservations(date(2025, 1, 1))
+
+    page = auth_client.get('/dashboard').data
+    assert b'2030-05-01' in page and b'2024-01-10' not in page
+    page = auth_client.get('/dashboard?history=1').data
+    assert b'2024-01-10' in page and b'2030-05-01' not in page
+
+    listed = auth_client.get('/api/v1/reservations?archived=1&limit=2').get_json()
+    assert [r['checkin'] for r in listed['reservations']] == ['2024-01-10', '2024-02-01']
+    rest = auth_client.get(f"/api/v1/reservations?archived=1&after={listed['next']}").get_json()
+    assert [(r['checkin'], r['room_number']) for r in rest['reservations']] == [('2024-03-01', '101')]
+    assert [r['checkin'] for r in auth_client.get('/api/v1/reservations').get_json()['reservations']] == ['2030-05-01']
+
+
+def test_archive_in_a_separate_database_file(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'hot.db'}",
+        'ARCHIVE_DATABASE_URL': f"sqlite:///{tmp_path / 'archive.db'}",
+    })
+    with app.app_context():
+        db.session.add(Room(id=1, number='101', type='Single', available=True))
+        db.session.add(Reservation(id=7, user_id=1, room_id=1, checkin=date(2024, 1, 1), checkout=date(2024, 1, 3)))
+        db.session.commit()
+        assert archive_reservations(date(2025, 1, 1)) == 1
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+    hot = sqlite3.connect(tmp_path / 'hot.db')
+    cold = sqlite3.connect(tmp_path / 'archive.db')
+    assert hot.execute('SELECT count(*) FROM reservation').fetchone() == (0,)
+    assert 'reservation_archive' not in {r[0] for r in hot.execute("SELECT name FROM sqlite_master")}
+    assert cold.execute('SELECT id, room_number FROM reservation_archive').fetchall() == [(7, '101')]
+
+
+def test_archiving_again_after_new_bookings_keeps_earlier_stays(auth_client, app):
+    with app.app_context():
+        db.session.add(Room(number='101', type='Single', available=True))
+        db.session.commit()
+    for checkin, checkout in [('2024-01-10', '2024-01-12'), ('2024-02-01', '2024-02-03')]:
+        response = auth_client.post('/api/v1/reservations', json={'room_id': 1, 'checkin': checkin,
+                                                                  'checkout': checkout})
+        assert response.status_code == 201
+        with app.app_context():
+            assert archive_reservations(date(2025, 1, 1)) == 1
+    with app.app_context():
+        archived = ArchivedReservation.query.order_by(ArchivedReservation.id).all()
+        assert [(a.id, a.checkin) for a in archived] == [(1, date(2024, 1, 10)), (2, date(2024, 2, 1))]
+        rebuild_rollups()
+        assert daily_rollup(date(2024, 1, 1), date(2024, 3, 1))['occupied'].sum() == 4
+
+
+def test_archive_leaves_stays_whose_id_is_archived_with_another_stay(auth_client, app):
+    with app.app_context():
+        db.session.add(Room(number='101', type='Single', available=True))
+        db.session.commit()
+        db.session.add(ArchivedReservation(id=1, user_id=1, room_id=1, checkin=date(2023, 5, 1),
+                                           checkout=date(2023, 5, 2)))
+        db.session.commit()
+    auth_client.post('/api/v1/reservations', json={'room_id': 1, 'checkin': '2024-01-10', 'checkout': '2024-01-12'})
+    with app.app_context():
+        assert archive_reservations(date(2025, 1, 1)) == 0
+        assert [r.checkin for r in Reservation.query] == [date(2024, 1, 10)]
+        assert db.session.get(ArchivedReservation, 1).checkin == date(2023, 5, 1)
@@ -0,0 +1,78 @@
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+
+
+def _stored_hash(app):
+    with app.app_context():
+        return User.query.filter_by(username='admin').one().password
+
+
+def test_authenticated_views_reuse_cached_user(auth_client, count_queries):
+    auth_client.get('/dashboard')
+    with count_queries() as counter:
+        auth_client.get('/dashboard')
+    # only the reservations page query: the user comes from the loader cache
+    assert counter.count == 1
+
+
+def test_login_upgrades_hash_made_with_other_cost(client, app):
+    with app.app_context():
+        user = User.query.filter_by(username='admin').one()
+        user.password = generate_password_hash('devpass', method='pbkdf2:sha256:2000')
+        db.session.commit()
+
+    response = client.post('/login', data={'username': 'admin', 'password': 'devpass'})
+    assert response.status_code == 302
+    assert _stored_hash(app).startswith('pbkdf2:sha256:1000$')
+
+
+def test_login_keeps_hash_made_with_default_parameters(client, app):
+    # "scrypt" se guarda como "scrypt:32768:8:1": no debe rehacerse en cada login
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    with app.app_context():
+        user = User.query.filter_by(username='admin').one()
+        user.password = generate_password_hash('devpass', method='scrypt')
+        db.session.commit()
+    stored = _stored_hash(app)
+
+    assert client.post('/login', data={'username': 'admin', 'password': 'devpass'}).status_code == 302
+    assert _stored_hash(app) == stored
+
+
+def test_password_change_invalidates_cached_user(auth_client, app):
+    auth_client.get('/dashboard')
+    response = auth_client.post('/password', data={
+        'current_password': 'devpass', 'password': 'newpass', 'confirm_password': 'newpass',
+    })
+    assert response.status_code == 302
+    with app.app_context():
+        assert app.extensions['user_cache'].get(1) == (False, None)
+
+    auth_client.get('/logout')
+    response = auth_client.post('/login', data={'username': 'admin', 'password': 'newpass'})
+    assert response.status_code == 302
+
+
+def test_cached_user_is_checked_against_the_current_hash(auth_client, app):
+    auth_client.get('/dashboard')
+    assert 'password' not in app.extensions['user_cache'].get(1)[1]
+    # cambio hecho por otro worker: esta caché sigue teniendo al usuario
+    with app.app_context():
+        User.query.filter_by(username='admin').one().password = generate_password_hash(
+            'otherpass', method='pbkdf2:sha256:1000')
+        db.session.commit()
+    assert app.extensions['user_cache'].get(1)[0]
+
+    form = {'password': 'newpass', 'confirm_password': 'newpass'}
+    response = auth_client.post('/password', data={**form, 'current_password': 'devpass'})
+    assert 'Contraseña actual incorrecta' in response.get_data(as_text=True)
+    assert auth_client.post('/password', data={**form, 'current_password': 'otherpass'}).status_code == 302
+
+
+def test_logout_drops_cached_user(auth_client, app):
+    auth_client.get('/dashboard')
+    assert app.extensions['user_cache'].get(1)[0]
+    auth_client.get('/logout')
+    assert app.extensions['user_cache'].get(1) == (False, None)
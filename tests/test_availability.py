@@ -0,0 +1,160 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import db
+from app.models import Room, Reservation, RoomNight
+from app.availability import available_rooms_query, flexible_search, occupy_nights, rebuild_room_nights
+
+
+def _seed_rooms(n, rtype='Single'):
+    db.session.add_all([Room(number=f'{rtype}-{i}', type=rtype, available=True) for i in range(n)])
+    db.session.commit()
+
+
+def test_overlapping_rooms_are_excluded(app):
+    with app.app_context():
+        _seed_rooms(3)
+        booked = Room.query.filter_by(number='Single-0').first()
+        reservation = Reservation(user_id=1, room_id=booked.id, checkin=date(2030, 12, 1), checkout=date(2030, 12, 3))
+        db.session.add(reservation)
+        db.session.flush()
+        occupy_nights(reservation)
+        db.session.commit()
+
+        rooms = available_rooms_query('Single', date(2030, 12, 2), date(2030, 12, 4)).all()
+        assert [r.number for r in rooms] == ['Single-1', 'Single-2']
+
+        # checkout day is free for a new checkin
+        rooms = available_rooms_query('Single', date(2030, 12, 3), date(2030, 12, 4)).all()
+        assert 'Single-0' in [r.number for r in rooms]
+
+
+def test_type_filter_is_applied(app):
+    with app.app_context():
+        _seed_rooms(2, 'Single')
+        _seed_rooms(2, 'Suite')
+        rooms = available_rooms_query('Suite').all()
+        assert {r.type for r in rooms} == {'Suite'}
+
+
+@pytest.mark.parametrize('n_rooms', [5, 200])
+def test_search_query_count_is_constant(auth_client, app, count_queries, n_rooms):
+    with app.app_context():
+        _seed_rooms(n_rooms)
+    with count_queries() as counter:
+        response = auth_client.get('/reserve?type=Single&checkin=2030-12-01&checkout=2030-12-05')
+    assert response.status_code == 200
+    assert response.data.count(b'<option value="') >= n_rooms
+    # user loader + availability search, independent of the inventory size
+    assert counter.count <= 3
+
+
+def test_booking_and_cancel_keep_nights_in_sync(auth_client, app):
+    with app.app_context():
+        _seed_rooms(1)
+        room_id = Room.query.first().id
+
+    auth_client.post('/reserve', data={'room_id': room_id, 'checkin': '2030-12-01', 'checkout': '2030-12-04'})
+    with app.app_context():
+        reservation = Reservation.query.one()
+        nights = [n.night for n in RoomNight.query.order_by(RoomNight.night)]
+        assert nights == [date(2030, 12, 1), date(2030, 12, 2), date(2030, 12, 3)]
+        reservation_id = reservation.id
+
+    auth_client.post(f'/reservations/{reservation_id}/cancel')
+    with app.app_context():
+        assert Reservation.query.count() == 0
+        assert RoomNight.query.count() == 0
+
+
+def test_rebuild_room_nights_backfills_existing_reservations(app):
+    with app.app_context():
+        _seed_rooms(1)
+        room_id = Room.query.first().id
+        db.session.add(Reservation(user_id=1, room_id=room_id, checkin=date(2030, 12, 1), checkout=date(2030, 12, 3)))
+        db.session.commit()
+
+        assert rebuild_room_nights() == 2
+        assert available_rooms_query('Single', date(2030, 12, 2), date(2030, 12, 3)).count() == 0
+
+
+def _book(room_number, checkin, checkout):
+    room = Room.query.filter_by(number=room_number).first()
+    reservation = Reservation(user_id=1, room_id=room.id, checkin=checkin, checkout=checkout)
+    db.session.add(reservation)
+    db.session.flush()
+    occupy_nights(reservation)
+    db.session.commit()
+
+
+def test_flexible_search_matches_per_date_search(app):
+    with app.app_context():
+        _seed_rooms(3, 'Single')
+        _seed_rooms(1, 'Suite')
+        _book('Single-0', date(2030, 12, 1), date(2030, 12, 20))
+        _book('Single-1', date(2030, 12, 8), date(2030, 12, 12))
+        _book('Single-2', date(2030, 12, 5), date(2030, 12, 9))
+        _book('Suite-0', date(2030, 12, 9), date(2030, 12, 11))
+
+        found = flexible_search(date(2030, 12, 10), 2, tolerance=4, limit=100)
+        assert set(found) == {'Single', 'Suite'}
+        for rtype, windows in found.items():
+            expected = set()
+            for offset in range(-4, 5):
+                day = date(2030, 12, 10 + offset)
+                expected |= {(r.number, day) for r in available_rooms_query(rtype, day, date(2030, 12, 12 + offset))}
+            assert {(w['number'], w['checkin']) for w in windows} == expected
+
+        # closest to the requested date first
+        assert [abs(w['offset']) for w in found['Single']] == sorted(abs(w['offset']) for w in found['Single'])
+        assert found['Suite'][0]['checkin'] == date(2030, 12, 11)
+
+
+def test_flexible_search_limit_and_type(app):
+    with app.app_context():
+        _seed_rooms(3, 'Single')
+        _seed_rooms(2, 'Suite')
+        found = flexible_search(date(2030, 12, 10), 3, tolerance=2, room_type='Suite', limit=2)
+        assert list(found) == ['Suite']
+        assert [(w['number'], w['offset']) for w in found['Suite']] == [('Suite-0', 0), ('Suite-1', 0)]
+        assert found['Suite'][0]['checkout'] == date(2030, 12, 13)
+
+
+def test_flexible_search_never_suggests_past_dates(app):
+    today = date.today()
+    with app.app_context():
+        _seed_rooms(1, 'Single')
+        found = flexible_search(today + timedelta(days=1), 2, tolerance=5, limit=100)
+        assert min(w['checkin'] for w in found['Single']) == today
+        assert sorted(w['offset'] for w in found['Single']) == [-1, 0, 1, 2, 3, 4, 5]
+        assert found['Single'][0]['offset'] == 0
+        assert flexible_search(today - timedelta(days=10), 2, tolerance=3) == {}
+
+
+def test_reserve_suggests_nearby_dates_when_full(auth_client, app):
+    with app.app_context():
+        _seed_rooms(1, 'Single')
+        _book('Single-0', date(2030, 12, 1), date(2030, 12, 5))
+
+    response = auth_client.get('/reserve?type=Single&checkin=2030-12-03&checkout=2030-12-05')
+    assert response.status_code == 200
+    assert b'Fechas alternativas' in response.data
+    assert b'checkin=2030-12-05&amp;checkout=2030-12-07' in response.data
+
+    response = auth_client.get('/reserve?type=Single&checkin=2030-12-10&checkout=2030-12-12')
+    assert b'Fechas alternativas' not in response.data
+
+
+def test_reserve_flex_is_clamped_to_the_allowed_tolerance(auth_client, app):
+    with app.app_context():
+        _seed_rooms(1, 'Single')
+        _book('Single-0', date(2030, 12, 1), date(2030, 12, 5))
+    search = '/reserve?type=Single&checkin=2030-12-03&checkout=2030-12-05&flex='
+
+    # flex=0 pide solo la fecha exacta, sin caer en la tolerancia por defecto
+    assert b'Fechas alternativas' not in auth_client.get(search + '0').data
+    response = auth_client.get(search + '-5')
+    assert response.status_code == 200 and b'Fechas alternativas' not in response.data
+    response = auth_client.get(search + '999')
+    assert response.status_code == 200 and b'checkin=2030-12-05&amp;checkout=2030-12-07' in response.data
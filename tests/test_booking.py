@@ -0,0 +1,79 @@
+import random
+import threading
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models import Room, Reservation, RoomNight
+from app.availability import nights
+from app.booking import book_room, RoomUnavailable
+
+
+@pytest.fixture
+def room_id(app):
+    with app.app_context():
+        room = Room(number='101', type='Single', available=True)
+        db.session.add(room)
+        db.session.commit()
+        return room.id
+
+
+def _hammer(app, room_id, ranges):
+    """Fire one booking per range from its own thread, all released at once."""
+    barrier = threading.Barrier(len(ranges))
+    results = [None] * len(ranges)
+
+    def worker(i, checkin, checkout):
+        with app.app_context():
+            barrier.wait()
+            try:
+                book_room(1, room_id, checkin, checkout, retries=50)
+                results[i] = 'ok'
+            except RoomUnavailable:
+                results[i] = 'conflict'
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(i, *r)) for i, r in enumerate(ranges)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_booking_does_not_take_room_out_of_inventory(app, room_id):
+    with app.app_context():
+        book_room(1, room_id, date(2025, 12, 1), date(2025, 12, 3))
+        assert db.session.get(Room, room_id).available is True
+        with pytest.raises(RoomUnavailable):
+            book_room(1, room_id, date(2025, 12, 2), date(2025, 12, 4))
+        book_room(1, room_id, date(2025, 12, 3), date(2025, 12, 4))
+
+
+def test_concurrent_identical_bookings_have_one_winner(app, room_id):
+    results = _hammer(app, room_id, [(date(2025, 12, 1), date(2025, 12, 4))] * 200)
+    assert results.count('ok') == 1
+    assert results.count('conflict') == 199
+    with app.app_context():
+        assert Reservation.query.count() == 1
+        assert RoomNight.query.count() == 3
+
+
+def test_concurrent_overlapping_bookings_never_share_a_night(app, room_id):
+    rng = random.Random(7)
+    ranges = []
+    for _ in range(200):
+        start = rng.randint(1, 25)
+        ranges.append((date(2025, 12, start), date(2025, 12, start + rng.randint(1, 5))))
+    results = _hammer(app, room_id, ranges)
+    assert 'ok' in results
+
+    with app.app_context():
+        booked = Counter()
+        for r in Reservation.query.all():
+            booked.update(nights(r.checkin, r.checkout))
+        assert booked and max(booked.values()) == 1
+        assert RoomNight.query.count() == sum(booked.values())
@@ -0,0 +1,95 @@
+import io
+import json
+import sqlite3
+
+from sqlalchemy import event
+
+from app import db
+from app.models import Room, Reservation, RoomNight
+
+
+def test_bulk_rooms_json_reports_each_row(auth_client, app):
+    with app.app_context():
+        db.session.add(Room(number='101', type='Single', available=True))
+        db.session.commit()
+
+    response = auth_client.post('/rooms/bulk', json=[
+        {'number': '101', 'type': 'Single'},
+        {'number': '102', 'type': 'Double'},
+        {'number': '102', 'type': 'Double'},
+        {'number': '', 'type': 'Suite'},
+        {'number': '103', 'type': 'Suite'},
+    ])
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['created'] == 2 and body['failed'] == 3
+    assert [r['success'] for r in body['results']] == [False, True, False, False, True]
+    assert body['results'][0]['error'] == 'room already exists'
+    with app.app_context():
+        assert Room.query.count() == 3
+
+
+def test_bulk_rooms_revalidates_after_a_concurrent_insert(auth_client, app):
+    with app.app_context():
+        engine, path = db.engine, db.engine.url.database
+    raced = []
+
+    def concurrent_insert(conn, cursor, statement, *args):
+        # otra petición crea la 102 entre la comprobación IN (...) y el INSERT del lote
+        if statement.startswith('INSERT INTO room ') and not raced:
+            raced.append(True)
+            with sqlite3.connect(path) as other:
+                other.execute("INSERT INTO room (number, type, available) VALUES ('102', 'Suite', 1)")
+
+    event.listen(engine, 'before_cursor_execute', concurrent_insert)
+    try:
+        response = auth_client.post('/rooms/bulk', json=[{'number': '101', 'type': 'Single'},
+                                                         {'number': '102', 'type': 'Double'}])
+    finally:
+        event.remove(engine, 'before_cursor_execute', concurrent_insert)
+    assert response.status_code == 200
+    assert [(r['success'], r.get('error')) for r in response.get_json()['results']] == [
+        (True, None), (False, 'room already exists')]
+    with app.app_context():
+        assert {r.number: r.type for r in Room.query} == {'101': 'Single', '102': 'Suite'}
+
+
+def test_bulk_rooms_rejects_non_array_body(auth_client):
+    response = auth_client.post('/rooms/bulk', json={'number': '1'})
+    assert response.status_code == 400
+
+
+def test_bulk_rooms_csv_stream(auth_client, app):
+    app.config['BULK_CHUNK_SIZE'] = 7
+    csv_data = 'number,type\n' + ''.join(f'{i},Single\n' for i in range(50))
+    response = auth_client.post(
+        '/rooms/bulk?stream=1',
+        data={'file': (io.BytesIO(csv_data.encode()), 'rooms.csv')},
+        content_type='multipart/form-data',
+    )
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(lines) == 50 and all(r['success'] for r in lines)
+    with app.app_context():
+        assert Room.query.count() == 50
+
+
+def test_bulk_reservations_checks_conflicts_in_batch_and_db(auth_client, app):
+    auth_client.post('/rooms/bulk', json=[{'number': '1', 'type': 'Single'}, {'number': '2', 'type': 'Single'}])
+    with app.app_context():
+        r1, r2 = [r.id for r in Room.query.order_by(Room.number)]
+    auth_client.post('/reserve', data={'room_id': r1, 'checkin': '2025-12-01', 'checkout': '2025-12-03'})
+
+    response = auth_client.post('/reservations/bulk', json=[
+        {'room_id': r1, 'checkin': '2025-12-02', 'checkout': '2025-12-04'},  # taken in db
+        {'room_id': r2, 'checkin': '2025-12-01', 'checkout': '2025-12-05'},
+        {'room_id': r2, 'checkin': '2025-12-04', 'checkout': '2025-12-06'},  # overlaps previous row
+        {'room_id': r1, 'checkin': '2025-12-03', 'checkout': '2025-12-05'},
+        {'room_id': r1, 'checkin': 'bad', 'checkout': '2025-12-05'},
+        {'room_id': 999, 'checkin': '2025-12-01', 'checkout': '2025-12-02'},
+    ])
+    body = response.get_json()
+    assert [r['success'] for r in body['results']] == [False, True, False, True, False, False]
+    with app.app_context():
+        assert Reservation.query.count() == 3
+        assert RoomNight.query.count() == 2 + 4 + 2
@@ -0,0 +1,86 @@
+from datetime import date
+
+from app import db
+from app.cache import AvailabilityCache, LRUCache
+from app.models import Room
+
+SEARCH = '/reserve?type=Single&checkin=2025-12-01&checkout=2025-12-05'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=None)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.stats.as_dict()['evictions'] == 1
+
+
+def test_lru_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+    cache.set('a', 1)
+    clock.now = 4
+    assert cache.get('a') == (True, 1)
+    clock.now = 6
+    assert cache.get('a') == (False, None)
+    stats = cache.stats.as_dict()
+    assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1)
+
+
+def test_invalidation_only_drops_affected_entries():
+    cache = AvailabilityCache(LRUCache(ttl=None))
+    searches = [
+        ('Single', date(2025, 12, 1), date(2025, 12, 5)),  # overlaps, same type
+        (None, date(2025, 12, 4), date(2025, 12, 6)),      # overlaps, any type
+        ('Suite', date(2025, 12, 1), date(2025, 12, 5)),   # other type
+        ('Single', date(2025, 12, 5), date(2025, 12, 8)),  # starts on checkout day
+        ('Single', None, None),                            # no dates: unaffected by bookings
+    ]
+    for search in searches:
+        cache.get_or_compute(*search, compute=lambda: ['rooms'])
+
+    assert cache.invalidate_stay('Single', date(2025, 12, 3), date(2025, 12, 5)) == 2
+    remaining = set(cache.backend.keys())
+    assert cache.make_key(*searches[2]) in remaining
+    assert cache.make_key(*searches[3]) in remaining
+    assert cache.make_key(*searches[4]) in remaining
+
+    assert cache.invalidate_room_type('Single') == 2
+    assert set(cache.backend.keys()) == {cache.make_key(*searches[2])}
+
+
+def test_search_is_served_from_cache_until_a_booking_commits(auth_client, app, count_queries):
+    with app.app_context():
+        db.session.add_all([Room(number=str(i), type='Single', available=True) for i in range(3)])
+        db.session.commit()
+        room_id = Room.query.filter_by(number='0').one().id
+
+    auth_client.get(SEARCH)
+    with count_queries() as counter:
+        response = auth_client.get(SEARCH)
+    assert response.data.count(b'<option value="') >= 3
+    assert counter.count == 0  # user and search both come from the caches
+
+    auth_client.post('/reserve', data={'room_id': room_id, 'checkin': '2025-12-02', 'checkout': '2025-12-03'})
+    response = auth_client.get(SEARCH)
+    assert f'<option value="{room_id}">'.encode() not in response.data
+
+    stats = auth_client.get('/cache/stats').get_json()
+    assert stats['enabled'] and stats['hits'] >= 1 and stats['invalidations'] >= 1
+
+
+def test_new_room_invalidates_its_type(auth_client, app):
+    auth_client.get(SEARCH)
+    auth_client.post('/rooms/add', data={'number': '900', 'type': 'Single'})
+    assert b'900 - Single' in auth_client.get(SEARCH).data
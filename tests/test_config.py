@@ -0,0 +1,66 @@
+from sqlalchemy import text
+
+from app import create_app, db
+
+
+def test_create_app_accepts_database_path(tmp_path):
+    app = create_app({'TESTING': True, 'DATABASE': str(tmp_path / 'legacy.db')})
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == f"sqlite:///{tmp_path / 'legacy.db'}"
+    assert (tmp_path / 'legacy.db').exists()
+
+
+def test_database_and_pool_come_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'env.db'}")
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    monkeypatch.setenv('DB_POOL_RECYCLE', '60')
+    app = create_app({'TESTING': True})
+    with app.app_context():
+        assert db.engine.url.database == str(tmp_path / 'env.db')
+        assert db.engine.pool.size() == 3
+        assert db.engine.pool._recycle == 60
+
+
+def test_sqlite_connections_use_wal(app):
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT_MS']
+
+
+def test_in_memory_database_is_supported():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        assert db.session.execute(text('SELECT 1')).scalar() == 1
+
+
+def test_schema_is_created_by_init_db_not_on_boot(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'prod.db'}"
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': uri, 'AUTO_CREATE_SCHEMA': False})
+    with app.app_context():
+        assert db.inspect(db.engine).get_table_names() == []
+
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert 'tabla reservation creada' in result.output
+    with app.app_context():
+        assert 'room_night' in db.inspect(db.engine).get_table_names()
+    assert app.test_cli_runner().invoke(args=['init-db']).output.strip() == 'esquema al día'
+
+
+def test_init_db_adds_missing_indexes_and_backfills(tmp_path):
+    from datetime import date
+    from app.models import OccupancyRollup, Reservation, Room, RoomNight
+
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'old.db'}"})
+    with app.app_context():
+        db.session.add(Room(id=1, number='101', type='Single'))
+        db.session.add(Reservation(user_id=1, room_id=1, checkin=date(2030, 1, 1), checkout=date(2030, 1, 3)))
+        db.session.commit()
+        # base de datos de una versión anterior: sin índices ni tablas derivadas rellenas
+        db.session.execute(text('DROP INDEX ix_reservation_room_dates'))
+        db.session.commit()
+
+    output = app.test_cli_runner().invoke(args=['init-db']).output
+    assert 'índice ix_reservation_room_dates creado' in output
+    with app.app_context():
+        assert RoomNight.query.count() == 2
+        assert OccupancyRollup.query.count() == 2
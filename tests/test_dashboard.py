@@ -0,0 +1,52 @@
+import re
+from datetime import date, timedelta
+
+from app import db
+from app.models import Room, Reservation
+
+
+def _seed_reservations(n):
+    room = Room(number='301', type='Suite', available=True)
+    db.session.add(room)
+    db.session.flush()
+    start = date(2025, 1, 1)
+    db.session.add_all([
+        Reservation(user_id=1, room_id=room.id, checkin=start + timedelta(days=i), checkout=start + timedelta(days=i + 1))
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+def _row_ids(html):
+    return [int(i) for i in re.findall(r'<tr>\s*<td>(\d+)</td>', html)]
+
+
+def test_dashboard_shows_room_details(auth_client, app):
+    with app.app_context():
+        _seed_reservations(1)
+    response = auth_client.get('/dashboard')
+    assert b'301' in response.data and b'Suite' in response.data
+
+
+def test_dashboard_keyset_pagination(auth_client, app):
+    app.config['DASHBOARD_PAGE_SIZE'] = 10
+    with app.app_context():
+        _seed_reservations(25)
+
+    seen = []
+    url = '/dashboard'
+    while url:
+        html = auth_client.get(url).data.decode()
+        seen.extend(_row_ids(html))
+        match = re.search(r'href="(/dashboard\?after=[^"]+)"', html)
+        url = match.group(1) if match else None
+    assert seen == list(range(1, 26))
+
+
+def test_dashboard_query_count_does_not_depend_on_rows(auth_client, app, count_queries):
+    with app.app_context():
+        _seed_reservations(20)
+    with count_queries() as counter:
+        auth_client.get('/dashboard')
+    # user loader + one joined page query
+    assert counter.count <= 2
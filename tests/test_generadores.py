@@ -0,0 +1,64 @@
+import io
+
+import pandas as pd
+import pytest
+
+from generadores import generar_defectos, generar_fixtures_hotel
+from sistema_metricas import generar_dataset
+
+
+def test_output_does_not_depend_on_workers(tmp_path):
+    serial = generar_defectos(str(tmp_path / 'a.csv'), 2500, seed=7, chunksize=1000)
+    parallel = generar_defectos(str(tmp_path / 'b.csv'), 2500, seed=7, chunksize=1000, workers=2)
+    a, b = pd.read_csv(serial), pd.read_csv(parallel)
+    assert len(a) == 2500 and a['id'].is_unique
+    pd.testing.assert_frame_equal(a, b)
+
+
+def test_distributions_are_applied(tmp_path):
+    weights = [0] * 9 + [1]
+    df = pd.read_csv(generar_defectos(str(tmp_path / 'd.csv'), 500, seed=1, days=3,
+                                      distribuciones={'severity': weights, 'status': [0, 0, 1]}))
+    assert set(df['severity']) == {10}
+    assert set(df['status']) == {'CLOSED'}
+    assert df['day'].nunique() <= 3
+
+
+def test_parquet_dataset_output(tmp_path):
+    pytest.importorskip('pyarrow')
+    out = generar_defectos(str(tmp_path / 'defects'), 2500, seed=2, chunksize=1000, formato='parquet')
+    assert len(pd.read_parquet(out)) == 2500
+
+
+def test_empty_outputs_keep_the_columns(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    empty = generar_defectos(str(tmp_path / 'd.parquet'), 0, seed=1)
+    full = generar_defectos(str(tmp_path / 'full.parquet'), 10, seed=1)
+    assert pq.read_schema(empty).remove_metadata() == pq.read_schema(full).remove_metadata()
+    dataset = pd.read_parquet(generar_defectos(str(tmp_path / 'defects'), 0, seed=1, formato='parquet'))
+    csv = pd.read_csv(generar_defectos(str(tmp_path / 'd.csv'), 0, seed=1))
+    for df in (pd.read_parquet(empty), dataset, csv):
+        assert df.empty and list(df.columns) == list(pd.read_parquet(full).columns)
+
+
+def test_generar_dataset_keeps_its_interface(tmp_path):
+    df = generar_dataset(str(tmp_path / 'd.csv'), n=50, seed=3)
+    assert list(df.columns) == ['id', 'day', 'severity', 'occurrence', 'detection', 'description', 'status']
+    assert len(pd.read_csv(tmp_path / 'd.csv')) == 50
+
+
+def test_hotel_fixtures_never_overlap(tmp_path):
+    paths = generar_fixtures_hotel(str(tmp_path / 'fx'), rooms=30, stays=10, seed=5, chunksize=50)
+    rooms = pd.read_csv(paths['rooms'])
+    reservations = pd.read_csv(paths['reservations'], parse_dates=['checkin', 'checkout'])
+    assert rooms['number'].is_unique and len(reservations) == 300
+    for _, stays in reservations.sort_values('checkin').groupby('room_id'):
+        assert (stays['checkin'].iloc[1:].values >= stays['checkout'].iloc[:-1].values).all()
+
+
+def test_room_fixtures_load_through_bulk_import(auth_client, tmp_path):
+    paths = generar_fixtures_hotel(str(tmp_path / 'fx'), rooms=40, stays=2, seed=5)
+    with open(paths['rooms'], 'rb') as fh:
+        response = auth_client.post('/rooms/bulk', data={'file': (io.BytesIO(fh.read()), 'rooms.csv')},
+                                    content_type='multipart/form-data')
+    assert response.get_json()['created'] == 40
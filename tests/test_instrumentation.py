@@ -0,0 +1,90 @@
+import logging
+import os
+
+import pytest
+
+from app import create_app, db
+from app.models import Room
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    apps = []
+
+    def factory(**config):
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'instr.db'}",
+            'PROFILE_DIR': str(tmp_path / 'profiles'),
+            **config,
+        })
+        apps.append(app)
+        return app
+    yield factory
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_metrics_endpoint_exposes_latency_and_queries(auth_client):
+    resp = auth_client.get('/dashboard')
+    assert resp.status_code == 200
+    assert resp.headers['Server-Timing'].startswith('app;dur=')
+
+    text = auth_client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE hotel_request_duration_seconds histogram' in text
+    assert 'hotel_request_duration_seconds_count{endpoint="main.dashboard",method="GET"} 1' in text
+    assert 'hotel_request_sql_queries_bucket{endpoint="main.dashboard",le="+Inf"} 1' in text
+    assert 'hotel_responses_total{endpoint="auth.login",status="302"} 1' in text
+    assert 'hotel_availability_cache{stat="hits"}' in text
+
+
+def test_repeated_statement_is_flagged_as_n_plus_one(make_app, caplog):
+    app = make_app(N_PLUS_ONE_THRESHOLD=5)
+
+    @app.route('/loop')
+    def loop():
+        for i in range(6):
+            Room.query.filter_by(number=str(i)).first()
+        return 'ok'
+
+    with caplog.at_level(logging.WARNING, logger='app.instrumentation'):
+        app.test_client().get('/loop')
+        app.test_client().get('/metrics')
+    assert any('possible N+1 in loop: 6 x' in r.message for r in caplog.records)
+    assert app.extensions['metrics'].n_plus_one.value(('loop',)) == 1
+    assert app.extensions['metrics'].n_plus_one.value(('metrics',)) == 0
+
+
+def test_slow_query_log_threshold(make_app, caplog):
+    app = make_app(SLOW_QUERY_MS=0)
+    with caplog.at_level(logging.WARNING, logger='app.instrumentation'):
+        app.test_client().get('/login')
+        with app.app_context():
+            db.session.query(Room).count()
+    assert any(r.message.startswith('slow query') for r in caplog.records)
+    assert app.extensions['metrics'].slow_queries.value(('-',)) >= 1
+
+
+def test_profile_header_is_opt_in(make_app):
+    assert 'X-Profile-File' not in make_app().test_client().get('/login', headers={'X-Profile': '1'}).headers
+
+    app = make_app(PROFILING=True, PROFILE_INTERVAL_MS=1)
+
+    @app.route('/busy')
+    def busy():
+        return str(sum(i * i for i in range(300_000)))
+
+    resp = app.test_client().get('/busy', headers={'X-Profile': '1'})
+    with open(resp.headers['X-Profile-File']) as fh:
+        lines = fh.read().splitlines()
+    assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any('busy (test_instrumentation.py' in line for line in lines)
+    assert 'X-Profile-File' not in app.test_client().get('/busy').headers
+    assert len(os.listdir(app.config['PROFILE_DIR'])) == 1
+
+
+def test_instrumentation_can_be_disabled(make_app):
+    app = make_app(INSTRUMENTATION=False)
+    assert 'metrics' not in app.extensions
+    assert app.test_client().get('/metrics').status_code == 404
@@ -0,0 +1,49 @@
+import os
+
+from generadores import generar_defectos
+import make_dashboards
+from make_dashboards import CHARTS, generar_dashboards
+
+
+def test_renders_all_charts_then_skips_unchanged(tmp_path):
+    data = tmp_path / 'proyectos'
+    data.mkdir()
+    for i, name in enumerate(('alpha', 'beta', 'gamma')):
+        generar_defectos(str(data / f'{name}.csv'), 300, seed=i, days=10)
+    out = str(tmp_path / 'out')
+
+    rendered = generar_dashboards([str(data)], out, workers=2)
+    assert rendered == {name: list(CHARTS) for name in ('alpha', 'beta', 'gamma')}
+    assert all(os.path.getsize(os.path.join(out, f'{p}_{c}.png')) for p in rendered for c in CHARTS)
+
+    assert generar_dashboards([str(data)], out, workers=1) == {'alpha': [], 'beta': [], 'gamma': []}
+
+    generar_defectos(str(data / 'beta.csv'), 400, seed=9, days=10)
+    rendered = generar_dashboards([str(data)], out, workers=1)
+    assert rendered['alpha'] == [] and rendered['gamma'] == []
+    assert 'trend' in rendered['beta']
+
+
+def test_touched_file_with_same_content_renders_nothing(tmp_path):
+    path = str(tmp_path / 'p.csv')
+    generar_defectos(path, 200, seed=3, days=5)
+    out = str(tmp_path / 'out')
+    generar_dashboards([path], out, workers=1)
+    os.utime(path, None)
+    assert generar_dashboards([path], out, workers=1) == {'p': []}
+
+
+def test_changed_render_parameters_or_chart_code_render_again(tmp_path, monkeypatch):
+    path = str(tmp_path / 'p.csv')
+    generar_defectos(path, 200, seed=3, days=5)
+    out = str(tmp_path / 'out')
+    generar_dashboards([path], out, workers=1)
+
+    # el histograma de severidad no depende de los parámetros
+    assert generar_dashboards([path], out, workers=1, max_open=0, window=3, coverage=10) == {'p': ['trend', 'criteria']}
+    assert generar_dashboards([path], out, workers=1, max_open=0, window=3, coverage=10) == {'p': []}
+    # solo cambia el umbral de abiertos: el resto de gráficos tienen los mismos datos
+    assert generar_dashboards([path], out, workers=1, max_open=1000, window=3, coverage=10) == {'p': ['criteria']}
+
+    monkeypatch.setattr(make_dashboards, 'CHARTS_VERSION', make_dashboards.CHARTS_VERSION + 1)
+    assert generar_dashboards([path], out, workers=1, max_open=1000, window=3, coverage=10) == {'p': list(CHARTS)}
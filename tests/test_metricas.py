@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sistema_metricas import (MetricasIncrementales, MetricasTesting, calcular_rpn, cargar_parquet, convertir_a_parquet,
+                              iterar_defectos)
+
+
+def _defects(n, seed=0, days=40):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'day': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, days, n), unit='D'),
+        'severity': rng.integers(1, 11, n),
+        'occurrence': rng.integers(1, 11, n),
+        'detection': rng.integers(1, 11, n),
+        'status': rng.choice(['OPEN', 'IN_PROGRESS', 'CLOSED'], n),
+    })
+
+
+@pytest.fixture
+def defects_csv(tmp_path):
+    path = tmp_path / 'defects.csv'
+    _defects(2000).to_csv(path, index=False)
+    return str(path)
+
+
+def test_incremental_batches_match_full_recompute(defects_csv):
+    full = pd.read_csv(defects_csv, parse_dates=['day'])
+    motor = MetricasIncrementales()
+    shuffled = full.sample(frac=1, random_state=1)
+    for start in range(0, len(shuffled), 300):
+        motor.ingest(shuffled.iloc[start:start + 300])
+
+    daily = full.groupby('day').size().rename('defects').sort_index()
+    expected_trend = daily.rolling(window=5, min_periods=1).mean()
+    pd.testing.assert_series_equal(motor.detectar_tendencia(5), expected_trend, check_names=False, check_freq=False)
+
+    res = motor.criterios_salida(85.0, 10_000, trend_window=5)
+    assert res['details']['open_defects'] == int((full['status'] != 'CLOSED').sum())
+    assert res['details']['trend_last'] == pytest.approx(expected_trend.iloc[-1])
+    assert res['details']['trend_prev'] == pytest.approx(expected_trend.iloc[-2])
+    assert res['trend_ok'] == (expected_trend.iloc[-1] <= expected_trend.iloc[-2])
+
+
+def test_metricas_testing_appends_batches(defects_csv):
+    metricas = MetricasTesting(defects_csv)
+    before = metricas.criterios_salida(90.0, 10_000)['details']['open_defects']
+    metricas.agregar_defectos(_defects(100, seed=3).assign(status='OPEN'))
+    after = metricas.criterios_salida(90.0, 10_000)['details']['open_defects']
+    assert after == before + 100
+    assert metricas.defect_summary()['total_defects'] == 2100
+
+
+def test_merge_equals_single_engine():
+    df = _defects(500)
+    a = MetricasIncrementales.desde_df(df.iloc[:200])
+    b = MetricasIncrementales.desde_df(df.iloc[200:])
+    merged = a.merge(b)
+    whole = MetricasIncrementales.desde_df(df)
+    assert merged.daily_counts == whole.daily_counts
+    assert merged.status_counts == whole.status_counts
+    assert merged.defect_summary() == whole.defect_summary()
+
+
+def test_no_data_exit_criteria():
+    res = MetricasTesting('').criterios_salida(50.0, 0)
+    assert res['details']['open_defects'] == 0 and res['trend_ok'] is False
+
+
+def test_csv_is_loaded_with_compact_dtypes(defects_csv):
+    df = MetricasTesting(defects_csv).history_df
+    assert 'description' not in df.columns
+    assert df['status'].dtype == 'category'
+    assert all(df[c].dtype == 'int8' for c in ('severity', 'occurrence', 'detection'))
+
+
+def test_parquet_dataset_round_trip_and_recent_window(defects_csv, tmp_path):
+    pytest.importorskip('pyarrow')
+    out = convertir_a_parquet(defects_csv, str(tmp_path / 'defects'), chunksize=500)
+    assert sorted(p.name for p in (tmp_path / 'defects').iterdir()) == ['month=202501', 'month=202502']
+
+    from_csv = MetricasTesting(defects_csv)
+    from_parquet = MetricasTesting(out)
+    assert from_parquet.defect_summary() == from_csv.defect_summary()
+    assert from_parquet.history_df['status'].dtype == 'category'
+
+    # convertir otra vez sustituye el dataset en lugar de duplicar sus filas
+    assert convertir_a_parquet(defects_csv, str(tmp_path / 'defects'), chunksize=500) == out
+    assert len(cargar_parquet(out)) == 2000
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['defects', 'defects.csv']
+
+    recent = cargar_parquet(out, ultimos_dias=5, hasta='2025-02-09')
+    assert recent['day'].min() >= pd.Timestamp('2025-02-05')
+    full = from_csv.history_df
+    assert len(recent) == int((full['day'] >= '2025-02-05').sum())
+
+
+def test_streaming_mode_matches_in_memory(defects_csv):
+    full = MetricasTesting(defects_csv)
+    streamed = MetricasTesting(defects_csv, chunksize=128)
+    assert streamed.history_df is None
+    assert streamed.criterios_salida(85.0, 1500) == full.criterios_salida(85.0, 1500)
+    assert streamed.defect_summary() == full.defect_summary()
+    pd.testing.assert_series_equal(streamed.detectar_tendencia(), full.detectar_tendencia())
+
+
+def test_streaming_from_batch_generator_and_parquet(defects_csv, tmp_path):
+    pytest.importorskip('pyarrow')
+    out = convertir_a_parquet(defects_csv, str(tmp_path / 'defects'))
+    full = MetricasTesting(defects_csv)
+    from_batches = MetricasTesting.desde_lotes(iterar_defectos(out, chunksize=100))
+    assert from_batches.defect_summary() == full.defect_summary()
+
+    recent = MetricasIncrementales.desde_lotes(iterar_defectos(out, chunksize=100, ultimos_dias=5, hasta='2025-02-09'))
+    assert recent.total == int((full.history_df['day'] >= '2025-02-05').sum())
+
+
+def test_read_errors_are_raised(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        MetricasTesting(str(tmp_path / 'missing.csv'))
+
+
+def test_rpn_engine_matches_pandas_across_batches():
+    df = _defects(3000, seed=5)
+    df['rpn'] = df['severity'] * df['occurrence'] * df['detection']
+    motor = MetricasIncrementales()
+    for start in range(0, len(df), 400):
+        motor.ingest(df.iloc[start:start + 400].drop(columns='rpn'))
+
+    expected = df[df['status'] != 'CLOSED'].sort_values(['rpn', 'id'], ascending=[False, True]).head(25)
+    assert motor.rpn.top_abiertos(25)['id'].tolist() == expected['id'].tolist()
+
+    percentiles = motor.rpn.percentiles_diarios((10, 50, 95))
+    quantiles = df.groupby('day')['rpn'].quantile([0.1, 0.5, 0.95]).unstack()
+    np.testing.assert_allclose(percentiles.to_numpy(), quantiles.to_numpy())
+
+    matrix = motor.rpn.matriz_riesgo('rpn_medio')
+    pivot = df.pivot_table(index='severity', columns='occurrence', values='rpn', aggfunc='mean')
+    np.testing.assert_allclose(matrix.to_numpy(), pivot.to_numpy())
+    assert motor.rpn.matriz_riesgo().to_numpy().sum() == len(df)
+
+
+def test_rpn_exit_criterion_and_cache(defects_csv):
+    metricas = MetricasTesting(defects_csv)
+    highest = int(metricas.ranking_rpn(1)['rpn'].iloc[0])
+    res = metricas.criterios_salida(90.0, 10_000, max_rpn_abierto=highest - 1)
+    assert res['rpn_ok'] is False and res['details']['max_open_rpn'] == highest
+    assert metricas.criterios_salida(90.0, 10_000, max_rpn_abierto=highest)['rpn_ok'] is True
+    assert 'rpn_ok' not in metricas.criterios_salida(90.0, 10_000)
+
+    assert metricas.ranking_rpn(5) is not metricas.ranking_rpn(5)
+    huella = metricas.huella()
+    critical = pd.DataFrame({'id': [10**6], 'day': [pd.Timestamp('2025-03-01')], 'severity': [10],
+                             'occurrence': [10], 'detection': [10], 'status': ['OPEN']})
+    metricas.agregar_defectos(critical)
+    assert metricas.huella() != huella
+    assert metricas.ranking_rpn(1)['rpn'].tolist() == [1000]
+    assert metricas.criterios_salida(90.0, 10_000, max_rpn_abierto=999)['rpn_ok'] is False
+
+
+def test_out_of_range_scores_only_leave_the_rpn_aggregates(tmp_path):
+    bad = _defects(10).assign(detection=0)
+    with pytest.raises(ValueError, match='detection'):
+        calcular_rpn(bad)
+
+    df = _defects(200, seed=2)
+    df.loc[3, 'severity'] = 0
+    path = tmp_path / 'defects.csv'
+    df.to_csv(path, index=False)
+    for metricas in (MetricasTesting(str(path)), MetricasTesting(str(path), chunksize=50)):
+        assert metricas.defect_summary()['total_defects'] == 200
+        assert len(metricas.detectar_tendencia()) == df['day'].nunique()
+        res = metricas.criterios_salida(90.0, 10_000, max_rpn_abierto=1000)
+        assert res['open_defects_ok'] and res['details']['invalid_rpn_rows'] == 1
+        assert metricas.matriz_riesgo().to_numpy().sum() == 199
+        assert 3 not in metricas.ranking_rpn(200)['id'].tolist()
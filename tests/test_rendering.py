@@ -0,0 +1,101 @@
+import gzip
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Room, User
+
+SEARCH = '/reserve?type=Single&checkin=2025-12-01&checkout=2025-12-05'
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def _seed_rooms(n):
+    db.session.add_all([Room(number=str(100 + i), type='Single', available=True) for i in range(n)])
+    db.session.commit()
+
+
+def _search(client, **kwargs):
+    client.get(SEARCH)  # consume el flash del login, que solo sale en la primera página
+    return client.get(SEARCH, **kwargs)
+
+
+def test_fragments_are_reused_until_a_version_changes(auth_client, app):
+    with app.app_context():
+        _seed_rooms(3)
+    fragments = app.extensions['fragment_cache']
+    first = _search(auth_client).data
+    misses = fragments.stats.misses
+    assert auth_client.get(SEARCH).data == first
+    assert fragments.stats.misses == misses
+
+    auth_client.post('/reserve', data={'room_id': 1, 'checkin': '2025-12-02', 'checkout': '2025-12-03'})
+    page = auth_client.get(SEARCH).data
+    assert b'<option value="1">' not in page and b'<option value="2">' in page
+
+    dashboard = auth_client.get('/dashboard').data
+    assert b'2025-12-02' in dashboard
+    auth_client.post('/reserve', data={'room_id': 2, 'checkin': '2025-12-10', 'checkout': '2025-12-11'})
+    assert b'2025-12-10' in auth_client.get('/dashboard').data
+
+
+def test_dashboard_fragments_are_per_user(auth_client, app):
+    with app.app_context():
+        _seed_rooms(1)
+        db.session.add(User(username='otra', password=generate_password_hash('pw', method='pbkdf2:sha256:1000')))
+        db.session.commit()
+    auth_client.post('/reserve', data={'room_id': 1, 'checkin': '2025-12-02', 'checkout': '2025-12-03'})
+    assert b'2025-12-02' in auth_client.get('/dashboard').data
+
+    other = app.test_client()
+    other.post('/login', data={'username': 'otra', 'password': 'pw'})
+    other.post('/reserve', data={'room_id': 1, 'checkin': '2025-12-05', 'checkout': '2025-12-06'})
+    page = other.get('/dashboard').data
+    assert b'2025-12-05' in page and b'2025-12-02' not in page
+
+
+def test_large_responses_are_compressed(auth_client, app):
+    with app.app_context():
+        _seed_rooms(100)
+    plain = _search(auth_client)
+    assert 'Content-Encoding' not in plain.headers
+
+    packed = auth_client.get(SEARCH, headers=GZIP)
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in packed.headers['Vary']
+    assert gzip.decompress(packed.data) == plain.data
+    assert len(packed.data) < len(plain.data) / 4
+
+    # por debajo del umbral se envía tal cual
+    small = auth_client.get('/cache/stats', headers=GZIP)
+    assert 'Content-Encoding' not in small.headers
+
+
+def test_compressed_api_etag_is_weak_and_still_revalidates(auth_client, app):
+    with app.app_context():
+        _seed_rooms(100)
+    url = '/api/v1/availability?type=Single&checkin=2025-12-01&checkout=2025-12-05'
+    response = auth_client.get(url, headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert auth_client.get(url, headers={**GZIP, 'If-None-Match': etag}).status_code == 304
+
+
+def test_large_listings_are_streamed(auth_client, app):
+    app.config.update(STREAM_MIN_ROWS=50, STREAM_CHUNK_SIZE=512)
+    with app.app_context():
+        _seed_rooms(60)
+    response = _search(auth_client, buffered=False)
+    assert response.is_streamed
+    body = response.get_data()
+    assert body.count(b'<option value="') == 60 + 4 and body.rstrip().endswith(b'</html>')
+    assert b'flush' not in body
+
+    packed = auth_client.get(SEARCH, headers=GZIP)
+    assert 'Content-Length' not in packed.headers
+    assert gzip.decompress(packed.data) == body
+
+    # el flash de la reserva se muestra una vez aunque la página vaya en streaming
+    auth_client.post('/reserve', data={'room_id': 999, 'checkin': '2025-12-01', 'checkout': '2025-12-02'})
+    assert 'no está disponible' in auth_client.get(SEARCH).get_data(as_text=True)
+    assert 'no está disponible' not in auth_client.get(SEARCH).get_data(as_text=True)
@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import Property, Reservation, Room, User
+from app.sharding import fan_out, using_property
+
+
+@pytest.fixture
+def chain(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'main.db'}",
+        'SHARD_URL_TEMPLATE': f"sqlite:///{tmp_path / 'shards' / 'property_{property}.db'}",
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    })
+    with app.app_context():
+        db.session.add(User(username='admin', password=generate_password_hash('devpass', method='pbkdf2:sha256:1000')))
+        db.session.add_all([Property(name='Centro'), Property(name='Playa')])
+        db.session.commit()
+        for property_id in (1, 2):
+            with using_property(property_id):
+                db.session.add_all([Room(number='101', type='Single', available=True),
+                                    Room(number='102', type='Suite', available=True)])
+                db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        app.extensions['shard_router'].dispose()
+
+
+def _rows(path, sql):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def test_bookings_touch_only_their_shard(chain, tmp_path):
+    client = chain.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'devpass'})
+    body = {'room_id': 1, 'checkin': '2025-12-01', 'checkout': '2025-12-03'}
+    assert client.post('/api/v1/reservations?property=2', json=body).status_code == 201
+    # misma habitación y fechas en otra propiedad: no hay conflicto
+    assert client.post('/api/v1/reservations?property=1', json=body).status_code == 201
+    assert client.post('/api/v1/reservations?property=1', json=body).status_code == 409
+
+    shards = tmp_path / 'shards'
+    assert _rows(shards / 'property_1.db', 'SELECT property_id, room_id FROM reservation') == [(1, 1)]
+    assert _rows(shards / 'property_2.db', 'SELECT room_id, night FROM room_night') == [(1, '2025-12-01'), (1, '2025-12-02')]
+    assert _rows(shards / 'property_2.db', 'SELECT property_id FROM reservation') == [(2,)]
+    assert _rows(tmp_path / 'main.db', 'SELECT count(*) FROM reservation') == [(0,)]
+    assert {r[0] for r in _rows(shards / 'property_1.db', "SELECT name FROM sqlite_master")}.isdisjoint({'user', 'property'})
+
+    # la caché de disponibilidad no mezcla propiedades
+    search = '/api/v1/availability?type=Single&checkin=2025-12-01&checkout=2025-12-02'
+    assert client.get(search + '&property=1').get_json()['rooms'] == []
+    assert client.post('/api/v1/reservations?property=2', json={**body, 'room_id': 2}).status_code == 201
+    assert client.get(search + '&property=1').get_json()['rooms'] == []
+
+
+def test_cross_property_search_fans_out_and_merges(chain):
+    client = chain.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'devpass'})
+    client.post('/api/v1/reservations?property=1', json={'room_id': 2, 'checkin': '2025-12-01', 'checkout': '2025-12-03'})
+
+    rooms = client.get('/api/v1/availability?checkin=2025-12-01&checkout=2025-12-02&properties=all').get_json()['rooms']
+    assert [(r['property_id'], r['number']) for r in rooms] == [(1, '101'), (2, '101'), (2, '102')]
+    assert client.get('/api/v1/availability?properties=1,9').status_code == 404
+    assert client.get('/reserve?property=9').status_code == 404
+
+    with chain.app_context():
+        counts = fan_out([1, 2], lambda: Reservation.query.count())
+    assert counts == {1: 1, 2: 0}
+
+    # otro worker con su propia caché: ve la reserva hecha por este
+    worker = create_app(dict(chain.config))
+    other = worker.test_client()
+    other.post('/login', data={'username': 'admin', 'password': 'devpass'})
+    search = '/api/v1/availability?checkin=2025-12-01&checkout=2025-12-02&properties=all'
+    assert len(other.get(search).get_json()['rooms']) == 3
+    client.post('/api/v1/reservations?property=2', json={'room_id': 1, 'checkin': '2025-12-01', 'checkout': '2025-12-02'})
+    assert [(r['property_id'], r['number']) for r in other.get(search).get_json()['rooms']] == [(1, '101'), (2, '102')]
+    with worker.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        worker.extensions['shard_router'].dispose()
+
+
+def test_pages_keep_the_selected_property(chain):
+    client = chain.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'devpass'})
+    page = client.get('/reserve?property=2').data
+    assert b'action="/reserve?property=2"' in page
+    response = client.post('/reserve?property=2', data={'room_id': 1, 'checkin': '2025-12-01', 'checkout': '2025-12-02'})
+    assert response.headers['Location'].endswith('/dashboard?property=2')
+    assert b'2025-12-01' in client.get(response.headers['Location']).data
+    assert b'2025-12-01' not in client.get('/dashboard?property=1').data
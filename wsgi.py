@@ -0,0 +1,149 @@
+"""Production entry point.
+
+``app`` is built once at import with schema creation off and every template
+compiled, so any WSGI server that preloads it (``gunicorn --preload
+wsgi:app``) forks workers that share those pages and serve from the first
+request. Running this file starts the bundled pre-forking server: the master
+builds the app and opens the listening socket, then forks WEB_WORKERS
+processes that each serve it with a pool of WEB_THREADS threads.
+
+    flask --app wsgi init-db          # once per deploy: tables, indexes, backfills
+    python wsgi.py --bind 0.0.0.0:8000 --workers 4 --threads 8
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer
+
+from app import create_app, db
+
+
+def precompile_templates(app):
+    """Load every template now, so workers start with a warm Jinja cache."""
+    env = app.jinja_env
+    if env.cache is not None and env.cache.capacity < len(env.list_templates()):
+        env.cache.capacity = len(env.list_templates())
+    for name in env.list_templates():
+        env.get_template(name)
+    return len(env.list_templates())
+
+
+app = create_app({"AUTO_CREATE_SCHEMA": False})
+precompile_templates(app)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """werkzeug server handing each connection to a bounded thread pool."""
+
+    multithread = True
+
+    def __init__(self, host, port, wsgi_app, threads, fd=None):
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+        super().__init__(host, port, wsgi_app, fd=fd)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def _worker(sock, threads):
+    # el pool de conexiones del maestro no debe compartirse con los hijos
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+        app.extensions["shard_router"].dispose(close=False)
+    host, port = sock.getsockname()[:2]
+    server = PooledWSGIServer(host, port, app, threads, fd=sock.fileno())
+    # shutdown() espera a serve_forever, así que tiene que llamarse desde otro hilo
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    finally:
+        server.pool.shutdown(wait=True)
+        server.server_close()
+    os._exit(0)
+
+
+def serve(host="127.0.0.1", port=8000, workers=2, threads=8):
+    """Pre-fork ``workers`` processes sharing one listening socket; respawn any that die."""
+    sock = socket.create_server((host, port), reuse_port=False, backlog=2048)
+    sock.set_inheritable(True)
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            try:
+                _worker(sock, threads)
+            finally:
+                os._exit(1)
+        children[pid] = time.monotonic()
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"serving on http://{host}:{sock.getsockname()[1]} with {workers} workers x {threads} threads",
+          flush=True)
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        if time.monotonic() - started < 1:
+            # un worker que muere al arrancar volvería a morir: no entrar en bucle
+            print(f"worker {pid} died during startup, stopping", file=sys.stderr, flush=True)
+            stop()
+            continue
+        spawn()
+    sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the hotel app with pre-forked, multi-threaded workers")
+    parser.add_argument("--bind", default=os.environ.get("BIND", "127.0.0.1:8000"), help="host:port")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("WEB_THREADS", 8)))
+    parser.add_argument("--access-log", action="store_true", help="log every request to stderr")
+    args = parser.parse_args(argv)
+    if not args.access_log:
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    host, _, port = args.bind.rpartition(":")
+    serve(host or "127.0.0.1", int(port), args.workers, args.threads)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())